@@ -0,0 +1,573 @@
+from math import pi
+
+import numpy as np
+
+from FreeCAD import Base
+import Part
+
+# Outlines are NumPy descriptions of the apertures in freecad_apertures.
+# Each outline is a dictionary with
+#   "vertices": array of shape (..., n_vertices, 2) holding (y, z) co ordinates
+#               in mm. Any leading dimensions index the parameter values, so a
+#               whole sweep of candidates is evaluated in one call.
+#   "segments": list of ("line", start, end) or ("arc", start, mid, end)
+#               vertex indices. Arcs are three point arcs, as used by Part.Arc.
+#               The segment list is shared by every candidate.
+# Conversion to FreeCAD geometry only happens in outline_to_wire.
+
+
+def _values(value):
+    """Converts a FreeCAD quantity, a number or an array of either into a float
+    array (quantities are taken in the FreeCAD internal units of mm and deg).
+    """
+    if isinstance(value, (list, tuple)):
+        return np.array([_values(val) for val in value], dtype=float)
+    return np.asarray(getattr(value, "Value", value), dtype=float)
+
+
+def _make_outline(points, segments):
+    """Broadcasts a list of (y, z) points together into an outline.
+
+    Args:
+        points (list): (y, z) pairs of floats or arrays.
+        segments (list): The segment metadata.
+
+    Returns:
+        outline (dict): The outline description.
+    """
+    coords = np.broadcast_arrays(*[_values(c) for point in points for c in point])
+    vertices = np.stack(coords, axis=-1)
+    vertices = vertices.reshape(vertices.shape[:-1] + (len(points), 2))
+    return {"vertices": vertices, "segments": segments}
+
+
+def _closed_lines(n_vertices):
+    return [("line", n, (n + 1) % n_vertices) for n in range(n_vertices)]
+
+
+def rectangle_outline(aperture_height, aperture_width):
+    """Outline of make_rectangle_aperture.
+
+    Args:
+        aperture_height (float or array): Total height of the aperture
+        aperture_width (float or array): Total width of the aperture
+
+    Returns:
+        outline (dict): The outline description.
+    """
+    h = _values(aperture_height) / 2.0
+    w = _values(aperture_width) / 2.0
+    points = [(h, -w), (h, w), (-h, w), (-h, -w)]
+    return _make_outline(points, _closed_lines(4))
+
+
+def rounded_rectangle_outline(aperture_height, aperture_width, corner_radius):
+    """Outline of make_rounded_rectangle_aperture.
+
+    Args:
+        aperture_height (float or array): Total height of the aperture
+        aperture_width (float or array): Total width of the aperture
+        corner_radius (float or array): Radius of the corners.
+
+    Returns:
+        outline (dict): The outline description.
+    """
+    h = _values(aperture_height) / 2.0
+    w = _values(aperture_width) / 2.0
+    r = _values(corner_radius)
+    c = r * (1 - 1 / np.sqrt(2))
+    points = [
+        (h - r, -w),
+        (h - c, -w + c),
+        (h, -w + r),
+        (h, w - r),
+        (h - c, w - c),
+        (h - r, w),
+        (-h + r, w),
+        (-h + c, w - c),
+        (-h, w - r),
+        (-h, -w + r),
+        (-h + c, -w + c),
+        (-h + r, -w),
+    ]
+    segments = []
+    for corner in range(4):
+        start = corner * 3
+        segments.append(("arc", start, start + 1, start + 2))
+        segments.append(("line", start + 2, (start + 3) % 12))
+    return _make_outline(points, segments)
+
+
+def racetrack_outline(aperture_height, aperture_width):
+    """Outline of make_racetrack_aperture.
+
+    Args:
+        aperture_height (float or array): Total height of the aperture
+        aperture_width (float or array): Total width of the aperture
+
+    Returns:
+        outline (dict): The outline description.
+    """
+    h = _values(aperture_height) / 2.0
+    w = _values(aperture_width) / 2.0
+    points = [(h, h - w), (h, w - h), (0.0, w), (-h, w - h), (-h, h - w), (0.0, -w)]
+    segments = [("line", 0, 1), ("arc", 1, 2, 3), ("line", 3, 4), ("arc", 4, 5, 0)]
+    return _make_outline(points, segments)
+
+
+def octagonal_outline(aperture_height, aperture_width, side_length, tb_length):
+    """Outline of make_octagonal_aperture.
+
+    Args:
+        aperture_height (float or array): Total height of the octagon.
+        aperture_width (float or array): Total width of the octagon.
+        side_length (float or array): Length of the vertical sides
+        tb_length (float or array): Length of the horizontal sides.
+
+    Returns:
+        outline (dict): The outline description.
+    """
+    h = _values(aperture_height) / 2.0
+    w = _values(aperture_width) / 2.0
+    s = _values(side_length) / 2.0
+    t = _values(tb_length) / 2.0
+    points = [(h, -t), (h, t), (s, w), (-s, w), (-h, t), (-h, -t), (-s, -w), (s, -w)]
+    return _make_outline(points, _closed_lines(8))
+
+
+def circular_outline(aperture_radius):
+    """Outline of make_circular_aperture.
+
+    Args:
+        aperture_radius (float or array): Radius of the aperture
+
+    Returns:
+        outline (dict): The outline description.
+    """
+    r = _values(aperture_radius)
+    points = [(0.0, r), (r, 0.0), (0.0, -r), (-r, 0.0)]
+    return _make_outline(points, [("arc", 0, 1, 2), ("arc", 2, 3, 0)])
+
+
+def keyhole_outline(pipe_radius, keyhole_height, keyhole_width):
+    """Outline of make_keyhole_aperture.
+    Candidates where the keyhole is taller than the pipe have NaN vertices.
+
+    Args:
+        pipe_radius (float or array): Radius of the main beam pipe.
+        keyhole_height (float or array): Total height of the keyhole slot.
+        keyhole_width (float or array): Total width of the keyhole slot.
+
+    Returns:
+        outline (dict): The outline description.
+    """
+    r = _values(pipe_radius)
+    h = _values(keyhole_height) / 2.0
+    w = _values(keyhole_width)
+    # X intersection of keyhole with pipe.
+    with np.errstate(invalid="ignore"):
+        x_intersection = np.sqrt(r**2 - h**2)
+    slot_end = x_intersection + w - h
+    points = [
+        (-h, x_intersection),
+        (0.0, -r),
+        (h, x_intersection),
+        (h, slot_end),
+        (0.0, x_intersection + w),
+        (-h, slot_end),
+    ]
+    segments = [("arc", 0, 1, 2), ("line", 2, 3), ("arc", 3, 4, 5), ("line", 5, 0)]
+    return _make_outline(points, segments)
+
+
+def _rotate_cartesian(x, y, angle):
+    """Vectorised version of freecad_operations.rotate_cartesian."""
+    r = np.hypot(x, y)
+    a = np.arctan2(y, x) + np.radians(angle)
+    return r * np.cos(a), r * np.sin(a)
+
+
+def polygon_with_tags_outline(inner_radius, tag_radii, insert_angles, tag_widths):
+    """Outline of make_polygon_with_tags.
+    The tag arguments have the tags along their last axis.
+
+    Args:
+        inner_radius (float or array): Radius of the inner surface of the inserts.
+        tag_radii (list or array): Radius of each tag.
+        insert_angles (list or array): Angle the at the centre of each spoke (deg).
+        tag_widths (list or array): extent of each tag
+
+    Returns:
+        outline (dict): The outline description.
+    """
+    inner_radius = _values(inner_radius)[..., None]
+    tag_radii = _values(tag_radii)
+    insert_angles = _values(insert_angles)
+    tag_widths = _values(tag_widths)
+    n_tags = np.broadcast(tag_radii, insert_angles, tag_widths).shape[-1]
+    with np.errstate(invalid="ignore"):
+        bottom_corner_height = np.sqrt(inner_radius**2 - tag_widths**2 / 4.0)
+        top_corner_height = np.sqrt(tag_radii**2 - tag_widths**2 / 4.0)
+    corners = [
+        (tag_widths / 2.0, bottom_corner_height),
+        (tag_widths / 2.0, top_corner_height),
+        (0.0, tag_radii),
+        (-tag_widths / 2.0, top_corner_height),
+        (-tag_widths / 2.0, bottom_corner_height),
+    ]
+    # (..., n_tags, 5, 2) then flattened so that the tags follow each other.
+    vertices = np.stack(
+        np.broadcast_arrays(
+            *[
+                np.stack(_rotate_cartesian(x, y, insert_angles), axis=-1)
+                for x, y in corners
+            ]
+        ),
+        axis=-2,
+    )
+    vertices = vertices.reshape(vertices.shape[:-3] + (n_tags * 5, 2))
+    segments = []
+    for tag in range(n_tags):
+        start = tag * 5
+        segments.extend(
+            [
+                ("line", start, start + 1),
+                # The short arc across the tag tip.
+                ("arc", start + 1, start + 2, start + 3),
+                ("line", start + 3, start + 4),
+                ("line", start + 4, (start + 5) % (n_tags * 5)),
+            ]
+        )
+    return {"vertices": vertices, "segments": segments}
+
+
+def rounded_end_path(y_radius, end_radius, fudge=1.5, n_points=51):
+    """Path of the curved end used by rounded_curved_end.
+
+    Args:
+        y_radius (float): Radius of the stripline centre.
+        end_radius (float): Half chord of the end.
+        fudge (float): Offset of the path towards the axis.
+        n_points (int): Number of points along the path.
+
+    Returns:
+        ang_scale (numpy array): Angular position of each point (radians).
+        path (numpy array): (n_points, 3) array of x, y, z co ordinates.
+    """
+    y_radius = float(_values(y_radius))
+    end_radius = float(_values(end_radius))
+    fudge = float(_values(fudge))
+    ang_scale = np.linspace(-pi / 2.0, pi / 2.0, num=n_points, endpoint=True)
+    path = np.stack(
+        (
+            -end_radius + end_radius * np.cos(ang_scale),
+            (y_radius - fudge) * np.cos((end_radius / y_radius) * ang_scale) + fudge,
+            end_radius * np.sin(ang_scale),
+        ),
+        axis=-1,
+    )
+    return ang_scale, path
+
+
+def stripline_end_path(stripline_length, y_radius, end_radius, n_points=51):
+    """Path of the curved end used by stripline_curved_end.
+
+    Args:
+        stripline_length (float): Total length of the stripline.
+        y_radius (float): Radius of the stripline centre.
+        end_radius (float): Half chord of the end.
+        n_points (int): Number of points along the path.
+
+    Returns:
+        ang_scale (numpy array): Angular position of each point (radians).
+        path (numpy array): (n_points, 3) array of x, y, z co ordinates.
+    """
+    stripline_length = float(_values(stripline_length))
+    y_radius = float(_values(y_radius))
+    end_radius = float(_values(end_radius))
+    ang_scale = np.linspace(-pi / 2.0, pi / 2.0, num=n_points, endpoint=True)
+    z = end_radius * np.sin(ang_scale)
+    path = np.stack(
+        (
+            stripline_length / 2.0
+            - end_radius
+            + np.sqrt(np.clip(end_radius**2 - z**2, 0, None)),
+            np.sqrt(np.clip(y_radius**2 - z**2, 0, None)),
+            z,
+        ),
+        axis=-1,
+    )
+    return ang_scale, path
+
+
+def chord_deviation(path, indices):
+    """Distance of every point of a dense path from the polyline through a
+    subset of its points.
+
+    Args:
+        path (numpy array): (..., n_points, 3) array of co ordinates. Leading
+                            dimensions hold further tracks sampled at the same
+                            stations (e.g. the corners of a swept profile).
+        indices (numpy array): Sorted indices of the kept stations, including
+                               the first and last points.
+
+    Returns:
+        deviation (numpy array): The largest distance over the tracks for each
+                                 point of the dense path.
+    """
+    path = np.asarray(path, dtype=float)
+    path = path.reshape((-1,) + path.shape[-2:])
+    indices = np.asarray(indices)
+    points = np.arange(path.shape[1])
+    segment = np.clip(
+        np.searchsorted(indices, points, side="right") - 1, 0, len(indices) - 2
+    )
+    start = path[:, indices[segment]]
+    chord = path[:, indices[segment + 1]] - start
+    offset = path - start
+    length2 = np.sum(chord**2, axis=-1)
+    fraction = np.clip(
+        np.sum(offset * chord, axis=-1) / np.where(length2 > 0, length2, 1.0), 0, 1
+    )
+    distance = np.linalg.norm(offset - fraction[..., None] * chord, axis=-1)
+    return distance.max(axis=0)
+
+
+def placed_profile_tracks(corners, points, angles, axis):
+    """Paths followed by the corners of a profile which is placed at each
+    station of a path and turned about an axis through the station.
+
+    Args:
+        corners (numpy array): (n_corners, 3) corners of the profile, relative
+                               to the station.
+        points (numpy array): (n_points, 3) stations.
+        angles (numpy array): Rotation at each station (deg).
+        axis (int): The cartesian axis turned about (0, 1 or 2).
+
+    Returns:
+        tracks (numpy array): (n_corners, n_points, 3) corner positions.
+    """
+    angles = np.radians(np.asarray(angles, dtype=float))
+    c, s = np.cos(angles), np.sin(angles)
+    # The two co ordinates which change, in right handed order.
+    i, j = [(1, 2), (2, 0), (0, 1)][axis]
+    corners = np.asarray(corners, dtype=float)[:, None, :]
+    tracks = np.broadcast_to(corners, corners.shape[:1] + c.shape + (3,)).copy()
+    tracks[..., i] = c * corners[..., i] - s * corners[..., j]
+    tracks[..., j] = s * corners[..., i] + c * corners[..., j]
+    return tracks + np.asarray(points, dtype=float)
+
+
+def adaptive_stations(path, tolerance, min_points=3):
+    """Picks the stations of a dense path needed to follow it within a tolerance.
+    Stations are added where the path bends fastest, so straight stretches get
+    few sections and tight curves many.
+
+    Args:
+        path (numpy array): (..., n_points, 3) dense reference path (see
+                            chord_deviation).
+        tolerance (float): Largest allowed distance from the dense path (mm).
+        min_points (int): Number of evenly spaced stations to start from.
+
+    Returns:
+        indices (numpy array): Indices of the stations in the dense path.
+        error (float): Largest distance of the dense path from the stations.
+    """
+    n_points = np.shape(path)[-2]
+    indices = np.unique(
+        np.round(np.linspace(0, n_points - 1, max(min(min_points, n_points), 2)))
+    ).astype(int)
+    while True:
+        deviation = chord_deviation(path, indices)
+        if deviation.max() <= tolerance:
+            break
+        # Split every segment which is out of tolerance at its worst point.
+        segment = np.searchsorted(indices, np.arange(n_points), side="right")
+        order = np.lexsort((-deviation, segment))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = segment[order][1:] != segment[order][:-1]
+        worst = order[first]
+        worst = worst[deviation[worst] > tolerance]
+        indices = np.union1d(indices, worst)
+    return indices, float(deviation.max())
+
+
+def _sample_arc(p0, pm, p1, n_points):
+    """Points along three point arcs, excluding the end point.
+    Collinear arcs fall back to straight lines.
+    """
+    (ax, ay), (bx, by), (cx, cy) = [np.moveaxis(p, -1, 0) for p in (p0, pm, p1)]
+    a2 = ax**2 + ay**2
+    b2 = bx**2 + by**2
+    c2 = cx**2 + cy**2
+    d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+    straight = np.abs(d) <= 1e-12 * (a2 + b2 + c2 + 1e-300)
+    d = np.where(straight, 1.0, d)
+    centre = np.stack(
+        (
+            (a2 * (by - cy) + b2 * (cy - ay) + c2 * (ay - by)) / d,
+            (a2 * (cx - bx) + b2 * (ax - cx) + c2 * (bx - ax)) / d,
+        ),
+        axis=-1,
+    )
+    radius = np.linalg.norm(p0 - centre, axis=-1)
+    a0, am, a1 = [
+        np.arctan2(p[..., 1] - centre[..., 1], p[..., 0] - centre[..., 0])
+        for p in (p0, pm, p1)
+    ]
+    sweep = np.mod(a1 - a0, 2 * pi)
+    # Go the other way round if the mid point is not on the anticlockwise arc.
+    sweep = np.where(np.mod(am - a0, 2 * pi) <= sweep, sweep, sweep - 2 * pi)
+    t = np.arange(n_points) / float(n_points)
+    angles = a0[..., None] + t * sweep[..., None]
+    arc = centre[..., None, :] + radius[..., None, None] * np.stack(
+        (np.cos(angles), np.sin(angles)), axis=-1
+    )
+    line = p0[..., None, :] + t[:, None] * (p1 - p0)[..., None, :]
+    return np.where(straight[..., None, None], line, arc)
+
+
+def sample_outline(outline, arc_points=16):
+    """Converts an outline into a closed polyline.
+
+    Args:
+        outline (dict): The outline description.
+        arc_points (int): Number of points used for each arc.
+
+    Returns:
+        polyline (numpy array): (..., n_points, 2) array of (y, z) co ordinates.
+                                The first point is not repeated at the end.
+    """
+    vertices = outline["vertices"]
+    pieces = []
+    for segment in outline["segments"]:
+        if segment[0] == "line":
+            pieces.append(vertices[..., segment[1] : segment[1] + 1, :])
+        else:
+            pieces.append(
+                _sample_arc(
+                    vertices[..., segment[1], :],
+                    vertices[..., segment[2], :],
+                    vertices[..., segment[3], :],
+                    arc_points,
+                )
+            )
+    return np.concatenate(pieces, axis=-2)
+
+
+def polyline_area(polyline):
+    """Area enclosed by closed polylines (shoelace formula).
+
+    Args:
+        polyline (numpy array): (..., n_points, 2) array of co ordinates.
+
+    Returns:
+        area (numpy array): The enclosed area of each polyline.
+    """
+    y = polyline[..., 0]
+    z = polyline[..., 1]
+    return 0.5 * np.abs(
+        np.sum(y * np.roll(z, -1, axis=-1) - np.roll(y, -1, axis=-1) * z, axis=-1)
+    )
+
+
+def polyline_self_intersects(polyline):
+    """Checks closed polylines for edges crossing each other.
+
+    Args:
+        polyline (numpy array): (..., n_points, 2) array of co ordinates.
+
+    Returns:
+        crossed (numpy array): True where any two non adjacent edges cross.
+    """
+    n_points = polyline.shape[-2]
+    first, second = np.triu_indices(n_points, 2)
+    # The first and last edges share a vertex.
+    keep = ~((first == 0) & (second == n_points - 1))
+    first = first[keep]
+    second = second[keep]
+    start = polyline
+    end = np.roll(polyline, -1, axis=-2)
+
+    def orientation(p, q, r):
+        return (q[..., 0] - p[..., 0]) * (r[..., 1] - p[..., 1]) - (
+            q[..., 1] - p[..., 1]
+        ) * (r[..., 0] - p[..., 0])
+
+    a, b = start[..., first, :], end[..., first, :]
+    c, d = start[..., second, :], end[..., second, :]
+    crossed = (orientation(a, b, c) * orientation(a, b, d) < 0) & (
+        orientation(c, d, a) * orientation(c, d, b) < 0
+    )
+    return np.any(crossed, axis=-1)
+
+
+def outline_is_valid(outline, min_length=1e-6, arc_points=16):
+    """Fast validity check of every candidate in an outline.
+    A candidate is valid if all its vertices are finite, no segment is shorter
+    than min_length, it encloses an area and it does not cross itself.
+
+    Args:
+        outline (dict): The outline description.
+        min_length (float): Shortest allowed segment (mm).
+        arc_points (int): Number of points used for each arc in the checks.
+
+    Returns:
+        valid (numpy array): Boolean array with one entry per candidate.
+    """
+    vertices = outline["vertices"]
+    valid = np.all(np.isfinite(vertices), axis=(-2, -1))
+    for segment in outline["segments"]:
+        length = np.linalg.norm(
+            vertices[..., segment[-1], :] - vertices[..., segment[1], :], axis=-1
+        )
+        valid &= length > min_length
+    with np.errstate(invalid="ignore"):
+        polyline = sample_outline(outline, arc_points=arc_points)
+        valid &= polyline_area(polyline) > min_length**2
+        valid &= ~polyline_self_intersects(polyline)
+    return valid
+
+
+def polyline_to_wire(points):
+    """Converts an array of points into a FreeCAD polygon wire.
+
+    Args:
+        points (numpy array): (n_points, 3) array of x, y, z co ordinates.
+
+    Returns:
+        wire1 (FreeCAD wire definition): The polygon.
+    """
+    return Part.Wire(Part.makePolygon([Base.Vector(*point) for point in points]))
+
+
+def outline_to_wire(outline, index=()):
+    """Converts a single candidate of an outline into FreeCAD geometry.
+
+    Args:
+        outline (dict): The outline description.
+        index (tuple): Index of the candidate in the leading dimensions.
+
+    Returns:
+        wire1 (FreeCAD wire definition): An outline description of the shape.
+        face1 (FreeCAD face definition): A surface description of the shape.
+    """
+    vertices = outline["vertices"][index]
+    if vertices.ndim != 2:
+        raise ValueError("index should select a single candidate of the outline")
+    points = [Base.Vector(0, float(y), float(z)) for y, z in vertices]
+    edges = []
+    for segment in outline["segments"]:
+        if segment[0] == "line":
+            edges.append(Part.LineSegment(points[segment[1]], points[segment[2]]))
+        else:
+            edges.append(
+                Part.Arc(points[segment[1]], points[segment[2]], points[segment[3]])
+            )
+    # Make a shape
+    shape1 = Part.Shape(edges)
+    # Make a wire outline.
+    wire1 = Part.Wire(shape1.Edges)
+    # Make a face.
+    face1 = Part.Face(wire1)
+    return wire1, face1
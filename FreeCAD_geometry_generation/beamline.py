@@ -0,0 +1,126 @@
+import numpy as np
+
+from FreeCAD import Base
+import Part
+
+from FreeCAD_geometry_generation.freecad_operations import (
+    make_placement,
+    make_taper,
+    make_wall,
+    place,
+)
+
+
+def station_positions(lengths, start=0):
+    """Positions of the aperture stations along the beamline.
+
+    Args:
+        lengths (list): The length of each element between two stations.
+        start (float): Position of the first station.
+
+    Returns:
+        positions (numpy array): The x position of every station.
+    """
+    lengths = np.array([float(getattr(val, "Value", val)) for val in lengths])
+    if np.any(lengths <= 0):
+        raise ValueError("All beamline element lengths must be positive")
+    start = float(getattr(start, "Value", start))
+    return start + np.concatenate(([0.0], np.cumsum(lengths)))
+
+
+def _loft_sections(stations, positions):
+    """Single ruled loft through copies of the stations moved to their positions."""
+    sections = []
+    for station, x in zip(stations, positions):
+        section = station.copy()
+        section.translate(Base.Vector(float(x), 0, 0))
+        sections.append(section)
+    return Part.makeLoft(sections, True, True, False)
+
+
+def _fuse_segments(stations, positions):
+    """Builds each pipe or taper separately and fuses them in one batch.
+    Repeated transitions come from the make_taper cache."""
+    segments = [
+        make_taper(
+            stations[n],
+            stations[n + 1],
+            float(positions[n + 1] - positions[n]),
+            loc=(float(positions[n]), 0, 0),
+        )
+        for n in range(len(stations) - 1)
+    ]
+    if len(segments) == 1:
+        return segments[0]
+    return segments[0].multiFuse(segments[1:]).removeSplitter()
+
+
+def make_beamline_solid(stations, lengths, start=0, method="loft"):
+    """Makes a solid running through a list of aperture stations along the x axis.
+    Consecutive stations with the same aperture give a pipe, differing ones a
+    linear taper.
+
+    Args:
+        stations (list): Aperture wires, each centred on (0,0,0) in the YZ plane.
+        lengths (list): The length of each element between two stations.
+        start (float): Position of the first station.
+        method (str): 'loft' for one loft through all the sections, or 'fuse'
+                      to fuse the separate segments in one batch. If the loft
+                      fails the fuse is used instead.
+
+    Returns:
+        solid (FreeCAD shape): The beamline solid.
+    """
+    if len(stations) != len(lengths) + 1:
+        raise ValueError("There should be one more station than element lengths")
+    positions = station_positions(lengths, start=start)
+    if method == "loft":
+        try:
+            return _loft_sections(stations, positions)
+        except Part.OCCError as e:
+            print("Loft through the beamline stations failed, fusing segments", e)
+    elif method != "fuse":
+        raise ValueError("method should be loft or fuse")
+    return _fuse_segments(stations, positions)
+
+
+def make_beamline(
+    stations,
+    lengths,
+    wall_stations=None,
+    wall_thickness=None,
+    start=0,
+    loc=(0, 0, 0),
+    rotation_angles=(0, 0, 0),
+    method="loft",
+):
+    """Makes the vacuum and wall solids of a beamline of pipes and tapers.
+
+    Args:
+        stations (list): Vacuum aperture wires, each centred on (0,0,0) in the
+                         YZ plane.
+        lengths (list): The length of each element between two stations.
+        wall_stations (list): Outer aperture wires of the wall at the same
+                              stations.
+        wall_thickness (float): If given instead of wall_stations the wall is
+                                made by thickening the vacuum (see make_wall).
+        start (float): Position of the first station along the beamline.
+        loc (tuple): Final location of the beamline origin.
+        rotation_angles (tuple) : The angles to rotate about in the three
+                                  cartesian directions.
+        method (str): 'loft' or 'fuse' (see make_beamline_solid).
+
+    Returns:
+        parts (dict): 'vac' and, if a wall is requested, 'pipe' solids.
+    """
+    placement = make_placement(loc, rotation_angles)
+    vacuum = make_beamline_solid(stations, lengths, start=start, method=method)
+    parts = {"vac": vacuum}
+    if wall_stations is not None:
+        outer = make_beamline_solid(wall_stations, lengths, start=start, method=method)
+        parts["pipe"] = outer.cut(vacuum)
+    elif wall_thickness is not None:
+        parts["pipe"] = make_wall(vacuum, wall_thickness)
+    for part in parts.values():
+        place(part, placement)
+    return parts
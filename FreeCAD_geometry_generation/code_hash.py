@@ -0,0 +1,57 @@
+import hashlib
+import os
+import sys
+
+# Hashes of module source files, keyed on (path, modification time).
+_SOURCE_HASHES = {}
+
+
+def source_hash(module_name):
+    """Hash of the source file of a module, so that editing any function in it,
+    including helpers a builder calls, changes the hash.
+
+    Args:
+        module_name (str): Name of an imported module.
+
+    Returns:
+        digest (str): The hash, or an empty string if the source is not found.
+    """
+    path = getattr(sys.modules.get(module_name), "__file__", None)
+    if path is None or not os.path.exists(path):
+        return ""
+    key = (path, os.path.getmtime(path))
+    if key not in _SOURCE_HASHES:
+        with open(path, "rb") as source_file:
+            _SOURCE_HASHES[key] = hashlib.sha1(source_file.read()).hexdigest()
+    return _SOURCE_HASHES[key]
+
+
+def _add_code(digest, code):
+    """Adds the bytecode, names and constants of a code object to a hash.
+    Nested code objects (comprehensions, inner functions) are added in turn,
+    as their repr includes a memory address which changes between runs."""
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode("utf-8"))
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            _add_code(digest, const)
+        else:
+            digest.update(repr(const).encode("utf-8"))
+
+
+def function_hash(function):
+    """Identifies the code of a function, for use in cache keys.
+    The bytecode alone misses renamed calls (e.g. Part.makeCylinder to
+    Part.makeCone only changes co_names), so the names, the constants and the
+    source of the whole module are included.
+
+    Args:
+        function (function handle): A module level function.
+
+    Returns:
+        digest (str): The hash.
+    """
+    digest = hashlib.sha1()
+    _add_code(digest, function.__code__)
+    digest.update(source_hash(function.__module__).encode("utf-8"))
+    return digest.hexdigest()
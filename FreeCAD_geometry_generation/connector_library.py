@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import socket
+
+from FreeCAD import Units
+import Part
+
+from FreeCAD_geometry_generation.code_hash import function_hash
+
+# Connectors are built once per parameter set around the origin and kept here,
+# keyed on the builder, its code and its parameters. Callers get copies which
+# they move into place with a single placement.
+_CONNECTOR_CACHE = {}
+
+# Folder the connector BREP files are kept in between runs. None turns off the
+# disk cache.
+CONNECTOR_CACHE_DIR = os.environ.get(
+    "EM_CAD_CONNECTOR_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "EM_CAD_frontend", "connectors"),
+)
+# Part of every connector key. Increase it when a change outside the builder
+# modules (e.g. a FreeCAD upgrade) changes the connector geometry, so the files
+# in the disk cache are not used again.
+CACHE_VERSION = 1
+
+
+def clear_connector_cache():
+    """Empties the in memory connector cache. The disk cache is kept."""
+    _CONNECTOR_CACHE.clear()
+
+
+def _parameter_value(value):
+    """Converts a parameter to a plain value so equal quantities hash the same."""
+    if isinstance(value, (list, tuple)):
+        return [_parameter_value(val) for val in value]
+    if isinstance(value, str):
+        try:
+            value = Units.Quantity(value)
+        except Exception:
+            # Not a quantity, so the text is used.
+            return value
+    value = getattr(value, "Value", value)
+    if isinstance(value, (int, float)):
+        return round(float(value), 9)
+    return str(value)
+
+
+def connector_key(builder, parameters):
+    """Identifies a connector variant.
+
+    Args:
+        builder (function handle): The function building the connector parts.
+        parameters (dict): The parameters it is built from.
+
+    Returns:
+        key (str): The builder name followed by a hash of its code and parameters.
+                   The code hash covers the source of the builder module, so
+                   editing a helper it calls also gives a new key.
+    """
+    description = json.dumps(
+        {name: _parameter_value(value) for name, value in parameters.items()},
+        sort_keys=True,
+    )
+    digest = hashlib.sha1()
+    # Changing the builder code gives a new key, so stale files are never used.
+    digest.update(function_hash(builder).encode("utf-8"))
+    digest.update(str(CACHE_VERSION).encode("utf-8"))
+    digest.update(description.encode("utf-8"))
+    return "_".join([builder.__name__.strip("_"), digest.hexdigest()[:16]])
+
+
+def _read_parts(folder):
+    """Reads the parts of a connector from the disk cache, or None if missing."""
+    listing = os.path.join(folder, "parts.json")
+    if not os.path.exists(listing):
+        return None
+    with open(listing, "r") as listing_file:
+        names = json.load(listing_file)
+    try:
+        return {name: Part.read(os.path.join(folder, name + ".brep")) for name in names}
+    except Part.OCCError as e:
+        print("Could not read cached connector ", folder, e)
+        return None
+
+
+def _temp_name(path):
+    """A temporary file name next to path which is unique to this process, so
+    processes on different hosts sharing the cache never write the same file."""
+    return ".".join([path, socket.gethostname(), str(os.getpid()), "tmp"])
+
+
+def _write_parts(folder, parts):
+    """Writes the parts of a connector to the disk cache.
+    The part list is written last, so a partly written entry is never read.
+    Each file is written under a temporary name and then moved into place, so
+    several processes can fill the same entry at once."""
+    os.makedirs(folder, exist_ok=True)
+    for name, shape in parts.items():
+        final_name = os.path.join(folder, name + ".brep")
+        temp_name = _temp_name(final_name)
+        shape.exportBrep(temp_name)
+        os.replace(temp_name, final_name)
+    temp_name = _temp_name(os.path.join(folder, "parts.json"))
+    with open(temp_name, "w") as listing_file:
+        json.dump(sorted(parts), listing_file)
+    os.replace(temp_name, os.path.join(folder, "parts.json"))
+
+
+def cached_connector(builder, parameters, cache_dir=None):
+    """Gets the parts of a connector built at the origin, building them only if
+    they are not already in the memory or disk cache.
+
+    Args:
+        builder (function handle): Takes the parameters and returns a dictionary
+                                   of parts built at the origin.
+        parameters (dict): The connector parameters.
+        cache_dir (str): Folder of the disk cache. Defaults to CONNECTOR_CACHE_DIR.
+
+    Returns:
+        parts (dict): Copies of the parts, which the caller is free to move.
+    """
+    if cache_dir is None:
+        cache_dir = CONNECTOR_CACHE_DIR
+    key = connector_key(builder, parameters)
+    if key not in _CONNECTOR_CACHE:
+        parts = None
+        folder = None if not cache_dir else os.path.join(cache_dir, key)
+        if folder is not None:
+            parts = _read_parts(folder)
+        if parts is None:
+            parts = builder(dict(parameters))
+            if folder is not None:
+                try:
+                    _write_parts(folder, parts)
+                except OSError as e:
+                    print("Could not write the connector cache ", folder, e)
+        _CONNECTOR_CACHE[key] = parts
+    return {name: shape.copy() for name, shape in _CONNECTOR_CACHE[key].items()}
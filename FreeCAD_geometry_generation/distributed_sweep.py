@@ -0,0 +1,787 @@
+import importlib
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import time
+from sys import argv
+
+from FreeCAD_geometry_generation.freecad_apertures import make_circular_aperture
+from FreeCAD_geometry_generation.freecad_operations import (
+    ModelException,
+    make_beampipe,
+    run_sweep_point,
+    sweep_model_tag,
+)
+from FreeCAD_geometry_generation.run_sidecar import (
+    INDEX_NAME,
+    append_to_index,
+    sidecar_path,
+)
+from FreeCAD_geometry_generation.sweep_catalogue import query_catalogue, record_run
+from FreeCAD_geometry_generation.sweep_manifest import (
+    COMPLETED,
+    FAILED,
+    PENDING,
+    REJECTED,
+    RUNNING,
+    add_point,
+    load_manifest,
+    manifest_path,
+    new_manifest,
+    summarise_manifest,
+    unfinished_points,
+    update_point,
+    write_json,
+    write_manifest,
+)
+from FreeCAD_geometry_generation.task_graph import decode, encode
+
+# A distributed sweep is run from a job folder on a filesystem shared by all
+# the hosts. The coordinator writes job.json, then starts a worker on each
+# host. Workers take points by creating a claim file with O_EXCL, which only
+# one of them can do (NFS v3 and later honour this), and write a result file
+# when the point is done. The coordinator copies the results into the sweep
+# manifest and gives the claims of dead or hung workers back to the others.
+# SQLite locking is unreliable over NFS, so the workers do not touch the run
+# index or catalogue. The coordinator adds the finished points to both from
+# their sidecars once the sweep is over.
+# The hosts' clocks may differ, so ages are measured with file modification
+# times on the shared filesystem (set by the file server), against a reference
+# file the coordinator touches.
+LOCAL_HOSTS = ("local", "localhost")
+# Inputs of the sweep run by local_smoke_test.
+SMOKE_TEST_PARAMETERS = {"pipe_radius": "10mm", "pipe_length": "40mm"}
+
+
+def job_folder(output_path, model_name, sweep_variable):
+    """Location of the job folder of a distributed sweep."""
+    return os.path.join(
+        output_path, "".join([model_name, "_", sweep_variable, "_distributed"])
+    )
+
+
+def _claim_path(job_dir, model_tag):
+    return os.path.join(job_dir, "claims", model_tag)
+
+
+def _result_path(job_dir, model_tag):
+    return os.path.join(job_dir, "results", "".join([model_tag, ".json"]))
+
+
+def _heartbeat_path(job_dir, worker_name):
+    return os.path.join(job_dir, "heartbeats", worker_name)
+
+
+def _clock_path(job_dir):
+    return os.path.join(job_dir, "clock")
+
+
+def function_name(function):
+    """The importable name (module:function) of a function, so that workers
+    on other hosts can find it.
+
+    Args:
+        function (function handle): A module level function.
+
+    Returns:
+        name (str): The module and function name, or None.
+    """
+    if function is None:
+        return None
+    if function.__module__ == "__main__" or "<" in function.__qualname__:
+        raise ValueError(
+            "".join(
+                [
+                    function.__qualname__,
+                    " has to be defined at the top level of an importable ",
+                    "module to run on other hosts.",
+                ]
+            )
+        )
+    return ":".join([function.__module__, function.__qualname__])
+
+
+def load_function(name):
+    """Reverses function_name."""
+    if name is None:
+        return None
+    module_name, qualname = name.split(":")
+    function = importlib.import_module(module_name)
+    for attribute in qualname.split("."):
+        function = getattr(function, attribute)
+    return function
+
+
+def partition_points(model_tags, worker_names):
+    """Shares the points between the workers, one at a time in turn, so each
+    worker gets a spread of the sweep.
+
+    Args:
+        model_tags (list): The points to run.
+        worker_names (list): The workers.
+
+    Returns:
+        partitions (dict): The point tags of each worker, keyed on worker name.
+    """
+    partitions = {name: [] for name in worker_names}
+    for n, model_tag in enumerate(model_tags):
+        partitions[worker_names[n % len(worker_names)]].append(model_tag)
+    return partitions
+
+
+def write_job(job_dir, job):
+    """Writes a fresh job folder, removing any claims and results of an
+    earlier run."""
+    if os.path.exists(job_dir):
+        shutil.rmtree(job_dir)
+    for folder in ("claims", "results", "heartbeats", "logs"):
+        os.makedirs(os.path.join(job_dir, folder))
+    write_json(job, os.path.join(job_dir, "job.json"))
+
+
+def load_job(job_dir):
+    with open(os.path.join(job_dir, "job.json"), "r") as job_file:
+        return json.load(job_file)
+
+
+def claim_point(job_dir, model_tag, worker_name):
+    """Takes a point for a worker. Only one worker can claim each point.
+
+    Returns:
+        claimed (bool): True if this worker now owns the point.
+    """
+    if os.path.exists(_result_path(job_dir, model_tag)):
+        return False
+    try:
+        handle = os.open(
+            _claim_path(job_dir, model_tag), os.O_CREAT | os.O_EXCL | os.O_WRONLY
+        )
+    except FileExistsError:
+        return False
+    with os.fdopen(handle, "w") as claim_file:
+        json.dump({"worker": worker_name}, claim_file)
+    return True
+
+
+def read_claim(job_dir, model_tag):
+    """The worker of a claimed point, or None if unclaimed. The time it was
+    claimed is the modification time of the claim file."""
+    try:
+        with open(_claim_path(job_dir, model_tag), "r") as claim_file:
+            return json.load(claim_file)
+    except (OSError, ValueError):
+        # Missing, or still being written.
+        return None
+
+
+def release_claim(job_dir, model_tag):
+    """Makes a point available to the other workers again."""
+    try:
+        os.remove(_claim_path(job_dir, model_tag))
+    except FileNotFoundError:
+        pass
+
+
+def next_point(job_dir, job, worker_name):
+    """Claims the next point for a worker. Its own partition is run first, then
+    it takes unclaimed points from the other partitions, so fast or surviving
+    hosts pick up the work of slow or failed ones.
+
+    Returns:
+        model_tag (str): The claimed point, or None if there is nothing left.
+    """
+    own = job["partitions"].get(worker_name, [])
+    others = [tag for tag in job["points"] if tag not in own]
+    for model_tag in own + others:
+        if claim_point(job_dir, model_tag, worker_name):
+            return model_tag
+    return None
+
+
+def start_heartbeat(path, interval):
+    """Touches a heartbeat file every interval from a separate shell process,
+    while this process is alive. A thread would stop beating while a long
+    FreeCAD operation holds the GIL, which looks the same as a hung worker.
+
+    Args:
+        path (str): The heartbeat file.
+        interval (float): Time between heartbeats (s).
+
+    Returns:
+        process (subprocess.Popen): The heartbeat process.
+    """
+    script = "".join(
+        [
+            "while kill -0 ",
+            str(os.getpid()),
+            " 2>/dev/null; do touch ",
+            shlex.quote(path),
+            "; sleep ",
+            str(interval),
+            "; done",
+        ]
+    )
+    return subprocess.Popen(["sh", "-c", script])
+
+
+def run_worker(job_dir, worker_name):
+    """Runs points of a distributed sweep until none are left. This is what
+    each host runs under FreeCADCmd.
+
+    Args:
+        job_dir (str): The job folder.
+        worker_name (str): Unique name of this worker.
+
+    Returns:
+        count (int): The number of points run.
+    """
+    job = load_job(job_dir)
+    model_function = load_function(job["model_function"])
+    constraint_check = load_function(job["constraint_check"])
+    # The heartbeat keeps going during long points, so the coordinator can
+    # tell a busy worker from a dead host.
+    beat = start_heartbeat(
+        _heartbeat_path(job_dir, worker_name), job["heartbeat_interval"]
+    )
+    count = 0
+    try:
+        while True:
+            model_tag = next_point(job_dir, job, worker_name)
+            if model_tag is None:
+                break
+            print("Worker ", worker_name, " running ", model_tag)
+            inputs = decode(job["input_params"])
+            inputs[job["sweep_variable"]] = decode(job["points"][model_tag])
+            start_time = time.time()
+            try:
+                status, messages, rss, reads = run_sweep_point(
+                    job["model_name"],
+                    model_function,
+                    inputs,
+                    job["output_path"],
+                    model_tag,
+                    job["accuracy"],
+                    job["just_cad"],
+                    constraint_check,
+                    job["clear_caches"],
+                    job["mesh_limits"],
+                    job["materials"],
+                    register_run=False,
+                )
+            except Exception as e:
+                status, messages, rss, reads = FAILED, [repr(e)], None, None
+            write_json(
+                {
+                    "status": status,
+                    "messages": messages,
+                    "duration": time.time() - start_time,
+                    "rss_mb": rss,
+                    "reads": reads,
+                    "worker": worker_name,
+                },
+                _result_path(job_dir, model_tag),
+            )
+            count += 1
+    finally:
+        beat.terminate()
+        beat.wait()
+    return count
+
+
+def worker_command(job_dir, worker_name, freecad_cmd="FreeCADCmd"):
+    """The command which runs a worker.
+
+    Args:
+        job_dir (str): The job folder.
+        worker_name (str): Unique name of the worker.
+        freecad_cmd (str): The FreeCAD command line executable. Any python
+                           which can import FreeCAD also works.
+
+    Returns:
+        command (list): The program and its arguments.
+    """
+    code = "".join(
+        [
+            "from FreeCAD_geometry_generation.distributed_sweep import run_worker; ",
+            "run_worker(",
+            repr(job_dir),
+            ", ",
+            repr(worker_name),
+            ")",
+        ]
+    )
+    return [freecad_cmd, "-c", code]
+
+
+def launch_worker(host, job_dir, worker_name, freecad_cmd="FreeCADCmd"):
+    """Starts a worker on a host. Local hosts run it directly, others over ssh
+    (which needs key based login). The output goes to the logs folder of the job.
+
+    Args:
+        host (str): The host name, or 'local'.
+        job_dir (str): The job folder, at the same path on every host.
+        worker_name (str): Unique name of the worker.
+        freecad_cmd (str): The FreeCAD command line executable on the host.
+
+    Returns:
+        process (subprocess.Popen): The worker, or the ssh session running it.
+    """
+    # The folder containing FreeCAD_geometry_generation, which is also shared.
+    code_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command = worker_command(job_dir, worker_name, freecad_cmd)
+    log_file = open(os.path.join(job_dir, "logs", "".join([worker_name, ".log"])), "w")
+    try:
+        if host in LOCAL_HOSTS:
+            environment = dict(os.environ)
+            environment["PYTHONPATH"] = os.pathsep.join(
+                [code_root] + [p for p in [environment.get("PYTHONPATH")] if p]
+            )
+            return subprocess.Popen(
+                command,
+                env=environment,
+                cwd=code_root,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+            )
+        remote = " ".join(
+            [
+                "cd",
+                shlex.quote(code_root),
+                "&& env",
+                shlex.quote("".join(["PYTHONPATH=", code_root])),
+            ]
+            + [shlex.quote(part) for part in command]
+        )
+        # A terminal (-tt) makes the remote worker stop when the session is killed.
+        return subprocess.Popen(
+            ["ssh", "-tt", "-o", "BatchMode=yes", host, remote],
+            stdin=subprocess.DEVNULL,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+        )
+    finally:
+        # The child has its own copy.
+        log_file.close()
+
+
+def register_results(output_path, model_name, model_tags):
+    """Adds the runs of finished points to the index and catalogue in
+    output_path, from the sidecars the workers wrote.
+
+    Args:
+        output_path (str): The location all the output files were written to.
+        model_name (str): Name of the model.
+        model_tags (list): The points to add.
+
+    Returns:
+        count (int): The number of runs added.
+    """
+    count = 0
+    for model_tag in model_tags:
+        output_loc = os.path.join(output_path, "".join([model_name, "_", model_tag]))
+        sidecar_file = sidecar_path(output_loc, model_name, model_tag)
+        if not os.path.exists(sidecar_file):
+            print("Missing sidecar ", sidecar_file)
+            continue
+        with open(sidecar_file, "r") as json_file:
+            sidecar = json.load(json_file)
+        fcstd_file = os.path.join(
+            output_loc, "".join([model_name, "_", model_tag, ".FCStd"])
+        )
+        append_to_index(output_path, sidecar, sidecar_file)
+        record_run(output_path, sidecar, sidecar_file, fcstd_file)
+        count += 1
+    return count
+
+
+def shared_clock(job_dir):
+    """The current time of the shared filesystem, found by touching a
+    reference file in the job folder.
+
+    Args:
+        job_dir (str): The job folder.
+
+    Returns:
+        now (float): The modification time of the reference file.
+    """
+    with open(_clock_path(job_dir), "a"):
+        pass
+    os.utime(_clock_path(job_dir), None)
+    return os.path.getmtime(_clock_path(job_dir))
+
+
+def _file_age(path, now):
+    """Time since a file in the job folder was modified, or None if it is missing."""
+    try:
+        return now - os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _stop_process(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def distributed_parameter_sweep(
+    model_name,
+    model_function,
+    input_params,
+    output_path,
+    sweep_variable,
+    sweep_vals,
+    hosts,
+    accuracy=5,
+    just_cad=0,
+    constraint_check=None,
+    timeout=None,
+    resume=False,
+    retry_failed=False,
+    clear_caches=False,
+    mesh_limits=None,
+    materials=None,
+    freecad_cmd="FreeCADCmd",
+    max_attempts=2,
+    max_worker_failures=2,
+    heartbeat_interval=10,
+    heartbeat_timeout=120,
+    poll_interval=2,
+):
+    """Runs a parameter sweep (see parameter_sweep) on several hosts which share
+    output_path. The points are split between the hosts, and a host which
+    finishes early takes the remaining points of the others. The points of a
+    worker which dies, stops sending heartbeats or runs over the timeout are
+    given to the other workers, and it is restarted until it has failed
+    max_worker_failures times.
+    The sweep manifest is kept up to date, so an interrupted sweep can be
+    resumed with either this or parameter_sweep. The completed points are
+    added to the run index and catalogue at the end (see register_results).
+
+    Args:
+        model_name (str): Name of the current model.
+        model_function (function handle): The model. It has to be at the top level
+                                          of a module the hosts can import.
+        input_params (dict): A dictionary containing the names and values of the input
+                             parameters of the model.
+        output_path (str): The location all the output files will be written to.
+                           It has to be at the same path on every host.
+        sweep_variable (str): Name found in the input_params dictionary.
+        sweep_vals (list): A list of values for the swept parameter to take.
+        hosts (list): Host names. 'local' runs a worker on this machine, so
+                      ['local', 'local'] tests the sweep with two local workers.
+        accuracy (int): Represents the fineness of the mesh. bigger number = finer mesh
+        just_cad(int): selects if the STL files are generated.
+        constraint_check (function handle): Takes the parsed input parameters and
+                                            returns a list of problems. It has to
+                                            be importable, as model_function.
+        timeout (float): Time allowed for each point (s).
+        resume (bool): Only run the points which the manifest of a previous run
+                       has not finished.
+        retry_failed (bool): When resuming also rerun the points which failed.
+        clear_caches (bool): Empty the shape caches after every point.
+        mesh_limits (dict): Limits on the mesh quality (see mesh_quality).
+        materials (dict): The material of each part (see solver_exporters).
+        freecad_cmd (str): The FreeCAD command line executable on the hosts.
+        max_attempts (int): Number of times a point is started before it is
+                            marked failed, if its worker keeps dying.
+        max_worker_failures (int): Number of failures after which a worker is
+                                   not restarted.
+        heartbeat_interval (float): Time between worker heartbeats (s).
+        heartbeat_timeout (float): Time without a heartbeat before a worker is
+                                   taken to be dead (s).
+        poll_interval (float): Time between checks of the job folder (s).
+
+    Returns:
+        rejected (dict): The problems found for each skipped model, keyed on the
+                         model tag.
+    """
+    if sweep_variable not in input_params:
+        raise ValueError(
+            "".join(
+                (
+                    "The variable to be swept does not exist in the ",
+                    "input parameters dictionary.",
+                )
+            )
+        )
+    if not hosts:
+        raise ValueError("At least one host is needed.")
+    points = [
+        (sweep_model_tag(sweep_variable, sweep_val), sweep_val)
+        for sweep_val in sweep_vals
+    ]
+    manifest_file = manifest_path(output_path, model_name, sweep_variable)
+    manifest = load_manifest(manifest_file) if resume else None
+    if manifest is None:
+        manifest = new_manifest(
+            model_name,
+            sweep_variable,
+            [(model_tag, str(sweep_val)) for model_tag, sweep_val in points],
+        )
+    else:
+        for model_tag, sweep_val in points:
+            add_point(manifest, model_tag, str(sweep_val))
+    write_manifest(manifest, manifest_file)
+    to_run = unfinished_points(manifest, retry_failed=retry_failed)
+    for model_tag, sweep_val in points:
+        if model_tag not in to_run:
+            print("Already run ", model_tag)
+
+    workers = {"".join([host, "_", str(n)]): host for n, host in enumerate(hosts)}
+    job_dir = job_folder(output_path, model_name, sweep_variable)
+    job = {
+        "model_name": model_name,
+        "model_function": function_name(model_function),
+        "constraint_check": function_name(constraint_check),
+        "input_params": encode(input_params),
+        "sweep_variable": sweep_variable,
+        "output_path": os.path.abspath(output_path),
+        "accuracy": accuracy,
+        "just_cad": just_cad,
+        "clear_caches": clear_caches,
+        "mesh_limits": mesh_limits,
+        "materials": materials,
+        "heartbeat_interval": heartbeat_interval,
+        "points": {
+            model_tag: encode(sweep_val)
+            for model_tag, sweep_val in points
+            if model_tag in to_run
+        },
+        "partitions": partition_points(
+            [model_tag for model_tag, _ in points if model_tag in to_run],
+            list(workers),
+        ),
+    }
+    write_job(job_dir, job)
+
+    remaining = set(job["points"])
+    completed = []
+    rejected = {}
+    started = {}
+    failures = {worker_name: 0 for worker_name in workers}
+    processes = {}
+    try:
+        while remaining:
+            # Record finished points.
+            for model_tag in sorted(remaining):
+                result_file = _result_path(job_dir, model_tag)
+                if not os.path.exists(result_file):
+                    continue
+                with open(result_file, "r") as json_file:
+                    result = json.load(json_file)
+                if model_tag not in started:
+                    update_point(manifest, manifest_file, model_tag, RUNNING)
+                update_point(
+                    manifest,
+                    manifest_file,
+                    model_tag,
+                    result["status"],
+                    messages=result["messages"],
+                    duration=result["duration"],
+                    rss_mb=result["rss_mb"],
+                    reads=result["reads"],
+                    host=workers.get(result["worker"]),
+                )
+                if result["status"] == REJECTED:
+                    rejected[model_tag] = result["messages"]
+                elif result["status"] == COMPLETED:
+                    completed.append(model_tag)
+                print(model_tag, " ", result["status"], " on ", result["worker"])
+                remaining.discard(model_tag)
+                started.pop(model_tag, None)
+            # Record newly claimed points.
+            claims = {}
+            for model_tag in remaining:
+                claim = read_claim(job_dir, model_tag)
+                if claim is None:
+                    continue
+                claims[model_tag] = claim
+                if started.get(model_tag) != claim["worker"]:
+                    started[model_tag] = claim["worker"]
+                    update_point(manifest, manifest_file, model_tag, RUNNING)
+            # Find dead, silent or hung workers.
+            now = shared_clock(job_dir)
+            for worker_name, process in list(processes.items()):
+                reason = None
+                exit_code = process.poll()
+                age = _file_age(_heartbeat_path(job_dir, worker_name), now)
+                if exit_code is not None:
+                    if exit_code != 0:
+                        reason = "".join(["exited with code ", str(exit_code)])
+                elif age is not None and age > heartbeat_timeout:
+                    reason = "".join(["sent no heartbeat for ", str(int(age)), "s"])
+                elif timeout is not None:
+                    for model_tag, claim in claims.items():
+                        claim_age = _file_age(_claim_path(job_dir, model_tag), now)
+                        if (
+                            claim["worker"] == worker_name
+                            and claim_age is not None
+                            and claim_age > timeout
+                        ):
+                            reason = "".join(
+                                ["timed out after ", str(timeout), "s on ", model_tag]
+                            )
+                if exit_code is not None and reason is None:
+                    del processes[worker_name]
+                    continue
+                if reason is None:
+                    continue
+                host = workers[worker_name]
+                print("Worker ", worker_name, " on ", host, " ", reason)
+                _stop_process(process)
+                del processes[worker_name]
+                failures[worker_name] += 1
+                # Give its points to the other workers.
+                for model_tag, claim in claims.items():
+                    if claim["worker"] != worker_name:
+                        continue
+                    started.pop(model_tag, None)
+                    point = manifest["points"][model_tag]
+                    message = "".join(["Worker on ", host, " ", reason])
+                    if point["attempts"] >= max_attempts:
+                        # The claim is kept, so no other worker takes the point.
+                        update_point(
+                            manifest,
+                            manifest_file,
+                            model_tag,
+                            FAILED,
+                            messages=point["messages"] + [message],
+                            host=host,
+                        )
+                        remaining.discard(model_tag)
+                    else:
+                        update_point(
+                            manifest,
+                            manifest_file,
+                            model_tag,
+                            PENDING,
+                            messages=point["messages"] + [message],
+                        )
+                        release_claim(job_dir, model_tag)
+            # (Re)start workers while there are points nobody has claimed.
+            unclaimed = [
+                tag
+                for tag in remaining
+                if read_claim(job_dir, tag) is None
+                and not os.path.exists(_result_path(job_dir, tag))
+            ]
+            if unclaimed:
+                for worker_name, host in workers.items():
+                    if (
+                        worker_name not in processes
+                        and failures[worker_name] < max_worker_failures
+                    ):
+                        # A heartbeat left by an earlier worker would look stale.
+                        if os.path.exists(_heartbeat_path(job_dir, worker_name)):
+                            os.remove(_heartbeat_path(job_dir, worker_name))
+                        processes[worker_name] = launch_worker(
+                            host, job_dir, worker_name, freecad_cmd
+                        )
+            if not processes and remaining:
+                if any(os.path.exists(_result_path(job_dir, tag)) for tag in remaining):
+                    continue
+                print("No workers left to run the sweep on. Resume it to run the rest.")
+                break
+            time.sleep(poll_interval)
+    finally:
+        for process in processes.values():
+            _stop_process(process)
+        # Also done if the sweep is interrupted, so the points which finished
+        # can be found.
+        register_results(job["output_path"], model_name, completed)
+    print("Sweep status ", summarise_manifest(manifest))
+    return rejected
+
+
+def smoke_test_model(input_parameters):
+    """A plain beam pipe, which is quick to build and mesh."""
+    try:
+        wire, face = make_circular_aperture(input_parameters["pipe_radius"])
+        pipe = make_beampipe(face, input_parameters["pipe_length"])
+    except Exception as e:
+        raise ModelException(e)
+    return {"vac": pipe}
+
+
+def local_smoke_test(
+    output_path,
+    sweep_vals=("30mm", "40mm", "50mm", "60mm"),
+    freecad_cmd="FreeCADCmd",
+):
+    """Runs a small distributed sweep with two worker processes on this
+    machine, then checks that every point completed and was added to the run
+    index and catalogue exactly once.
+
+    Args:
+        output_path (str): The location the output files are written to.
+        sweep_vals (list): The pipe lengths to sweep.
+        freecad_cmd (str): The FreeCAD command line executable.
+
+    Returns:
+        problems (list): Description of anything which went wrong.
+    """
+    model_name = "distributed_smoke_test"
+    sweep_variable = "pipe_length"
+    distributed_parameter_sweep(
+        model_name,
+        smoke_test_model,
+        SMOKE_TEST_PARAMETERS,
+        output_path,
+        sweep_variable,
+        sweep_vals,
+        hosts=["local", "local"],
+        freecad_cmd=freecad_cmd,
+        poll_interval=0.5,
+    )
+    tags = [sweep_model_tag(sweep_variable, sweep_val) for sweep_val in sweep_vals]
+    manifest = load_manifest(manifest_path(output_path, model_name, sweep_variable))
+    problems = [
+        "".join([tag, " is ", manifest["points"][tag]["status"]])
+        for tag in tags
+        if manifest["points"][tag]["status"] != COMPLETED
+    ]
+    # load_index drops repeated entries, so the index file is read directly.
+    with open(os.path.join(output_path, INDEX_NAME), "r") as index_file:
+        indexed = [json.loads(line) for line in index_file]
+    indexed = [run["tag"] for run in indexed if run["model_name"] == model_name]
+    catalogued = [
+        run["tag"] for run in query_catalogue(output_path, model_name=model_name)
+    ]
+    for tag in tags:
+        if indexed.count(tag) != 1:
+            problems.append(
+                "".join([tag, " is in the index ", str(indexed.count(tag)), " times"])
+            )
+        if catalogued.count(tag) != 1:
+            problems.append(
+                "".join(
+                    [tag, " is in the catalogue ", str(catalogued.count(tag)), " times"]
+                )
+            )
+    workers = set()
+    job_dir = job_folder(output_path, model_name, sweep_variable)
+    for tag in tags:
+        if os.path.exists(_result_path(job_dir, tag)):
+            with open(_result_path(job_dir, tag), "r") as json_file:
+                workers.add(json.load(json_file)["worker"])
+    print("Points run by ", ", ".join(sorted(workers)))
+    return problems
+
+
+if __name__ == "__main__":
+    # python -m FreeCAD_geometry_generation.distributed_sweep <output folder> [FreeCADCmd]
+    # The smoke test model is imported from the package, as the workers can not
+    # import functions defined in __main__.
+    from FreeCAD_geometry_generation.distributed_sweep import (
+        local_smoke_test as _local_smoke_test,
+    )
+
+    PROBLEMS = _local_smoke_test(argv[1], freecad_cmd=(argv[2:] or ["FreeCADCmd"])[0])
+    print("\n".join(PROBLEMS) if PROBLEMS else "Smoke test passed")
@@ -1,11 +1,19 @@
 from copy import deepcopy
-from math import asin, atan2, cos, log10, pi, sin, sqrt, tan
+from math import asin, atan2, log10, pi, sin, sqrt, tan
 
 # import Part
 from FreeCAD import Base, Draft, Units, Vector
 import Part
-from numpy import linspace
-
+from numpy import array, concatenate
+
+from FreeCAD_geometry_generation.aperture_outlines import (
+    adaptive_stations,
+    placed_profile_tracks,
+    polyline_to_wire,
+    rounded_end_path,
+    stripline_end_path,
+)
+from FreeCAD_geometry_generation.connector_library import cached_connector
 from FreeCAD_geometry_generation.freecad_apertures import (
     make_arc_aperture,
     make_rectangle_aperture,
@@ -19,9 +27,19 @@ from FreeCAD_geometry_generation.freecad_apertures import (
 )
 from FreeCAD_geometry_generation.freecad_operations import (
     make_beampipe,
+    make_placement,
     make_taper,
+    make_wall,
+    place,
     rotate_at,
 )
+from FreeCAD_geometry_generation.incremental_build import cached_build
+from FreeCAD_geometry_generation.task_graph import (
+    add_rotated_tasks,
+    add_task,
+    new_task_graph,
+    run_task_graph,
+)
 
 
 def rounded_curved_end(
@@ -32,41 +50,39 @@ def rounded_curved_end(
     end_aperture,
     main_aperture,
     taper_length,
+    n_points=51,
+    tolerance=None,
 ):
     y_radius = y_offset + thickness / 2.0
     end_radius = y_radius * sin((end_width / 2.0) / 180 * pi)  # chord /2
-    n_points = 51
-    points = []
-    ang_scale = linspace(
-        float(-pi / 2.0), float(pi / 2.0), num=n_points, endpoint=True
-    )  # angular spacing
-    for val in ang_scale:
-        z_point = float(end_radius) * sin(val)
-        x_point = -float(end_radius) + (float(end_radius) * cos(val))
-        fudge = "1.5mm"
-        temp_y_radius = y_radius - Units.Quantity(fudge)  # START HERE FIXME
-        y_point = float(temp_y_radius) * cos((end_radius / y_radius) * val) + float(
-            Units.Quantity(fudge)
-        )
-        points.append(Vector(x_point, y_point, z_point))
-
-    end_curve = Part.makePolygon(points)
-    end_wire = Part.Wire(end_curve)
+    fudge = "1.5mm"  # START HERE FIXME
+    ang_scale, path = rounded_end_path(
+        y_radius, end_radius, fudge=Units.Quantity(fudge), n_points=n_points
+    )
 
     cap1_out = []
     sweep_depth = end_radius / 2.0 + thickness * 2.0
-    for sd in range(len(ang_scale)):
-        cap1_wire, cap1_face = make_rounded_rectangle_aperture(
-            aperture_height=sweep_depth + blend_radius,
-            aperture_width=thickness,
-            corner_radius=blend_radius,
+    # The cap profile is the same at every point so it is only built once.
+    cap_profile, cap_face = make_rounded_rectangle_aperture(
+        aperture_height=sweep_depth + blend_radius,
+        aperture_width=thickness,
+        corner_radius=blend_radius,
+    )
+    cap_profile = rotate_at(cap_profile, rotation_angles=(90, 90, 0))
+    y_angles = ang_scale * 180 / pi * float(end_radius / y_radius)
+    if tolerance is not None:
+        # Each profile is turned about the X axis through its point.
+        tracks = placed_profile_tracks(
+            _wire_corners(cap_profile), path, y_angles, axis=0
         )
-        y_angle = ang_scale[sd] * 180 / pi * (end_radius / y_radius)
-        end_angle = ang_scale[sd] * 180 / pi
-        cap1_wire = rotate_at(cap1_wire, rotation_angles=(90, 90, 0))
-        cap1_wire.translate(points[sd])
-        # cap1_wire.rotate(points[sd], Base.Vector(0, 1, 0), -(end_angle))
-        cap1_wire.rotate(points[sd], Base.Vector(1, 0, 0), (y_angle))
+        stations = _adaptive_end_path(path, tracks, tolerance)
+        path, y_angles = path[stations], y_angles[stations]
+    points = [Vector(*point) for point in path]
+    end_wire = polyline_to_wire(path)
+    for point, y_angle in zip(points, y_angles):
+        cap1_wire = cap_profile.copy()
+        cap1_wire.translate(point)
+        cap1_wire.rotate(point, Base.Vector(1, 0, 0), float(y_angle))
         cap1_out.append(cap1_wire)
 
     makeSolid = True
@@ -108,7 +124,41 @@ def rounded_curved_end(
     return sweep, end_cap, end_wire, sweep_trim
 
 
-def stripline_curved_end(params):
+def _wire_corners(wire):
+    """The vertex co ordinates of a wire as an (n_vertices, 3) array."""
+    return array([(vertex.X, vertex.Y, vertex.Z) for vertex in wire.Vertices])
+
+
+def _adaptive_end_path(path, tracks, tolerance):
+    """Picks the stations of a dense end path needed for the swept surface to
+    stay within tolerance (mm) of it, and reports the error. The error is
+    measured on the path and on the tracks of the placed profile corners, so
+    the turning of the sections is included.
+
+    Returns:
+        stations (numpy array): Indices of the stations kept.
+    """
+    stations, error = adaptive_stations(
+        concatenate([path[None], tracks]),
+        float(getattr(tolerance, "Value", tolerance)),
+    )
+    print(
+        "".join(
+            [
+                "Using ",
+                str(len(stations)),
+                " of ",
+                str(len(path)),
+                " end sections, largest deviation of the section corners ",
+                str(round(error, 5)),
+                "mm",
+            ]
+        )
+    )
+    return stations
+
+
+def stripline_curved_end(params, n_points=51, tolerance=None):
     stripline_length = params["total_stripline_length"]
     stripline_width = params["stripline_width"]
     stripline_offset = params["stripline_offset"]
@@ -134,77 +184,73 @@ def stripline_curved_end(params):
         Vector(0, 1, 0),
     )
     end_curve_cap = end_box.cut(end_cylinder)
-    n_points = 51
-    points = []
-    pointsBottom = []
-    end_points = []
-    points_mid_end2 = []
-    y_level = []
-    angs = []
-    z_axis = []
-    ang_scale = linspace(
-        float(-pi / 2.0), float(pi / 2.0), num=n_points, endpoint=True
-    )  # angular spacing
-    for val in ang_scale:
-        z_axis.append(float(end_radius) * sin(val))
-    for z in z_axis:
-        x_point = (
-            stripline_length / 2.0
-            - end_radius
-            + Units.Quantity(
-                str(sqrt(end_radius**2.0 - Units.Quantity(str(z) + "mm") ** 2.0))
-                + "mm"
-            )
-        )
-        y_point = Units.Quantity(
-            str(sqrt((y_radius) ** 2.0 - Units.Quantity(str(z) + "mm") ** 2.0)) + "mm"
+    # The curve is sampled as plain floats in mm.
+    ang_scale, path = stripline_end_path(
+        stripline_length, y_radius, end_radius, n_points=n_points
+    )
+    # The cap profiles are the same at every point so they are only built once.
+    cap_wire, cap_face = make_truncated_arched_cutout_aperture(
+        aperture_height=arch_radius + Units.Quantity("10mm"),
+        centre_position=Units.Quantity("0.001mm"),
+        aperture_width=arch_radius + Units.Quantity("2mm"),
+        arc_radius=arch_radius,
+    )
+    cap1_profile = rotate_at(cap_wire.copy(), rotation_angles=(90, 180, 0))
+    cap2_profile = rotate_at(cap_wire.copy(), rotation_angles=(-90, 0, 0))
+    # The angles are in radians but have always been used as degrees here.
+    y_angles = -(ang_scale + 90)
+    if tolerance is not None:
+        # n_points then sets the dense reference the sections are picked from.
+        # Each profile is turned about the Y axis through its point.
+        tracks = concatenate(
+            [
+                placed_profile_tracks(
+                    _wire_corners(cap1_profile),
+                    path + array([0, 0.125, 0]),
+                    y_angles,
+                    axis=1,
+                ),
+                placed_profile_tracks(
+                    _wire_corners(cap2_profile),
+                    path - array([0, 0.125, 0]),
+                    y_angles,
+                    axis=1,
+                ),
+            ]
         )
-        if not points:
-            y_level.append(y_point)
-
-        points.append(Vector(x_point, y_point + Units.Quantity("0.125mm"), z))
-        pointsBottom.append(Vector(x_point, y_point - Units.Quantity("0.125mm"), z))
-        end_points.append(Vector(x_point, y_level[0] - Units.Quantity("5mm"), z))
-        points_mid_end2.append(
-            Vector(
-                x_point + Units.Quantity("10mm"), y_level[0] - Units.Quantity("5mm"), z
-            )
+        stations = _adaptive_end_path(path, tracks, tolerance)
+        path, y_angles = path[stations], y_angles[stations]
+    points = path + array([0, 0.125, 0])
+    points_bottom = path - array([0, 0.125, 0])
+    end_points = path.copy()
+    end_points[:, 1] = path[0, 1] - 5
+    end_points = concatenate(
+        (
+            end_points,
+            end_points[[-1, 0]] + array([10, 0, 0]),
+            end_points[:1],
         )
-    end_points.append(points_mid_end2[-1])
-    end_points.append(points_mid_end2[0])
-    end_points.append(end_points[0])
-    end_curve = Part.makePolygon(end_points)
-    end_wire = Part.Wire(end_curve)
-    end_face = Part.Face(end_wire)
+    )
+    end_curve = polyline_to_wire(end_points)
+    end_face = Part.Face(end_curve)
     end_solid = end_face.extrude(Base.Vector(0, 10, 0))
 
     makeSolid = True
     cap1_out = []
-    cap1_out1 = []
     cap2_out = []
-    for sd in range(len(z_axis)):
-        cap1_wire, cap1_face = make_truncated_arched_cutout_aperture(
-            aperture_height=arch_radius + Units.Quantity("10mm"),
-            centre_position=Units.Quantity("0.001mm"),
-            aperture_width=arch_radius + Units.Quantity("2mm"),
-            arc_radius=arch_radius,
+    for top, bottom, y_angle in zip(points, points_bottom, y_angles):
+        cap1_out.append(
+            place(
+                cap1_profile.copy(),
+                make_placement(loc=top, rotation_angles=(0, y_angle, 0)),
+            )
         )
-
-        cap1_wire = rotate_at(cap1_wire, rotation_angles=(90, 180, 0))
-        cap1_wire.translate(points[sd])
-        cap1_wire.rotate(points[sd], Base.Vector(0, 1, 0), -(ang_scale[sd] + 90))
-        cap1_out.append(cap1_wire)
-
-        cap2_wire, cap2_face = make_truncated_arched_cutout_aperture(
-            aperture_height=arch_radius + Units.Quantity("10mm"),
-            centre_position=Units.Quantity("0.001mm"),
-            aperture_width=arch_radius + Units.Quantity("2mm"),
-            arc_radius=arch_radius,
+        cap2_out.append(
+            place(
+                cap2_profile.copy(),
+                make_placement(loc=bottom, rotation_angles=(0, y_angle, 0)),
+            )
         )
-        cap2_wire = rotate_at(cap2_wire, rotation_angles=(-90, 0, 0))
-        cap2_wire.translate(pointsBottom[sd])
-        cap2_wire.rotate(pointsBottom[sd], Base.Vector(0, 1, 0), -(ang_scale[sd] + 90))
-        cap2_out.append(cap2_wire)
     print("Apertures constructed")
     sweep = Part.makeLoft(cap1_out, True, False)
     print("Loft 1 completed")
@@ -307,156 +353,92 @@ def sma_connector(pin_length=20e-3, rotation=(0, 1, 0), location=(0, 0, 0)):
     return parts
 
 
-def connector_parameterised(
-    input_parameters,
-    rotation=(Units.Quantity("0deg"), Units.Quantity("0deg"), Units.Quantity("0deg")),
-    location=(Units.Quantity("0mm"), Units.Quantity("0mm"), Units.Quantity("0mm")),
-    rotate_around_zero=(
-        Units.Quantity("0 deg"),
-        Units.Quantity("0 deg"),
-        Units.Quantity("0 deg"),
-    ),
-):
-    # Reference plane is the lower side of the ceramic (vacuum side down).
-    # pin_length is the length from the base of the ceramic into the vacuum.
+# The inputs of connector_parameterised which change its geometry.
+_CONNECTOR_PARAMETERS = (
+    "pin_radius",
+    "pin_length",
+    "ceramic_radius",
+    "ceramic_inner_radius",
+    "ceramic_thickness",
+    "shell_upper_radius",
+    "shell_upper_inner_radius",
+    "shell_upper_thickness",
+    "shell_lower_radius",
+    "shell_lower_inner_radius",
+    "shell_lower_thickness",
+)
+
 
+def _connector_parameterised_parts(input_parameters):
+    """Builds the parts of connector_parameterised at the origin."""
     pin = Part.makeCylinder(
         input_parameters["pin_radius"],
         input_parameters["pin_length"]
         + input_parameters["ceramic_thickness"]
         + input_parameters["shell_upper_thickness"],
-        Base.Vector(
-            location[0], location[1] - input_parameters["pin_length"], location[2]
-        ),
+        Base.Vector(0, -input_parameters["pin_length"], 0),
         Base.Vector(0, 1, 0),
     )
-    pin = rotate_at(
-        shp=pin,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     vac = Part.makeCylinder(
         input_parameters["shell_lower_inner_radius"],
         input_parameters["pin_length"],
-        Base.Vector(
-            location[0], location[1] - input_parameters["pin_length"], location[2]
-        ),
+        Base.Vector(0, -input_parameters["pin_length"], 0),
         Base.Vector(0, 1, 0),
     )
-    vac = rotate_at(
-        shp=vac,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     ceramic1 = Part.makeCylinder(
         input_parameters["ceramic_radius"],
         input_parameters["ceramic_thickness"],
-        Base.Vector(location[0], location[1], location[2]),
+        Base.Vector(0, 0, 0),
         Base.Vector(0, 1, 0),
     )
     if input_parameters["ceramic_inner_radius"]:
         ceramic_hole = Part.makeCylinder(
             input_parameters["ceramic_inner_radius"],
             input_parameters["ceramic_thickness"],
-            Base.Vector(location[0], location[1], location[2]),
+            Base.Vector(0, 0, 0),
             Base.Vector(0, 1, 0),
         )
         ceramic1 = ceramic1.cut(ceramic_hole)
-    ceramic1 = rotate_at(
-        shp=ceramic1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     if input_parameters["ceramic_inner_radius"]:
         pin = pin.cut(ceramic1)
 
     air1 = Part.makeCylinder(
         input_parameters["shell_upper_inner_radius"],
         input_parameters["shell_upper_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] + input_parameters["ceramic_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, input_parameters["ceramic_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    air1 = rotate_at(
-        shp=air1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
 
     shell_upper1 = Part.makeCylinder(
         input_parameters["shell_upper_radius"],
         input_parameters["shell_upper_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] + input_parameters["ceramic_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, input_parameters["ceramic_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    shell_upper1 = rotate_at(
-        shp=shell_upper1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_upper2 = Part.makeCylinder(
         input_parameters["shell_upper_inner_radius"],
         input_parameters["shell_upper_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] + input_parameters["ceramic_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, input_parameters["ceramic_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    shell_upper2 = rotate_at(
-        shp=shell_upper2,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_middle1 = Part.makeCylinder(
         input_parameters["shell_upper_radius"],
         input_parameters["ceramic_thickness"],
-        Base.Vector(location[0], location[1], location[2]),
+        Base.Vector(0, 0, 0),
         Base.Vector(0, 1, 0),
     )
-    shell_middle1 = rotate_at(
-        shp=shell_middle1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_lower1 = Part.makeCylinder(
         input_parameters["shell_lower_radius"],
         input_parameters["shell_lower_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] - input_parameters["shell_lower_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, -input_parameters["shell_lower_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    shell_lower1 = rotate_at(
-        shp=shell_lower1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_lower2 = Part.makeCylinder(
         input_parameters["shell_lower_inner_radius"],
         input_parameters["shell_lower_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] - input_parameters["shell_lower_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, -input_parameters["shell_lower_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    shell_lower2 = rotate_at(
-        shp=shell_lower2,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_middle = shell_middle1.cut(ceramic1)
     ceramic = ceramic1.cut(pin)
     shell_lower3 = shell_lower1.cut(shell_lower2)
@@ -466,79 +448,58 @@ def connector_parameterised(
     air = air1.cut(pin)
     air = air.cut(outer)
 
-    rotate_at(
-        shp=outer,
-        rotation_angles=(
-            rotate_around_zero[0],
-            rotate_around_zero[1],
-            rotate_around_zero[2],
-        ),
-    )
-    rotate_at(
-        shp=ceramic,
-        rotation_angles=(
-            rotate_around_zero[0],
-            rotate_around_zero[1],
-            rotate_around_zero[2],
-        ),
-    )
-    rotate_at(
-        shp=air,
-        rotation_angles=(
-            rotate_around_zero[0],
-            rotate_around_zero[1],
-            rotate_around_zero[2],
-        ),
-    )
-    rotate_at(
-        shp=pin,
-        rotation_angles=(
-            rotate_around_zero[0],
-            rotate_around_zero[1],
-            rotate_around_zero[2],
-        ),
-    )
-    rotate_at(
-        shp=vac,
-        rotation_angles=(
-            rotate_around_zero[0],
-            rotate_around_zero[1],
-            rotate_around_zero[2],
-        ),
-    )
-
     parts = {"pin": pin, "ceramic": ceramic, "outer": outer, "air": air, "vac": vac}
     return parts
 
 
-def ntype_connector50Ohm(
-    pin_length="20mm",
+def _placed_connector_parameterised(
+    input_parameters, rotation, location, rotate_around_zero, pin_length
+):
+    """Builds connector_parameterised and moves it into place."""
+    connector_parameters = {
+        name: input_parameters[name]
+        for name in _CONNECTOR_PARAMETERS
+        if name != "pin_length"
+    }
+    if pin_length is None:
+        pin_length = input_parameters["pin_length"]
+    connector_parameters["pin_length"] = pin_length
+    parts = cached_connector(_connector_parameterised_parts, connector_parameters)
+    # The parts are built around the origin and moved into place in one step.
+    placement = make_placement(rotation_angles=rotate_around_zero).multiply(
+        make_placement(loc=location, rotation_angles=rotation)
+    )
+    for part in parts.values():
+        place(part, placement)
+    return parts
+
+
+def connector_parameterised(
+    input_parameters,
     rotation=(Units.Quantity("0deg"), Units.Quantity("0deg"), Units.Quantity("0deg")),
     location=(Units.Quantity("0mm"), Units.Quantity("0mm"), Units.Quantity("0mm")),
-    ceramic_radius=Units.Quantity("3.5mm"),
-    ceramic_thickness=Units.Quantity("5mm"),
-    shell_lower_thickness=Units.Quantity("5mm"),
-    shell_upper_thickness=Units.Quantity("10mm"),
     rotate_around_zero=(
         Units.Quantity("0 deg"),
         Units.Quantity("0 deg"),
         Units.Quantity("0 deg"),
     ),
+    pin_length=None,
 ):
     # Reference plane is the lower side of the ceramic (vacuum side down).
     # pin_length is the length from the base of the ceramic into the vacuum.
-    input_parameters = {
-        "pin_radius": "1.75mm",
-        "pin_length": pin_length,
-        "ceramic_radius": ceramic_radius,
-        "ceramic_thickness": ceramic_thickness,
-        "shell_upper_radius": "8mm",
-        "shell_upper_thickness": shell_upper_thickness,
-        "shell_upper_inner_radius": "4.015mm",
-        "shell_lower_radius": "5mm",
-        "shell_lower_thickness": shell_lower_thickness,
-        "shell_lower_inner_radius": "4.015mm",
-    }
+    # If it is not given input_parameters["pin_length"] is used.
+    return cached_build(
+        _placed_connector_parameterised,
+        input_parameters,
+        rotation=rotation,
+        location=location,
+        rotate_around_zero=rotate_around_zero,
+        pin_length=pin_length,
+    )
+
+
+def _ntype_connector50Ohm_parts(input_parameters):
+    """Builds the parts of ntype_connector50Ohm at the origin."""
     for n in input_parameters.keys():
         if type(input_parameters[n]) is list:
             for eh in range(len(input_parameters[n])):
@@ -552,115 +513,53 @@ def ntype_connector50Ohm(
         input_parameters["pin_length"]
         + input_parameters["ceramic_thickness"]
         + input_parameters["shell_upper_thickness"],
-        Base.Vector(
-            location[0], location[1] - input_parameters["pin_length"], location[2]
-        ),
+        Base.Vector(0, -input_parameters["pin_length"], 0),
         Base.Vector(0, 1, 0),
     )
-    pin = rotate_at(
-        shp=pin,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
 
     ceramic1 = Part.makeCylinder(
         input_parameters["ceramic_radius"],
         input_parameters["ceramic_thickness"],
-        Base.Vector(location[0], location[1], location[2]),
+        Base.Vector(0, 0, 0),
         Base.Vector(0, 1, 0),
     )
-    ceramic1 = rotate_at(
-        shp=ceramic1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     air1 = Part.makeCylinder(
         input_parameters["shell_upper_inner_radius"],
         input_parameters["shell_upper_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] + input_parameters["ceramic_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, input_parameters["ceramic_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    air1 = rotate_at(
-        shp=air1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
 
     shell_upper1 = Part.makeCylinder(
         input_parameters["shell_upper_radius"],
         input_parameters["shell_upper_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] + input_parameters["ceramic_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, input_parameters["ceramic_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    shell_upper1 = rotate_at(
-        shp=shell_upper1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_upper2 = Part.makeCylinder(
         input_parameters["shell_upper_inner_radius"],
         input_parameters["shell_upper_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] + input_parameters["ceramic_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, input_parameters["ceramic_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    shell_upper2 = rotate_at(
-        shp=shell_upper2,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_middle1 = Part.makeCylinder(
         input_parameters["shell_upper_radius"],
         input_parameters["ceramic_thickness"],
-        Base.Vector(location[0], location[1], location[2]),
+        Base.Vector(0, 0, 0),
         Base.Vector(0, 1, 0),
     )
-    shell_middle1 = rotate_at(
-        shp=shell_middle1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_lower1 = Part.makeCylinder(
         input_parameters["shell_lower_radius"],
         input_parameters["shell_lower_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] - input_parameters["shell_lower_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, -input_parameters["shell_lower_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    shell_lower1 = rotate_at(
-        shp=shell_lower1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_lower2 = Part.makeCylinder(
         input_parameters["shell_lower_inner_radius"],
         input_parameters["shell_lower_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] - input_parameters["shell_lower_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, -input_parameters["shell_lower_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    shell_lower2 = rotate_at(
-        shp=shell_lower2,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_middle = shell_middle1.cut(ceramic1)
     ceramic = ceramic1.cut(pin)
     shell_lower3 = shell_lower1.cut(shell_lower2)
@@ -670,62 +569,50 @@ def ntype_connector50Ohm(
     air = air1.cut(pin)
     air = air.cut(outer)
 
-    rotate_at(
-        shp=outer,
-        rotation_angles=(
-            rotate_around_zero[0],
-            rotate_around_zero[1],
-            rotate_around_zero[2],
-        ),
-    )
-    rotate_at(
-        shp=ceramic,
-        rotation_angles=(
-            rotate_around_zero[0],
-            rotate_around_zero[1],
-            rotate_around_zero[2],
-        ),
-    )
-    rotate_at(
-        shp=air,
-        rotation_angles=(
-            rotate_around_zero[0],
-            rotate_around_zero[1],
-            rotate_around_zero[2],
-        ),
-    )
-    rotate_at(
-        shp=pin,
-        rotation_angles=(
-            rotate_around_zero[0],
-            rotate_around_zero[1],
-            rotate_around_zero[2],
-        ),
-    )
-
     parts = {"pin": pin, "ceramic": ceramic, "outer": outer, "air": air}
     return parts
 
 
-def ntype_connector(
+def ntype_connector50Ohm(
     pin_length="20mm",
     rotation=(Units.Quantity("0deg"), Units.Quantity("0deg"), Units.Quantity("0deg")),
     location=(Units.Quantity("0mm"), Units.Quantity("0mm"), Units.Quantity("0mm")),
+    ceramic_radius=Units.Quantity("3.5mm"),
+    ceramic_thickness=Units.Quantity("5mm"),
+    shell_lower_thickness=Units.Quantity("5mm"),
+    shell_upper_thickness=Units.Quantity("10mm"),
+    rotate_around_zero=(
+        Units.Quantity("0 deg"),
+        Units.Quantity("0 deg"),
+        Units.Quantity("0 deg"),
+    ),
 ):
     # Reference plane is the lower side of the ceramic (vacuum side down).
     # pin_length is the length from the base of the ceramic into the vacuum.
     input_parameters = {
-        "pin_radius": "1.5mm",
+        "pin_radius": "1.75mm",
         "pin_length": pin_length,
-        "ceramic_radius": "3.5mm",
-        "ceramic_thickness": "5mm",
+        "ceramic_radius": ceramic_radius,
+        "ceramic_thickness": ceramic_thickness,
         "shell_upper_radius": "8mm",
-        "shell_upper_thickness": "10mm",
+        "shell_upper_thickness": shell_upper_thickness,
         "shell_upper_inner_radius": "4.015mm",
-        "shell_lower_radius": "4.5mm",
-        "shell_lower_thickness": "5mm",
+        "shell_lower_radius": "5mm",
+        "shell_lower_thickness": shell_lower_thickness,
         "shell_lower_inner_radius": "4.015mm",
     }
+    parts = cached_connector(_ntype_connector50Ohm_parts, input_parameters)
+    # The parts are built around the origin and moved into place in one step.
+    placement = make_placement(rotation_angles=rotate_around_zero).multiply(
+        make_placement(loc=location, rotation_angles=rotation)
+    )
+    for part in parts.values():
+        place(part, placement)
+    return parts
+
+
+def _ntype_connector_parts(input_parameters):
+    """Builds the parts of ntype_connector at the origin."""
     for n in input_parameters.keys():
         if type(input_parameters[n]) is list:
             for eh in range(len(input_parameters[n])):
@@ -739,100 +626,47 @@ def ntype_connector(
         input_parameters["pin_length"]
         + input_parameters["ceramic_thickness"]
         + input_parameters["shell_upper_thickness"],
-        Base.Vector(
-            location[0], location[1] - input_parameters["pin_length"], location[2]
-        ),
+        Base.Vector(0, -input_parameters["pin_length"], 0),
         Base.Vector(0, 1, 0),
     )
-    pin = rotate_at(
-        shp=pin,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
 
     ceramic1 = Part.makeCylinder(
         input_parameters["ceramic_radius"],
         input_parameters["ceramic_thickness"],
-        Base.Vector(location[0], location[1], location[2]),
+        Base.Vector(0, 0, 0),
         Base.Vector(0, 1, 0),
     )
-    ceramic1 = rotate_at(
-        shp=ceramic1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
 
     shell_upper1 = Part.makeCylinder(
         input_parameters["shell_upper_radius"],
         input_parameters["shell_upper_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] + input_parameters["ceramic_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, input_parameters["ceramic_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    shell_upper1 = rotate_at(
-        shp=shell_upper1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_upper2 = Part.makeCylinder(
         input_parameters["shell_upper_inner_radius"],
         input_parameters["shell_upper_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] + input_parameters["ceramic_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, input_parameters["ceramic_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    shell_upper2 = rotate_at(
-        shp=shell_upper2,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_middle1 = Part.makeCylinder(
         input_parameters["shell_upper_radius"],
         input_parameters["ceramic_thickness"],
-        Base.Vector(location[0], location[1], location[2]),
+        Base.Vector(0, 0, 0),
         Base.Vector(0, 1, 0),
     )
-    shell_middle1 = rotate_at(
-        shp=shell_middle1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_lower1 = Part.makeCylinder(
         input_parameters["shell_lower_radius"],
         input_parameters["shell_lower_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] - input_parameters["shell_lower_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, -input_parameters["shell_lower_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    shell_lower1 = rotate_at(
-        shp=shell_lower1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_lower2 = Part.makeCylinder(
         input_parameters["shell_lower_inner_radius"],
         input_parameters["shell_lower_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] - input_parameters["shell_lower_thickness"],
-            location[2],
-        ),
+        Base.Vector(0, -input_parameters["shell_lower_thickness"], 0),
         Base.Vector(0, 1, 0),
     )
-    shell_lower2 = rotate_at(
-        shp=shell_lower2,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
     shell_middle = shell_middle1.cut(ceramic1)
     ceramic = ceramic1.cut(pin)
     shell_lower3 = shell_lower1.cut(shell_lower2)
@@ -844,6 +678,60 @@ def ntype_connector(
     return parts
 
 
+def ntype_connector(
+    pin_length="20mm",
+    rotation=(Units.Quantity("0deg"), Units.Quantity("0deg"), Units.Quantity("0deg")),
+    location=(Units.Quantity("0mm"), Units.Quantity("0mm"), Units.Quantity("0mm")),
+):
+    # Reference plane is the lower side of the ceramic (vacuum side down).
+    # pin_length is the length from the base of the ceramic into the vacuum.
+    input_parameters = {
+        "pin_radius": "1.5mm",
+        "pin_length": pin_length,
+        "ceramic_radius": "3.5mm",
+        "ceramic_thickness": "5mm",
+        "shell_upper_radius": "8mm",
+        "shell_upper_thickness": "10mm",
+        "shell_upper_inner_radius": "4.015mm",
+        "shell_lower_radius": "4.5mm",
+        "shell_lower_thickness": "5mm",
+        "shell_lower_inner_radius": "4.015mm",
+    }
+    parts = cached_connector(_ntype_connector_parts, input_parameters)
+    # The parts are built around the origin and moved into place in one step.
+    placement = make_placement(loc=location, rotation_angles=rotation)
+    for part in parts.values():
+        place(part, placement)
+    return parts
+
+
+def _ntype_connector_stub_parts(input_parameters):
+    """Builds the parts of ntype_connector_stub at the origin."""
+    pin = Part.makeCylinder(
+        input_parameters["pin_radius"],
+        input_parameters["pin_length"],
+        Base.Vector(0, -input_parameters["pin_length"], 0),
+        Base.Vector(0, 1, 0),
+    )
+    shell_lower1 = Part.makeCylinder(
+        input_parameters["shell_lower_radius"],
+        input_parameters["shell_lower_thickness"],
+        Base.Vector(0, -input_parameters["shell_lower_thickness"], 0),
+        Base.Vector(0, 1, 0),
+    )
+    shell_lower2 = Part.makeCylinder(
+        input_parameters["shell_lower_inner_radius"],
+        input_parameters["shell_lower_thickness"],
+        Base.Vector(0, -input_parameters["shell_lower_thickness"], 0),
+        Base.Vector(0, 1, 0),
+    )
+
+    shell_lower = shell_lower1.cut(shell_lower2)
+
+    parts = {"pin": pin, "outer": shell_lower, "vac": shell_lower2}
+    return parts
+
+
 def ntype_connector_stub(
     pin_length=Units.Quantity("20 mm"),
     ring_length=Units.Quantity("2 mm"),
@@ -869,77 +757,13 @@ def ntype_connector_stub(
         "shell_lower_inner_radius": Units.Quantity("8.03 mm") / 2,
     }
 
-    pin = Part.makeCylinder(
-        input_parameters["pin_radius"],
-        input_parameters["pin_length"],
-        Base.Vector(
-            location[0], location[1] - input_parameters["pin_length"], location[2]
-        ),
-        Base.Vector(0, 1, 0),
-    )
-    pin1 = rotate_at(
-        shp=pin,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
-    shell_lower1 = Part.makeCylinder(
-        input_parameters["shell_lower_radius"],
-        input_parameters["shell_lower_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] - input_parameters["shell_lower_thickness"],
-            location[2],
-        ),
-        Base.Vector(0, 1, 0),
-    )
-    shell_lower1_1 = rotate_at(
-        shp=shell_lower1,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
-    shell_lower2 = Part.makeCylinder(
-        input_parameters["shell_lower_inner_radius"],
-        input_parameters["shell_lower_thickness"],
-        Base.Vector(
-            location[0],
-            location[1] - input_parameters["shell_lower_thickness"],
-            location[2],
-        ),
-        Base.Vector(0, 1, 0),
-    )
-    shell_lower2_1 = rotate_at(
-        shp=shell_lower2,
-        loc=(location[0], location[1], location[2]),
-        rotation_angles=(rotation[0], rotation[1], rotation[2]),
-    )
-
-    shell_lower = shell_lower1_1.cut(shell_lower2_1)
-
-    rotate_at(
-        shp=shell_lower,
-        rotation_angles=(
-            rotate_around_zero[0],
-            rotate_around_zero[1],
-            rotate_around_zero[2],
-        ),
+    parts = cached_connector(_ntype_connector_stub_parts, input_parameters)
+    # The parts are built around the origin and moved into place in one step.
+    placement = make_placement(rotation_angles=rotate_around_zero).multiply(
+        make_placement(loc=location, rotation_angles=rotation)
     )
-    rotate_at(
-        shp=pin1,
-        rotation_angles=(
-            rotate_around_zero[0],
-            rotate_around_zero[1],
-            rotate_around_zero[2],
-        ),
-    )
-    rotate_at(
-        shp=shell_lower2_1,
-        rotation_angles=(
-            rotate_around_zero[0],
-            rotate_around_zero[1],
-            rotate_around_zero[2],
-        ),
-    )
-    parts = {"pin": pin1, "outer": shell_lower, "vac": shell_lower2_1}
+    for part in parts.values():
+        place(part, placement)
     return parts
 
 
@@ -990,7 +814,35 @@ def make_nose(
     return nose
 
 
-def make_folded_stripline_feedthrough_parameterised(
+def folded_feedthrough_pin_length(input_parameters):
+    """The pin length of make_folded_stripline_feedthrough_parameterised.
+    The pin stops half way through the stripline."""
+    return (
+        input_parameters["port_height"]
+        + input_parameters["cavity_radius"]
+        - input_parameters["stripline_offset"]
+        - input_parameters["fold_spacing"]
+        - input_parameters["stripline_thickness"]
+        + input_parameters["pipe_thickness"]
+        - input_parameters["stripline_thickness"] / 2.0
+    )
+
+
+def stripline_feedthrough_pin_length(input_parameters):
+    """The pin length of make_stripline_feedthrough_parameterised.
+    The pin stops half way through the stripline."""
+    return (
+        input_parameters["Launch_height"]
+        + input_parameters["port_height_extension"]
+        + input_parameters["cavity_radius"]
+        - input_parameters["stripline_offset"]
+        + input_parameters["pipe_thickness"]
+        - input_parameters["stripline_thickness"] / 2.0
+        - input_parameters["shadowing_cutout_height"]
+    )
+
+
+def _make_folded_stripline_feedthrough_parameterised(
     input_parameters, z_loc="us", xyrotation=0
 ):
     stripline_mid_section_length = (
@@ -1012,16 +864,7 @@ def make_folded_stripline_feedthrough_parameterised(
     )
     feedthrough_outer_x = port_offset + input_parameters["n_type_outer_radius"]
     feedthrough_outer_y = input_parameters["cavity_radius"]
-    # Pin stops half way through the stripline.
-    input_parameters["pin_length"] = (
-        input_parameters["port_height"]
-        + input_parameters["cavity_radius"]
-        - input_parameters["stripline_offset"]
-        - input_parameters["fold_spacing"]
-        - input_parameters["stripline_thickness"]
-        + input_parameters["pipe_thickness"]
-        - input_parameters["stripline_thickness"] / 2.0
-    )
+    pin_length = folded_feedthrough_pin_length(input_parameters)
     ring_start_y = (
         input_parameters["port_height"]
         + input_parameters["cavity_radius"]
@@ -1047,6 +890,7 @@ def make_folded_stripline_feedthrough_parameterised(
         location=(z * port_offset, ring_start_y, 0),
         rotation=(0, 0, 0),
         rotate_around_zero=(xyrotation, 0, 0),
+        pin_length=pin_length,
     )
     feedthrough_vaccum_length = ring_start_y
     feedthrough_vaccum = Part.makeCylinder(
@@ -1062,7 +906,25 @@ def make_folded_stripline_feedthrough_parameterised(
     return n_parts, feedthrough_vaccum
 
 
-def make_stripline_feedthrough_parameterised(
+def make_folded_stripline_feedthrough_parameterised(
+    input_parameters, z_loc="us", xyrotation=0
+):
+    """Builds the feedthrough, only rebuilding it when the parameters it reads
+    change (see incremental_build).
+    """
+    result = cached_build(
+        _make_folded_stripline_feedthrough_parameterised,
+        input_parameters,
+        z_loc=z_loc,
+        xyrotation=xyrotation,
+    )
+    # The cached build only sees a copy of the parameters, so the pin length is
+    # set here for the callers which read it afterwards.
+    input_parameters["pin_length"] = folded_feedthrough_pin_length(input_parameters)
+    return result
+
+
+def _make_stripline_feedthrough_parameterised(
     input_parameters, z_loc="us", xyrotation=0
 ):
     stripline_mid_section_length = (
@@ -1087,16 +949,7 @@ def make_stripline_feedthrough_parameterised(
         / (total_cavity_length / 2.0 - stripline_mid_section_length / 2.0)
         * feedthrough_outer_x
     )
-    # Pin stops half way through the stripline.
-    input_parameters["pin_length"] = (
-        input_parameters["Launch_height"]
-        + input_parameters["port_height_extension"]
-        + input_parameters["cavity_radius"]
-        - input_parameters["stripline_offset"]
-        + input_parameters["pipe_thickness"]
-        - input_parameters["stripline_thickness"] / 2.0
-        - input_parameters["shadowing_cutout_height"]
-    )
+    pin_length = stripline_feedthrough_pin_length(input_parameters)
     ring_start_y = (
         input_parameters["Launch_height"]
         + input_parameters["port_height_extension"]
@@ -1123,6 +976,7 @@ def make_stripline_feedthrough_parameterised(
         location=(z * port_offset, ring_start_y, 0),
         rotation=(0, 0, 0),
         rotate_around_zero=(xyrotation, 0, 0),
+        pin_length=pin_length,
     )
     feedthrough_vaccum_length = ring_start_y
     feedthrough_vaccum = Part.makeCylinder(
@@ -1138,6 +992,24 @@ def make_stripline_feedthrough_parameterised(
     return n_parts, feedthrough_vaccum
 
 
+def make_stripline_feedthrough_parameterised(
+    input_parameters, z_loc="us", xyrotation=0
+):
+    """Builds the feedthrough, only rebuilding it when the parameters it reads
+    change (see incremental_build).
+    """
+    result = cached_build(
+        _make_stripline_feedthrough_parameterised,
+        input_parameters,
+        z_loc=z_loc,
+        xyrotation=xyrotation,
+    )
+    # The cached build only sees a copy of the parameters, so the pin length is
+    # set here for the callers which read it afterwards.
+    input_parameters["pin_length"] = stripline_feedthrough_pin_length(input_parameters)
+    return result
+
+
 def make_stripline_feedthrough_full(input_parameters, z_loc="us", xyrotation=0):
     stripline_mid_section_length = (
         input_parameters["total_stripline_length"]
@@ -1289,7 +1161,7 @@ def make_sweep(aperture1, aperture2, aperture3, path1, path2):
     return solid1.fuse(solid2)
 
 
-def make_stripline_folded(input_parameters, xyrotation=0):
+def _make_stripline_folded(input_parameters, xyrotation=0):
     stripline_mid_section_length = (
         input_parameters["total_stripline_length"]
         - 2 * input_parameters["stripline_taper_length"]
@@ -1594,7 +1466,14 @@ def make_stripline_folded(input_parameters, xyrotation=0):
         return stripline
 
 
-def make_stripline_fixed_ratio_launch(input_parameters, xyrotation=0):
+def make_stripline_folded(input_parameters, xyrotation=0):
+    """Builds the stripline, only rebuilding it when the parameters it reads
+    change (see incremental_build).
+    """
+    return cached_build(_make_stripline_folded, input_parameters, xyrotation=xyrotation)
+
+
+def _make_stripline_fixed_ratio_launch(input_parameters, xyrotation=0):
     stripline_mid_section_length = (
         input_parameters["total_stripline_length"]
         - 2 * input_parameters["stripline_taper_length"]
@@ -1784,7 +1663,16 @@ def make_stripline_fixed_ratio_launch(input_parameters, xyrotation=0):
         return stripline
 
 
-def make_stripline_fixed_ratio_launch_sectioned(input_parameters, xyrotation=0):
+def make_stripline_fixed_ratio_launch(input_parameters, xyrotation=0):
+    """Builds the stripline, only rebuilding it when the parameters it reads
+    change (see incremental_build).
+    """
+    return cached_build(
+        _make_stripline_fixed_ratio_launch, input_parameters, xyrotation=xyrotation
+    )
+
+
+def _make_stripline_fixed_ratio_launch_sectioned(input_parameters, xyrotation=0):
     stripline_mid_section_length = (
         input_parameters["total_stripline_length"]
         - 2 * input_parameters["stripline_taper_length"]
@@ -2037,7 +1925,18 @@ def make_stripline_fixed_ratio_launch_sectioned(input_parameters, xyrotation=0):
         )
 
 
-def make_stripline(input_parameters, xyrotation=0):
+def make_stripline_fixed_ratio_launch_sectioned(input_parameters, xyrotation=0):
+    """Builds the stripline, only rebuilding it when the parameters it reads
+    change (see incremental_build).
+    """
+    return cached_build(
+        _make_stripline_fixed_ratio_launch_sectioned,
+        input_parameters,
+        xyrotation=xyrotation,
+    )
+
+
+def _make_stripline(input_parameters, xyrotation=0):
     stripline_mid_section_length = (
         input_parameters["total_stripline_length"]
         - 2 * input_parameters["stripline_taper_length"]
@@ -2137,3 +2036,100 @@ def make_stripline(input_parameters, xyrotation=0):
     else:
         rotate_at(shp=stripline, rotation_angles=(xyrotation, 0, 0))
         return stripline
+
+
+def make_stripline(input_parameters, xyrotation=0):
+    """Builds the stripline, only rebuilding it when the parameters it reads
+    change (see incremental_build).
+    """
+    return cached_build(_make_stripline, input_parameters, xyrotation=xyrotation)
+
+
+def _make_stripline_cavity(input_parameters):
+    # total_cavity_length is the total stipline length plus the additional
+    # cavity length at each end.
+    total_cavity_length = (
+        input_parameters["total_stripline_length"]
+        + 2 * input_parameters["additional_cavity_length"]
+    )
+    _, cavity_face = make_circular_aperture(input_parameters["cavity_radius"])
+    cavity_vac = make_beampipe(cavity_face, total_cavity_length)
+    cavity = make_wall(cavity_vac, input_parameters["pipe_thickness"])
+    return cavity, cavity_vac
+
+
+def make_stripline_cavity(input_parameters):
+    """Builds the cavity body around the striplines, a cylinder of
+    cavity_radius with walls of pipe_thickness, only rebuilding it when the
+    parameters it reads change (see incremental_build).
+
+    Args:
+        input_parameters (dict): The model input parameters.
+
+    Returns:
+        cavity (FreeCAD shape): The cavity wall.
+        cavity_vac (FreeCAD shape): The cavity vacuum.
+    """
+    return cached_build(_make_stripline_cavity, input_parameters)
+
+
+def make_stripline_assembly(
+    input_parameters,
+    rotations=(0, 90, 180, 270),
+    folded=False,
+    max_workers=None,
+    processes=True,
+):
+    """Builds the cavity body of a stripline BPM, its striplines and their
+    feedthroughs at each end. The parts are independent, so they are built in
+    parallel worker processes with a task graph.
+
+    Args:
+        input_parameters (dict): The model input parameters.
+        rotations (list): The xyrotation (deg) of each stripline.
+        folded (bool): If True the folded stripline and feedthroughs are used.
+        max_workers (int): Number of worker processes. Defaults to the CPU count.
+        processes (bool): If False the parts are built one after another in
+                          this process, which also lets the build cache be
+                          reused between calls.
+
+    Returns:
+        assembly (dict): For 'stripline', 'feedthrough_us' and
+                         'feedthrough_ds' a list of the builder results, in
+                         the order of rotations, and for 'cavity' the
+                         (cavity, cavity_vac) of make_stripline_cavity.
+    """
+    if folded:
+        stripline_builder = make_stripline_folded
+        feedthrough_builder = make_folded_stripline_feedthrough_parameterised
+        pin_length = folded_feedthrough_pin_length
+    else:
+        stripline_builder = make_stripline
+        feedthrough_builder = make_stripline_feedthrough_parameterised
+        pin_length = stripline_feedthrough_pin_length
+    graph = new_task_graph()
+    add_task(graph, "cavity", make_stripline_cavity, args=(input_parameters,))
+    names = {
+        "stripline": add_rotated_tasks(
+            graph, "stripline", stripline_builder, input_parameters, rotations
+        )
+    }
+    for z_loc in ("us", "ds"):
+        names["".join(["feedthrough_", z_loc])] = add_rotated_tasks(
+            graph,
+            "".join(["feedthrough_", z_loc]),
+            feedthrough_builder,
+            input_parameters,
+            rotations,
+            kwargs={"z_loc": z_loc},
+        )
+    results = run_task_graph(graph, max_workers=max_workers, processes=processes)
+    # The workers only see copies of the parameters, so the pin length the
+    # feedthroughs set is added here.
+    input_parameters["pin_length"] = pin_length(input_parameters)
+    assembly = {
+        part: [results[name] for name in task_names]
+        for part, task_names in names.items()
+    }
+    assembly["cavity"] = results["cavity"]
+    return assembly
@@ -1,6 +1,10 @@
 import copy
+import multiprocessing
 import os
 import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from math import atan2, cos, radians, sin, sqrt
 
 import FreeCAD
@@ -9,6 +13,50 @@ import MeshPart
 import Part
 from FreeCAD import Base, Units
 
+from FreeCAD_geometry_generation.connector_library import clear_connector_cache
+from FreeCAD_geometry_generation.incremental_build import (
+    TrackedParameters,
+    clear_build_cache,
+)
+from FreeCAD_geometry_generation.mesh_quality import (
+    mesh_arrays,
+    mesh_quality,
+    mesh_quality_problems,
+)
+from FreeCAD_geometry_generation.part_store import brep_hash, write_part_store
+from FreeCAD_geometry_generation.run_sidecar import (
+    append_to_index,
+    make_sidecar,
+    write_sidecar,
+)
+from FreeCAD_geometry_generation.solver_exporters import (
+    check_material_map,
+    write_solver_files,
+)
+from FreeCAD_geometry_generation.stl_writers import write_ascii_stl, write_binary_stl
+from FreeCAD_geometry_generation.sweep_catalogue import record_run
+from FreeCAD_geometry_generation.sweep_manifest import (
+    COMPLETED,
+    DUPLICATE,
+    FAILED,
+    REJECTED,
+    RUNNING,
+    add_point,
+    load_manifest,
+    manifest_path,
+    new_manifest,
+    summarise_manifest,
+    unfinished_points,
+    update_point,
+    write_manifest,
+)
+from FreeCAD_geometry_generation.sweep_resources import (
+    current_rss_mb,
+    register,
+    release_point,
+    track_point,
+)
+
 
 class ModelException(Exception):
     """This is to enable errors generated during the modelling to be separately dealt with,
@@ -44,7 +92,15 @@ def parse_input_parameters(input_parameters):
     return input_parameters
 
 def base_model(
-    model_name, model_function, input_params, output_path, accuracy=2, just_cad=0
+    model_name,
+    model_function,
+    input_params,
+    output_path,
+    accuracy=2,
+    just_cad=0,
+    constraint_check=None,
+    mesh_limits=None,
+    materials=None,
 ):
     """Takes the INPUT_PARAMETERS dictionary as a base.
     It generates a model based on those inputs.
@@ -58,6 +114,12 @@ def base_model(
         accuracy (int): Represents the fineness of the mesh. bigger number = finer mesh
         just_cad(int): selects if the STL files are generated. Early in the design it
                        can be useful to turn them off
+        constraint_check (function handle): Takes the parsed input parameters and
+                                            returns a list of problems with the
+                                            geometry (see geometry_constraints).
+        mesh_limits (dict): Limits on the mesh quality (see mesh_quality).
+        materials (dict): The material of each part. If given GdfidL and ECHO
+                          geometry files are written (see solver_exporters).
     """
     inputs = copy.copy(
         input_params
@@ -72,6 +134,12 @@ def base_model(
     output_loc = copy.copy(output_path)
     try:
         inputs = parse_input_parameters(inputs)
+        if constraint_check is not None:
+            problems = constraint_check(inputs)
+            if problems:
+                print("Problem with base model ", "\n\t", "\n\t".join(problems))
+                return
+        start_time = time.time()
         parts_list = model_function(inputs)
 
         generate_output_files(
@@ -82,11 +150,265 @@ def base_model(
             tag="Base",
             mesh_resolution=accuracy,
             just_cad=just_cad,
+            timings={"model": time.time() - start_time},
+            mesh_limits=mesh_limits,
+            materials=materials,
         )
     except ModelException as e:
         print("Problem with base model ", "\n\t", e)
 
 
+def sweep_value_string(sweep_val):
+    """Converts a sweep value into a string which is safe to use in file names.
+
+    Args:
+        sweep_val (str or list): The value of the swept parameter.
+
+    Returns:
+        value_string (str): The value with problem characters replaced.
+    """
+    # Replacing . with p to prevent problems with filename parsing
+    value_string = str(sweep_val).replace(".", "p")
+    value_string = value_string.replace(" ", "")
+    value_string = value_string.replace(",", "")
+    value_string = value_string.replace("[", "")
+    value_string = value_string.replace("]", "")
+    value_string = value_string.replace("'", "")
+    value_string = value_string.replace("-", "m")
+    return value_string
+
+
+def sweep_model_tag(sweep_variable, sweep_val):
+    return "".join([sweep_variable, "_sweep_value_", sweep_value_string(sweep_val)])
+
+
+def run_sweep_point(
+    model_name,
+    model_function,
+    inputs,
+    output_path,
+    model_tag,
+    accuracy=5,
+    just_cad=0,
+    constraint_check=None,
+    clear_caches=False,
+    mesh_limits=None,
+    materials=None,
+    register_run=True,
+):
+    """Builds and writes out the model for a single sweep point.
+    Everything the point creates is released before returning.
+    The input keys the model function reads are recorded.
+
+    Args:
+        model_name (str): Name of the current model.
+        model_function (function handle): The handle of the specific model being used.
+        inputs (dict): The (unparsed) input parameters of this point.
+        output_path (str): The location all the output files will be written to.
+        model_tag (str): Unique identifier string for this point.
+        accuracy (int): Represents the fineness of the mesh. bigger number = finer mesh
+        just_cad(int): selects if the STL files are generated.
+        constraint_check (function handle): Takes the parsed input parameters and
+                                            returns a list of problems.
+        clear_caches (bool): Also empty the in memory shape caches (tapers,
+                             connectors and incremental builds).
+        mesh_limits (dict): Limits on the mesh quality. The point fails if a
+                            mesh exceeds them (see mesh_quality).
+        materials (dict): The material of each part, for the solver geometry
+                          files (see solver_exporters).
+        register_run (bool): Add the run to the index and catalogue in
+                             output_path (see generate_output_files).
+
+    Returns:
+        status (str): COMPLETED, FAILED or REJECTED.
+        messages (list): The problems or errors found.
+        rss (float): The resident memory after the point was released (MB).
+        reads (list): The input keys read by the model function, or None if it
+                      was not run.
+    """
+    inputs_nolists = breakup_lists(
+        inputs
+    )  # If you use a variable which is a list for controlling the
+    # mesh fixed lines the code breaks.
+    # This breaks lists into separate directory entries.
+    # However you do want lists in the original inputs as this allows more flexibity
+    # in the parameter sweeps.
+    tracker = track_point(model_tag)
+    status, messages, reads = COMPLETED, [], None
+    try:
+        inputs = parse_input_parameters(inputs)
+        if constraint_check is not None:
+            problems = constraint_check(inputs)
+        else:
+            problems = []
+        if problems:
+            print("Skipping model ", model_tag, "\n\t", "\n\t".join(problems))
+            status, messages = REJECTED, problems
+        else:
+            start_time = time.time()
+            tracked_inputs = TrackedParameters(inputs)
+            try:
+                parts_list = model_function(tracked_inputs)
+            finally:
+                reads = sorted(tracked_inputs.reads)
+            register(tracker, shapes=parts_list)
+            generate_output_files(
+                copy.copy(output_path),
+                model_name,
+                parts_list,
+                inputs_nolists,
+                tag=model_tag,
+                mesh_resolution=accuracy,
+                just_cad=just_cad,
+                resources=tracker,
+                timings={"model": time.time() - start_time},
+                mesh_limits=mesh_limits,
+                materials=materials,
+                register_run=register_run,
+            )
+    except ModelException as e:
+        print("Problem with model ", model_tag, "\n\t", e)
+        # The original error is the context, as ModelException is raised from
+        # within an except block.
+        status, messages = FAILED, [repr(e.__context__ or e)]
+    finally:
+        if clear_caches:
+            caches = (clear_taper_cache, clear_connector_cache, clear_build_cache)
+        else:
+            caches = ()
+        rss = release_point(tracker, caches=caches)
+    return status, messages, rss, reads
+
+
+def _sweep_point_worker(connection, *args):
+    try:
+        result = run_sweep_point(*args)
+    except Exception as e:
+        result = (FAILED, [repr(e)], current_rss_mb(), None)
+    connection.send(result)
+    connection.close()
+
+
+def _persistent_sweep_worker(connection):
+    """Runs sweep points sent down the connection until it receives None."""
+    while True:
+        args = connection.recv()
+        if args is None:
+            break
+        try:
+            result = run_sweep_point(*args)
+        except Exception as e:
+            result = (FAILED, [repr(e)], current_rss_mb(), None)
+        connection.send(result)
+    connection.close()
+
+
+def start_sweep_worker():
+    """Starts a worker process which runs sweep points one after another.
+
+    Returns:
+        worker (tuple): The process and the connection to it.
+    """
+    parent_connection, child_connection = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=_persistent_sweep_worker, args=(child_connection,)
+    )
+    process.start()
+    child_connection.close()
+    return process, parent_connection
+
+
+def stop_sweep_worker(worker):
+    """Asks the worker to finish, and kills it if it does not."""
+    process, connection = worker
+    if process.is_alive():
+        try:
+            connection.send(None)
+        except (OSError, ValueError):
+            pass
+        process.join(5)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+    connection.close()
+
+
+def run_sweep_point_in_worker(worker, timeout, *args):
+    """Runs run_sweep_point in a persistent worker process.
+    The arguments are pickled, so the model function and constraint check
+    have to be importable (not lambdas).
+
+    Args:
+        worker (tuple): The process and connection from start_sweep_worker.
+        timeout (float): Time allowed for the point (s). None waits forever.
+        args: The arguments of run_sweep_point.
+
+    Returns:
+        status (str): COMPLETED, FAILED or REJECTED.
+        messages (list): The problems or errors found.
+        rss (float): The resident memory of the worker after the point (MB).
+                     None if the worker died or hung, and has to be replaced.
+        reads (list): The input keys read by the model function.
+    """
+    process, connection = worker
+    try:
+        connection.send(args)
+        if connection.poll(timeout):
+            return connection.recv()
+        message = "".join(["Timed out after ", str(timeout), "s"])
+    except (EOFError, OSError):
+        process.join(5)
+        message = "".join(["Worker crashed with exit code ", str(process.exitcode)])
+    return FAILED, [message], None, None
+
+
+def run_sweep_point_isolated(timeout, *args):
+    """Runs run_sweep_point in a separate process, so that a crash of FreeCAD
+    or a hung point only loses that point.
+
+    Args:
+        timeout (float): Time allowed for the point (s). None waits forever.
+        args: The arguments of run_sweep_point.
+
+    Returns:
+        status (str): COMPLETED, FAILED or REJECTED.
+        messages (list): The problems or errors found.
+        rss (float): The resident memory of the worker after the point (MB).
+        reads (list): The input keys read by the model function.
+    """
+    parent_connection, child_connection = multiprocessing.Pipe(duplex=False)
+    worker = multiprocessing.Process(
+        target=_sweep_point_worker, args=(child_connection,) + args
+    )
+    worker.start()
+    # Closing the parent copy so that a crashed worker shows up as end of file.
+    child_connection.close()
+    result = None
+    timed_out = False
+    try:
+        if parent_connection.poll(timeout):
+            result = parent_connection.recv()
+        else:
+            timed_out = True
+    except EOFError:
+        pass
+    worker.join(5)
+    if worker.is_alive():
+        worker.terminate()
+        worker.join()
+    parent_connection.close()
+    if result is not None:
+        return result
+    if timed_out:
+        return FAILED, ["".join(["Timed out after ", str(timeout), "s"])], None, None
+    return (
+        FAILED,
+        ["".join(["Worker crashed with exit code ", str(worker.exitcode)])],
+        None,
+        None,
+    )
+
+
 def parameter_sweep(
     model_name,
     model_function,
@@ -96,10 +418,29 @@ def parameter_sweep(
     sweep_vals,
     accuracy=5,
     just_cad=0,
+    constraint_check=None,
+    isolate=False,
+    timeout=None,
+    resume=False,
+    retry_failed=False,
+    max_rss_mb=None,
+    clear_caches=False,
+    deduplicate=False,
+    mesh_limits=None,
+    materials=None,
 ):
     """Takes the INPUT_PARAMETERS dictionary as a base. Then changes the requested
     input variable in a sequence.
     For each iteration it generates a model.
+    If a constraint_check is given, points which fail it are skipped before any
+    CAD work is done.
+    The state of every point is kept in a manifest in output_path, so that an
+    interrupted sweep can be resumed.
+    The resources of each point are released when it finishes and the resident
+    memory afterwards is recorded in the manifest.
+    The input keys each model reads are also recorded, so that a sweep variable
+    the model never reads is reported, and optionally points which would
+    build the same geometry as a finished point are skipped.
 
     Args:
         model_name (str): Name of the current model.
@@ -112,7 +453,30 @@ def parameter_sweep(
         accuracy (int): Represents the fineness of teh mesh. bigger number = finer mesh
         just_cad(int): selects if the STL files are generated. Early in the design it
                        can be useful to turn them off
+        constraint_check (function handle): Takes the parsed input parameters and
+                                            returns a list of problems with the
+                                            geometry (see geometry_constraints).
+        isolate (bool): Run each point in its own process, so a crash only loses
+                        that point.
+        timeout (float): Time allowed for each isolated point (s).
+        resume (bool): Only run the points which the manifest of a previous run
+                       has not finished.
+        retry_failed (bool): When resuming also rerun the points which failed.
+        max_rss_mb (float): With isolate, run the points in one worker process
+                            which is replaced once its resident memory goes
+                            over this (MB). Without isolate a warning is printed.
+        clear_caches (bool): Empty the shape caches after every point.
+        deduplicate (bool): Skip points whose values of the keys read by the
+                            model match a completed point. They are marked as
+                            duplicates in the manifest and get no output files.
+        mesh_limits (dict): Limits on the mesh quality. Points with a mesh which
+                            exceeds them fail (see mesh_quality).
+        materials (dict): The material of each part. If given GdfidL and ECHO
+                          geometry files are written (see solver_exporters).
 
+    Returns:
+        rejected (dict): The problems found for each skipped model, keyed on the
+                         model tag.
     """
     if sweep_variable not in input_params:
         raise ValueError(
@@ -123,50 +487,190 @@ def parameter_sweep(
                 )
             )
         )
-    for sweep_val in sweep_vals:
-        inputs = copy.copy(
+    points = [
+        (sweep_model_tag(sweep_variable, sweep_val), sweep_val)
+        for sweep_val in sweep_vals
+    ]
+    manifest_file = manifest_path(output_path, model_name, sweep_variable)
+    manifest = load_manifest(manifest_file) if resume else None
+    if manifest is None:
+        manifest = new_manifest(
+            model_name,
+            sweep_variable,
+            [(model_tag, str(sweep_val)) for model_tag, sweep_val in points],
+        )
+    else:
+        for model_tag, sweep_val in points:
+            add_point(manifest, model_tag, str(sweep_val))
+    write_manifest(manifest, manifest_file)
+    to_run = unfinished_points(manifest, retry_failed=retry_failed)
+
+    point_inputs = {}
+    for model_tag, sweep_val in points:
+        # Deep copies, as parsing the inputs modifies them (and their lists).
+        inputs = copy.deepcopy(
             input_params
         )  # To ensure the base settings are unchanged between sweeps.
         inputs[sweep_variable] = sweep_val
-        inputs_nolists = breakup_lists(
-            inputs
-        )  # If you use a variable which is a list for controlling the
-        # mesh fixed lines the code breaks.
-        # This breaks lists into separate directory entries.
-        # However you do want lists in the original inputs as this allows more flexibity
-        # in the parameter sweeps.
-        
-        # Replacing . with p to prevent problems with filename parsing
-        value_string = str(inputs[sweep_variable]).replace(".", "p")
-        value_string = value_string.replace(" ", "")
-        value_string = value_string.replace(",", "")
-        value_string = value_string.replace("[", "")
-        value_string = value_string.replace("]", "")
-        value_string = value_string.replace("'", "")
-        value_string = value_string.replace("-", "m")
-
-        model_tag = "".join([sweep_variable, "_sweep_value_", value_string])
-        try:
-            inputs = parse_input_parameters(inputs)
-            parts_list = model_function(inputs)
-            generate_output_files(
-                copy.copy(output_path),
+        point_inputs[model_tag] = inputs
+
+    rejected = {}
+    worker = None
+    unused_reported = False
+    try:
+        for model_tag, sweep_val in points:
+            if model_tag not in to_run:
+                print("Already run ", model_tag)
+                continue
+            inputs = copy.deepcopy(point_inputs[model_tag])
+            duplicate_of = None
+            if deduplicate:
+                duplicate_of = find_duplicate_point(manifest, point_inputs, model_tag)
+            if duplicate_of is not None:
+                print(
+                    "Skipping ", model_tag, ", it is the same model as ", duplicate_of
+                )
+                update_point(
+                    manifest,
+                    manifest_file,
+                    model_tag,
+                    DUPLICATE,
+                    messages=["".join(["Same effective inputs as ", duplicate_of])],
+                    duplicate_of=duplicate_of,
+                )
+                continue
+            point_args = (
                 model_name,
-                parts_list,
-                inputs_nolists,
-                tag=model_tag,
-                mesh_resolution=accuracy,
-                just_cad=just_cad,
+                model_function,
+                inputs,
+                output_path,
+                model_tag,
+                accuracy,
+                just_cad,
+                constraint_check,
+                clear_caches,
+                mesh_limits,
+                materials,
             )
-        except ModelException as e:
-            print(
-                "Problem with model ",
-                sweep_variable,
-                "_sweep_value_",
-                str(inputs[sweep_variable]),
-                "\n\t",
-                e,
+            update_point(manifest, manifest_file, model_tag, RUNNING)
+            start_time = time.time()
+            if isolate and max_rss_mb is not None:
+                if worker is None:
+                    worker = start_sweep_worker()
+                status, messages, rss, reads = run_sweep_point_in_worker(
+                    worker, timeout, *point_args
+                )
+                if rss is None or rss > max_rss_mb:
+                    print("Replacing the sweep worker after ", model_tag)
+                    stop_sweep_worker(worker)
+                    worker = None
+            elif isolate:
+                status, messages, rss, reads = run_sweep_point_isolated(
+                    timeout, *point_args
+                )
+            else:
+                status, messages, rss, reads = run_sweep_point(*point_args)
+                if max_rss_mb is not None and rss is not None and rss > max_rss_mb:
+                    print(
+                        "Memory use is over ",
+                        max_rss_mb,
+                        "MB. Use isolate to recycle the worker.",
+                    )
+            update_point(
+                manifest,
+                manifest_file,
+                model_tag,
+                status,
+                messages=messages,
+                duration=time.time() - start_time,
+                rss_mb=rss,
+                reads=reads,
             )
+            if status == REJECTED:
+                rejected[model_tag] = messages
+            if (
+                reads is not None
+                and sweep_variable not in reads
+                and not unused_reported
+            ):
+                print(
+                    "The model does not read ",
+                    sweep_variable,
+                    ", so every point of this sweep builds the same geometry.",
+                )
+                unused_reported = True
+    finally:
+        if worker is not None:
+            stop_sweep_worker(worker)
+    print("Sweep status ", summarise_manifest(manifest))
+    return rejected
+
+
+def effective_inputs(inputs, reads):
+    """The values of the input keys a model read. Points with the same
+    effective inputs build the same geometry.
+
+    Args:
+        inputs (dict): The (unparsed) input parameters of a point.
+        reads (list): The input keys read by the model function.
+
+    Returns:
+        values (list): [key, value string] pairs. Missing keys have the value None.
+    """
+    return [[key, str(inputs[key]) if key in inputs else None] for key in reads]
+
+
+def find_duplicate_point(manifest, point_inputs, model_tag):
+    """Finds a completed point which read the same values as this point would.
+    The keys a model reads only depend on the values it has read, so if those
+    match, the model would take the same path and build the same geometry.
+
+    Args:
+        manifest (dict): The sweep manifest.
+        point_inputs (dict): The input parameters of each point, keyed on tag.
+        model_tag (str): The point to check.
+
+    Returns:
+        model_tag (str): The tag of the matching point, or None.
+    """
+    for other_tag, point in manifest["points"].items():
+        if (
+            other_tag == model_tag
+            or other_tag not in point_inputs
+            or point["status"] != COMPLETED
+            or point.get("reads") is None
+        ):
+            continue
+        reads = point["reads"]
+        if effective_inputs(point_inputs[model_tag], reads) == effective_inputs(
+            point_inputs[other_tag], reads
+        ):
+            return other_tag
+    return None
+
+
+def check_sweep(constraint_check, input_params, sweep_variable, sweep_vals):
+    """Runs the constraint check over a parameter sweep without building anything.
+
+    Args:
+        constraint_check (function handle): Takes the parsed input parameters and
+                                            returns a list of problems.
+        input_params (dict): A dictionary containing the names and values of the input
+                             parameters of the model.
+        sweep_variable (str): Name found in the input_params dictionary.
+        sweep_vals (list): A list of values for the swept parameter to take.
+
+    Returns:
+        problems (dict): The problems found for each invalid sweep value.
+    """
+    problems = {}
+    for sweep_val in sweep_vals:
+        inputs = copy.deepcopy(input_params)
+        inputs[sweep_variable] = sweep_val
+        point_problems = constraint_check(parse_input_parameters(inputs))
+        if point_problems:
+            problems[str(sweep_val)] = point_problems
+    return problems
 
 
 def add_shadowing_bump(
@@ -254,18 +758,11 @@ def make_beampipe(pipe_aperture, pipe_length, loc=(0, 0, 0), rotation_angles=(0,
             p (FreeCad shape): A model of the pipe.
     """
     p = pipe_aperture.extrude(Base.Vector(pipe_length, 0, 0))
-    p.translate(Base.Vector(-pipe_length / 2.0, 0, 0))  # move to be centred on (0,0,0)
-    p.rotate(
-        Base.Vector(0, 0, 0), Base.Vector(0, 0, 1), rotation_angles[2]
-    )  # Rotate around Z
-    p.rotate(
-        Base.Vector(0, 0, 0), Base.Vector(1, 0, 0), rotation_angles[0]
-    )  # Rotate around X
-    p.rotate(
-        Base.Vector(0, 0, 0), Base.Vector(0, 1, 0), rotation_angles[1]
-    )  # Rotate around Y
-    p.translate(Base.Vector(loc[0], loc[1], loc[2]))  # Move to be centred on loc
-    return p
+    # Centring on (0,0,0), rotating and moving to loc as a single placement.
+    placement = make_placement(loc, rotation_angles).multiply(
+        FreeCAD.Placement(Base.Vector(-pipe_length / 2.0, 0, 0), FreeCAD.Rotation())
+    )
+    return place(p, placement)
 
 def make_beampipe_from_end(pipe_aperture, pipe_length, loc=(0, 0, 0), rotation_angles=(0, 0, 0)):
     """Takes an aperture and creates a pipe.
@@ -285,17 +782,132 @@ def make_beampipe_from_end(pipe_aperture, pipe_length, loc=(0, 0, 0), rotation_a
             p (FreeCad shape): A model of the pipe.
     """
     p = pipe_aperture.extrude(Base.Vector(pipe_length, 0, 0))
-    p.rotate(
-        Base.Vector(0, 0, 0), Base.Vector(0, 0, 1), rotation_angles[2]
-    )  # Rotate around Z
-    p.rotate(
-        Base.Vector(0, 0, 0), Base.Vector(1, 0, 0), rotation_angles[0]
-    )  # Rotate around X
-    p.rotate(
-        Base.Vector(0, 0, 0), Base.Vector(0, 1, 0), rotation_angles[1]
-    )  # Rotate around Y
-    p.translate(Base.Vector(loc[0], loc[1], loc[2]))  # Move to be centred on loc
-    return p
+    return place(p, make_placement(loc, rotation_angles))
+
+
+def offset_aperture(aperture, thickness, join=0):
+    """Grows an aperture outline outwards by a constant distance.
+    Unlike scaling the height and width this gives a true constant wall thickness.
+
+    Args:
+        aperture (FreeCAD wire): Outline of the aperture.
+        thickness (float): The offset distance.
+        join (int): How corners are filled. 0 = arcs, 2 = sharp corners.
+
+    Returns:
+        wire1 (FreeCAD wire definition): An outline description of the shape.
+        face1 (FreeCAD face definition): A surface description of the shape.
+    """
+    wire1 = aperture.makeOffset2D(thickness, join, False, False, False)
+    face1 = Part.Face(wire1)
+    return wire1, face1
+
+
+def _end_faces(shp, tolerance=1e-6):
+    """Finds the planar faces at either end of a shape along the x axis."""
+    box = shp.BoundBox
+    ends = []
+    for face in shp.Faces:
+        face_box = face.BoundBox
+        if face_box.XLength > tolerance:
+            continue
+        if abs(face_box.XMin - box.XMin) < tolerance or abs(
+            face_box.XMax - box.XMax
+        ) < tolerance:
+            ends.append(face)
+    return ends
+
+
+def make_wall(vacuum, thickness, open_faces=None, tolerance=1e-6):
+    """Makes the wall around a vacuum volume in a single thick solid operation,
+    rather than building a second set of larger apertures and cutting.
+    The feedthrough builders in freecad_components place their ports at
+    cavity_radius + pipe_thickness, which is the outer surface of a wall made
+    from the cavity vacuum with thickness=pipe_thickness.
+
+    Args:
+        vacuum (FreeCAD shape): The vacuum solid.
+        thickness (float): The wall thickness.
+        open_faces (list): Faces of the vacuum which are left open. Defaults to
+                           the end faces along the x axis (the beam ports).
+        tolerance (float): Tolerance of the offset.
+
+    Returns:
+        wall (FreeCAD shape): The wall solid.
+    """
+    if open_faces is None:
+        open_faces = _end_faces(vacuum, tolerance=tolerance)
+    try:
+        return vacuum.makeThickness(open_faces, thickness, tolerance)
+    except Part.OCCError as e:
+        print("Thick solid failed, offsetting the vacuum instead", e)
+    # Fallback, offset the whole vacuum, trim it to the same length and cut.
+    box = vacuum.BoundBox
+    outer = vacuum.makeOffsetShape(thickness, tolerance, fill=True)
+    outer_box = outer.BoundBox
+    trim = Part.makeBox(
+        box.XLength,
+        outer_box.YLength + 2 * thickness,
+        outer_box.ZLength + 2 * thickness,
+        Base.Vector(
+            box.XMin, outer_box.YMin - thickness, outer_box.ZMin - thickness
+        ),
+    )
+    return outer.common(trim).cut(vacuum)
+
+
+# Lofted tapers keyed on the aperture fingerprints, length and offsets.
+# Least recently used entries are dropped once TAPER_CACHE_SIZE is reached.
+_TAPER_CACHE = OrderedDict()
+TAPER_CACHE_SIZE = 32
+
+
+def clear_taper_cache():
+    _TAPER_CACHE.clear()
+
+
+def _taper_key(aperture1, aperture2, taper_length, aperture_xy_offset):
+    return (
+        brep_hash(aperture1),
+        brep_hash(aperture2),
+        round(float(taper_length), 9),
+        round(float(aperture_xy_offset[0]), 9),
+        round(float(aperture_xy_offset[1]), 9),
+    )
+
+
+def _lofted_taper(aperture1, aperture2, taper_length, aperture_xy_offset):
+    """Gets the loft between two apertures from the cache, building it if needed.
+    A taper in the opposite direction is made by mirroring a cached one.
+    The returned shape is a copy, so it can be moved freely.
+    """
+    key = _taper_key(aperture1, aperture2, taper_length, aperture_xy_offset)
+    if key in _TAPER_CACHE:
+        _TAPER_CACHE.move_to_end(key)
+        return _TAPER_CACHE[key].copy()
+    reverse_key = _taper_key(
+        aperture2,
+        aperture1,
+        taper_length,
+        (-aperture_xy_offset[0], -aperture_xy_offset[1]),
+    )
+    if reverse_key in _TAPER_CACHE:
+        _TAPER_CACHE.move_to_end(reverse_key)
+        taper = _TAPER_CACHE[reverse_key].mirror(
+            Base.Vector(taper_length / 2.0, 0, 0), Base.Vector(1, 0, 0)
+        )
+        taper.translate(Base.Vector(0, aperture_xy_offset[0], aperture_xy_offset[1]))
+        return taper
+    # Working on a copy so the caller's aperture is never moved.
+    end_aperture = aperture2.copy()
+    end_aperture.translate(
+        Base.Vector(taper_length, aperture_xy_offset[0], aperture_xy_offset[1])
+    )
+    taper = Part.makeLoft([aperture1, end_aperture], True, False, False)
+    _TAPER_CACHE[key] = taper
+    while len(_TAPER_CACHE) > TAPER_CACHE_SIZE:
+        _TAPER_CACHE.popitem(last=False)
+    return taper.copy()
 
 
 def make_taper(
@@ -310,6 +922,8 @@ def make_taper(
     The centre of the face of aperture1 will be at loc and rotations will happen
     about that point.
     Assume both apertures are initially centred on (0,0,0)
+    The apertures are not modified. The lofted solid is cached, so repeated
+    tapers between the same apertures are only transformed copies.
 
     Args:
        aperture1 (FreeCad wire): Outline of starting aperture.
@@ -323,24 +937,8 @@ def make_taper(
     Returns:
        taper (FreeCAD shape): A model of the shape.
     """
-    aperture2.translate(
-        Base.Vector(taper_length, aperture_xy_offset[0], aperture_xy_offset[1])
-    )
-    taper = Part.makeLoft([aperture1, aperture2], True, False, False)
-    taper.rotate(
-        Base.Vector(0, 0, 0), Base.Vector(0, 0, 1), rotation_angles[2]
-    )  # Rotate around Z
-    taper.rotate(
-        Base.Vector(0, 0, 0), Base.Vector(1, 0, 0), rotation_angles[0]
-    )  # Rotate around X
-    taper.rotate(
-        Base.Vector(0, 0, 0), Base.Vector(0, 1, 0), rotation_angles[1]
-    )  # Rotate around Y
-    taper.translate(Base.Vector(loc[0], loc[1], loc[2]))  # Move to be centred on loc
-    # Returning the aperture to it's original location so that it is
-    # where other functions expect.
-    aperture2.translate(Base.Vector(-taper_length, 0, 0))
-    return taper
+    taper = _lofted_taper(aperture1, aperture2, taper_length, aperture_xy_offset)
+    return place(taper, make_placement(loc, rotation_angles))
 
 
 def rotate_cartesian(x, y, angle):
@@ -352,6 +950,45 @@ def rotate_cartesian(x, y, angle):
     return x_out, y_out
 
 
+def make_placement(loc=(0, 0, 0), rotation_angles=(0, 0, 0), centre=(0, 0, 0)):
+    """Combines the rotations and translation used by the builders into a single
+    placement, so that the shape only needs to be transformed once.
+    The rotations are about centre and are applied around Z, then X, then Y.
+    The translation by loc is applied last.
+
+    Args:
+        loc (tuple): The translation applied after the rotations.
+        rotation_angles (tuple) : The angles (deg) to rotate about in the three
+                                  cartesian directions.
+        centre (tuple): The co ordinates of the centre of rotation.
+
+    Returns:
+        placement (FreeCAD placement): The combined transform.
+    """
+    rotation = (
+        FreeCAD.Rotation(Base.Vector(0, 1, 0), float(rotation_angles[1]))
+        .multiply(FreeCAD.Rotation(Base.Vector(1, 0, 0), float(rotation_angles[0])))
+        .multiply(FreeCAD.Rotation(Base.Vector(0, 0, 1), float(rotation_angles[2])))
+    )
+    centre = Base.Vector(centre[0], centre[1], centre[2])
+    base = centre + Base.Vector(loc[0], loc[1], loc[2]) - rotation.multVec(centre)
+    return FreeCAD.Placement(base, rotation)
+
+
+def place(shp, placement):
+    """Applies a placement to a shape in a single step.
+
+    Args:
+        shp (FreeCAD shape): The shape to move. It is modified in place.
+        placement (FreeCAD placement): The transform to apply.
+
+    Returns:
+        shp (FreeCad shape): The moved shape.
+    """
+    shp.Placement = placement.multiply(shp.Placement)
+    return shp
+
+
 def rotate_at(shp, loc=(0, 0, 0), rotation_angles=(0, 0, 0)):
     """Rotates a shape around a point in space.
 
@@ -364,16 +1001,7 @@ def rotate_at(shp, loc=(0, 0, 0), rotation_angles=(0, 0, 0)):
     Returns:
         shp (FreeCad shape): The rotated shape.
     """
-    shp.rotate(
-        Base.Vector(loc[0], loc[1], loc[2]), Base.Vector(0, 0, 1), rotation_angles[2]
-    )  # Rotate around Z
-    shp.rotate(
-        Base.Vector(loc[0], loc[1], loc[2]), Base.Vector(1, 0, 0), rotation_angles[0]
-    )  # Rotate around X
-    shp.rotate(
-        Base.Vector(loc[0], loc[1], loc[2]), Base.Vector(0, 1, 0), rotation_angles[1]
-    )  # Rotate around Y
-    return shp
+    return place(shp, make_placement(rotation_angles=rotation_angles, centre=loc))
 
 
 def ellipse_track(e_height, e_width, x):
@@ -429,11 +1057,24 @@ def generate_output_files(
     solvertype="standard",
     mesh_resolution=5,
     just_cad=0,
+    resources=None,
+    timings=None,
+    mesh_limits=None,
+    materials=None,
+    register_run=True,
 ):
     """Takes the dictionary of parts, converts them to meshes.
     Saves the resulting meshes in both binary and ascii STL format.
-    (ECHO needs binary, GdfidL needs ASCII).
-     Also saves the Geometry in a freeCAD document.
+    (ECHO needs binary, GdfidL needs ASCII). The STL files are written from
+    the mesh arrays in background threads while the next part is meshed.
+    If a material map is given the GdfidL and ECHO geometry files which read
+    the STL files are also written (see solver_exporters).
+     Also saves the Geometry in a freeCAD document, and each part as a BREP
+     file which can be loaded on its own (see part_store).
+     The parameters are written as text and as a JSON sidecar, and the run is
+     added to the index and the catalogue in root_loc (see run_sidecar and
+     sweep_catalogue). The quality of each mesh is measured and written to the
+     sidecar.
 
      Args:
             root_loc (str): location of the folder the results are writen to.
@@ -447,7 +1088,24 @@ def generate_output_files(
                                    Fineness parameter in meshFromShape)
             just_cad(int): selects if the STL files are generated. Early in the design
                            it can be useful to turn them off
+            resources (dict): Tracker from track_point which the meshes are
+                              registered with.
+            timings (dict): Times taken before this call (s), added to the
+                            sidecar.
+            mesh_limits (dict): Limits on the mesh quality measures (see
+                                mesh_quality_problems). If a mesh exceeds them a
+                                ModelException is raised once the outputs are
+                                written. The problems are kept in the sidecar,
+                                and the run is not added to the index or
+                                catalogue.
+            materials (dict): The material of each part (see solver_exporters).
+            register_run (bool): Add the run to the index and catalogue. The
+                                 workers of a distributed sweep leave this to
+                                 the coordinator, as the catalogue can not be
+                                 shared safely over NFS.
     """
+    if materials is not None:
+        check_material_map(list(parts_list), materials)
     document_name = "".join([model_name, "_model__", tag])
     output_loc = os.path.join(root_loc, "".join([model_name, "_", tag]))
     if not os.path.exists(output_loc):
@@ -457,61 +1115,124 @@ def generate_output_files(
     if not os.path.exists(os.path.join(output_loc, "ascii")):
         os.makedirs(os.path.join(output_loc, "ascii"))
 
+    timings = dict(timings or {})
+    part_records = {}
+    mesh_problems = []
+    stl_files = {}
+    start_time = time.time()
     doc = FreeCAD.newDocument(document_name)
-    part_labels = parts_list.keys()
-    for part in part_labels:
-        part_name = "-".join([model_name, part])
-        my_object = doc.addObject("Part::Feature", part_name)
-        my_object.Shape = parts_list[part]
-    doc.recompute()
-    # Saving to a short named temp file then doing an OS rename in order to avoid path
-    #  length limitation issues when saving the temp file.
-    doc.saveAs(os.path.join(output_loc, "".join(["A", ".FCStd"])))
-    outfilename = os.path.join(output_loc, "".join([model_name, "_", tag, ".FCStd"]))
-    if os.path.exists(outfilename):
-        os.remove(outfilename)
-    os.rename(os.path.join(output_loc, "".join(["A", ".FCStd"])), outfilename)
-    print(outfilename)
-    if just_cad == 0:
+    # Threads writing the STL files, so the disk writes overlap the meshing.
+    writer = ThreadPoolExecutor(max_workers=4)
+    writes = []
+    try:
+        part_labels = parts_list.keys()
         for part in part_labels:
+            part_records[part] = {"stl_file": None, "facets": None}
             part_name = "-".join([model_name, part])
-            # Generate a mesh from the shape.
-            mesh_name = "".join([part_name, " (Meshed)"])
-            print("".join(["generating STL mesh for ", mesh_name]))
-            if solvertype == "netgen":
-                # Using the netgen mesher
-                m1 = MeshPart.meshFromShape(
-                    Shape=parts_list[part],
-                    GrowthRate=0.1,
-                    SegPerEdge=mesh_resolution,
-                    SegPerRadius=mesh_resolution,
-                    SecondOrder=0,
-                    Optimize=1,
-                    AllowQuad=0,
-                )
-            elif solvertype == "standard":
-                # Using standard mesher
-                m1 = MeshPart.meshFromShape(
-                    Shape=parts_list[part],
-                    LinearDeflection=0.01,
-                    AngularDeflection=0.1,
-                    Relative=True,
-                )
-            else:
-                raise ValueError("solver type should be netgen or standard")
+            my_object = doc.addObject("Part::Feature", part_name)
+            my_object.Shape = parts_list[part]
+        doc.recompute()
+        # Saving to a short named temp file then doing an OS rename in order to avoid path
+        #  length limitation issues when saving the temp file.
+        doc.saveAs(os.path.join(output_loc, "".join(["A", ".FCStd"])))
+        outfilename = os.path.join(output_loc, "".join([model_name, "_", tag, ".FCStd"]))
+        if os.path.exists(outfilename):
+            os.remove(outfilename)
+        os.rename(os.path.join(output_loc, "".join(["A", ".FCStd"])), outfilename)
+        print(outfilename)
+        write_part_store(output_loc, model_name, parts_list)
+        timings["cad"] = time.time() - start_time
+        if just_cad == 0:
+            for part in part_labels:
+                part_name = "-".join([model_name, part])
+                # Generate a mesh from the shape.
+                mesh_name = "".join([part_name, " (Meshed)"])
+                print("".join(["generating STL mesh for ", mesh_name]))
+                if solvertype == "netgen":
+                    # Using the netgen mesher
+                    m1 = MeshPart.meshFromShape(
+                        Shape=parts_list[part],
+                        GrowthRate=0.1,
+                        SegPerEdge=mesh_resolution,
+                        SegPerRadius=mesh_resolution,
+                        SecondOrder=0,
+                        Optimize=1,
+                        AllowQuad=0,
+                    )
+                elif solvertype == "standard":
+                    # Using standard mesher
+                    m1 = MeshPart.meshFromShape(
+                        Shape=parts_list[part],
+                        LinearDeflection=0.01,
+                        AngularDeflection=0.1,
+                        Relative=True,
+                    )
+                else:
+                    raise ValueError("solver type should be netgen or standard")
 
-            clean_stl(m1)
+                clean_stl(m1)
 
-            mymesh = doc.addObject("Mesh::Feature", "Mesh")
-            mymesh.Mesh = m1
-            mymesh.Label = mesh_name
-            mymesh.Mesh.write(
-                os.path.join(output_loc, "ascii", "".join([part_name, ".stl"])),
-                "AST",
-                mesh_name,
-            )
+                vertices, facets = mesh_arrays(m1)
+                quality = mesh_quality(vertices, facets)
+                if mesh_limits:
+                    mesh_problems.extend(
+                        [
+                            "".join([part, ": ", problem])
+                            for problem in mesh_quality_problems(quality, mesh_limits)
+                        ]
+                    )
 
-    FreeCAD.closeDocument(document_name)
+                mymesh = doc.addObject("Mesh::Feature", "Mesh")
+                mymesh.Mesh = m1
+                mymesh.Label = mesh_name
+                stl_files[part] = {
+                    "ascii": os.path.join(
+                        output_loc, "ascii", "".join([part_name, ".stl"])
+                    ),
+                    "binary": os.path.join(
+                        output_loc, "binary", "".join([part_name, ".stl"])
+                    ),
+                }
+                # The writers only get the NumPy arrays, which are never changed,
+                # as FreeCAD meshes are not safe to use from several threads.
+                writes.append(
+                    writer.submit(
+                        write_ascii_stl,
+                        stl_files[part]["ascii"],
+                        vertices,
+                        facets,
+                        mesh_name,
+                    )
+                )
+                writes.append(
+                    writer.submit(
+                        write_binary_stl,
+                        stl_files[part]["binary"],
+                        vertices,
+                        facets,
+                        mesh_name,
+                    )
+                )
+                part_records[part] = {
+                    "stl_file": os.path.relpath(stl_files[part]["ascii"], root_loc),
+                    "binary_stl_file": os.path.relpath(
+                        stl_files[part]["binary"], root_loc
+                    ),
+                    "facets": m1.CountFacets,
+                    "quality": quality,
+                }
+                register(resources, meshes=[m1])
+            for write in writes:
+                # Raises any error from the writer.
+                write.result()
+            if materials is not None:
+                write_solver_files(output_loc, model_name, tag, stl_files, materials)
+            timings["meshing"] = time.time() - start_time - timings["cad"]
+    finally:
+        writer.shutdown(wait=True)
+        # Closing the document releases its copies of the shapes and meshes,
+        # even if the meshing failed.
+        FreeCAD.closeDocument(document_name)
 
     paramfilename = os.path.join(output_loc, "A.txt")
     parameter_file_name = os.path.join(
@@ -528,3 +1249,18 @@ def generate_output_files(
     param_file.close()
 
     os.rename(paramfilename, parameter_file_name)
+
+    sidecar = make_sidecar(
+        model_name, tag, input_parameters, timings=timings, parts=part_records
+    )
+    sidecar["mesh_problems"] = mesh_problems
+    sidecar_file = write_sidecar(output_loc, sidecar)
+    if register_run and not mesh_problems:
+        append_to_index(root_loc, sidecar, sidecar_file)
+        record_run(root_loc, sidecar, sidecar_file, outfilename)
+    if mesh_problems:
+        print("Mesh quality limits exceeded\n\t", "\n\t".join(mesh_problems))
+        try:
+            raise ValueError("; ".join(mesh_problems))
+        except ValueError as e:
+            raise ModelException(e)
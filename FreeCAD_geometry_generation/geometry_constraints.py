@@ -0,0 +1,295 @@
+from math import radians, sin
+
+# Cheap checks of the geometric preconditions of the aperture and component
+# builders. They only do plain arithmetic on the input values (no Part calls),
+# so invalid sweep points can be rejected before any CAD work is done.
+# Every check returns a list of problems, which is empty if the inputs are valid.
+
+
+def _value(quantity):
+    """Gets the value of a FreeCAD quantity (in mm or deg) or a plain number."""
+    return float(getattr(quantity, "Value", quantity))
+
+
+def _positive(problems, **values):
+    for name, value in values.items():
+        if not _value(value) > 0:
+            problems.append("".join([name, " (", str(value), ") must be positive"]))
+
+
+def _less_than(problems, name, value, limit_name, limit):
+    if not _value(value) < _value(limit):
+        problems.append(
+            "".join(
+                [
+                    name,
+                    " (",
+                    str(value),
+                    ") must be less than ",
+                    limit_name,
+                    " (",
+                    str(limit),
+                    ")",
+                ]
+            )
+        )
+
+
+def check_rectangle_aperture(aperture_height, aperture_width):
+    """Checks the inputs of make_rectangle_aperture."""
+    problems = []
+    _positive(problems, aperture_height=aperture_height, aperture_width=aperture_width)
+    return problems
+
+
+def check_rounded_rectangle_aperture(aperture_height, aperture_width, corner_radius):
+    """Checks the inputs of make_rounded_rectangle_aperture."""
+    problems = check_rectangle_aperture(aperture_height, aperture_width)
+    _positive(problems, corner_radius=corner_radius)
+    half_side = min(_value(aperture_height), _value(aperture_width)) / 2.0
+    _less_than(
+        problems, "corner_radius", corner_radius, "half the shorter side", half_side
+    )
+    return problems
+
+
+def check_racetrack_aperture(aperture_height, aperture_width):
+    """Checks the inputs of make_racetrack_aperture."""
+    problems = check_rectangle_aperture(aperture_height, aperture_width)
+    _less_than(
+        problems, "aperture_height", aperture_height, "aperture_width", aperture_width
+    )
+    return problems
+
+
+def check_octagonal_aperture(aperture_height, aperture_width, side_length, tb_length):
+    """Checks the inputs of make_octagonal_aperture."""
+    problems = check_rectangle_aperture(aperture_height, aperture_width)
+    _positive(problems, side_length=side_length, tb_length=tb_length)
+    _less_than(problems, "side_length", side_length, "aperture_height", aperture_height)
+    _less_than(problems, "tb_length", tb_length, "aperture_width", aperture_width)
+    return problems
+
+
+def check_circular_aperture(aperture_radius):
+    """Checks the inputs of make_circular_aperture."""
+    problems = []
+    _positive(problems, aperture_radius=aperture_radius)
+    return problems
+
+
+def check_elliptical_aperture(aperture_height, aperture_width):
+    """Checks the inputs of make_elliptical_aperture."""
+    return check_rectangle_aperture(aperture_height, aperture_width)
+
+
+def check_keyhole_aperture(pipe_radius, keyhole_height, keyhole_width):
+    """Checks the inputs of make_keyhole_aperture."""
+    problems = []
+    _positive(problems, pipe_radius=pipe_radius, keyhole_height=keyhole_height)
+    _less_than(
+        problems,
+        "keyhole_height",
+        keyhole_height,
+        "the pipe diameter",
+        2 * _value(pipe_radius),
+    )
+    _less_than(
+        problems,
+        "half the keyhole_height",
+        _value(keyhole_height) / 2.0,
+        "keyhole_width",
+        keyhole_width,
+    )
+    return problems
+
+
+def check_keyhole_aperture_flat_end(pipe_radius, keyhole_height, keyhole_width):
+    """Checks the inputs of make_keyhole_aperture_flat_end."""
+    problems = []
+    _positive(problems, pipe_radius=pipe_radius, keyhole_height=keyhole_height)
+    _less_than(
+        problems,
+        "keyhole_height",
+        keyhole_height,
+        "the pipe diameter",
+        2 * _value(pipe_radius),
+    )
+    if not problems:
+        # The flat end has to be beyond the point the slot meets the pipe.
+        x_intersection = (
+            _value(pipe_radius) ** 2 - (_value(keyhole_height) / 2.0) ** 2
+        ) ** 0.5
+        _less_than(
+            problems,
+            "the keyhole intersection",
+            x_intersection,
+            "keyhole_width",
+            keyhole_width,
+        )
+    return problems
+
+
+def check_arc_aperture(arc_inner_radius, arc_outer_radius, arc_length, blend_radius=0):
+    """Checks the inputs of make_arc_aperture."""
+    problems = []
+    _positive(problems, arc_inner_radius=arc_inner_radius, arc_length=arc_length)
+    _less_than(
+        problems,
+        "arc_inner_radius",
+        arc_inner_radius,
+        "arc_outer_radius",
+        arc_outer_radius,
+    )
+    _less_than(problems, "arc_length", arc_length, "a full circle", 360)
+    if _value(blend_radius) < 0:
+        problems.append("blend_radius must not be negative")
+    elif _value(blend_radius) > 0 and not problems:
+        thickness = _value(arc_outer_radius) - _value(arc_inner_radius)
+        half_angle = radians(_value(arc_length) / 2.0)
+        inner_chord = 2 * _value(arc_inner_radius) * sin(half_angle)
+        _less_than(
+            problems,
+            "blend_radius",
+            blend_radius,
+            "half the arc thickness",
+            thickness / 2.0,
+        )
+        _less_than(
+            problems,
+            "blend_radius",
+            blend_radius,
+            "half the inner chord",
+            inner_chord / 2.0,
+        )
+    return problems
+
+
+def check_polygon_with_tags(inner_radius, tag_radii, insert_angles, tag_widths):
+    """Checks the inputs of make_polygon_with_tags."""
+    problems = []
+    _positive(problems, inner_radius=inner_radius)
+    if not len(tag_radii) == len(insert_angles) == len(tag_widths):
+        problems.append("tag_radii, insert_angles and tag_widths differ in length")
+        return problems
+    for n, (tag_radius, tag_width) in enumerate(zip(tag_radii, tag_widths)):
+        tag = "".join(["tag ", str(n + 1), " "])
+        _positive(problems, **{tag + "width": tag_width})
+        _less_than(
+            problems,
+            tag + "width",
+            tag_width,
+            "the inner diameter",
+            2 * _value(inner_radius),
+        )
+        _less_than(problems, "inner_radius", inner_radius, tag + "radius", tag_radius)
+    if problems:
+        return problems
+    # Neighbouring tags must not overlap where they meet the inner radius.
+    tags = sorted(
+        (_value(angle) % 360, _value(width))
+        for angle, width in zip(insert_angles, tag_widths)
+    )
+    for n in range(len(tags)):
+        angle1, width1 = tags[n - 1]
+        angle2, width2 = tags[n]
+        separation = (angle2 - angle1) % 360 if len(tags) > 1 else 360
+        chord = 2 * _value(inner_radius) * sin(radians(separation / 2.0))
+        if separation <= 180 and chord < (width1 + width2) / 2.0:
+            problems.append(
+                "".join(["tags at ", str(angle1), " and ", str(angle2), " deg overlap"])
+            )
+    return problems
+
+
+def check_ellipse_track(e_height, e_width, x):
+    """Checks the inputs of ellipse_track."""
+    problems = []
+    _positive(problems, e_height=e_height, e_width=e_width)
+    if not problems and abs(_value(x)) > _value(e_width) / 2.0:
+        problems.append(
+            "".join(
+                [
+                    "x (",
+                    str(x),
+                    ") is outside the ellipse half width (",
+                    str(_value(e_width) / 2.0),
+                    ")",
+                ]
+            )
+        )
+    return problems
+
+
+def check_nose(aperture_radius, ring_width, ring_length, blend):
+    """Checks the inputs of make_nose."""
+    problems = []
+    _positive(
+        problems, aperture_radius=aperture_radius, ring_width=ring_width, blend=blend
+    )
+    _less_than(
+        problems,
+        "half the ring_width",
+        _value(ring_width) / 2.0,
+        "ring_length",
+        ring_length,
+    )
+    _less_than(problems, "blend", blend, "ring_length", ring_length)
+    return problems
+
+
+def check_stripline(input_parameters):
+    """Checks the inputs of make_stripline (which uses a 0.75mm blend radius)."""
+    problems = []
+    _less_than(
+        problems,
+        "twice the stripline_taper_length",
+        2 * _value(input_parameters["stripline_taper_length"]),
+        "total_stripline_length",
+        input_parameters["total_stripline_length"],
+    )
+    for width in ["stripline_width", "stripline_taper_end_width"]:
+        problems.extend(
+            "".join([width, ": ", problem])
+            for problem in check_arc_aperture(
+                arc_inner_radius=input_parameters["stripline_offset"],
+                arc_outer_radius=_value(input_parameters["stripline_offset"])
+                + _value(input_parameters["stripline_thickness"]),
+                arc_length=input_parameters[width],
+                blend_radius=0.75,
+            )
+        )
+    return problems
+
+
+# The checks to run for each builder, keyed on the builder name.
+BUILDER_CHECKS = {
+    "make_rectangle_aperture": check_rectangle_aperture,
+    "make_rounded_rectangle_aperture": check_rounded_rectangle_aperture,
+    "make_racetrack_aperture": check_racetrack_aperture,
+    "make_octagonal_aperture": check_octagonal_aperture,
+    "make_circular_aperture": check_circular_aperture,
+    "make_elliptical_aperture": check_elliptical_aperture,
+    "make_keyhole_aperture": check_keyhole_aperture,
+    "make_keyhole_aperture_flat_end": check_keyhole_aperture_flat_end,
+    "make_arc_aperture": check_arc_aperture,
+    "make_polygon_with_tags": check_polygon_with_tags,
+    "ellipse_track": check_ellipse_track,
+    "make_nose": check_nose,
+    "make_stripline": check_stripline,
+}
+
+
+def check_builder(builder, *args, **kwargs):
+    """Runs the constraint check of a builder on the arguments it would be given.
+
+    Args:
+        builder (function handle or str): The builder, or its name.
+
+    Returns:
+        problems (list): Descriptions of the violated constraints.
+    """
+    name = builder if isinstance(builder, str) else builder.__name__
+    if name not in BUILDER_CHECKS:
+        raise ValueError("".join(["There are no constraint checks for ", name]))
+    return BUILDER_CHECKS[name](*args, **kwargs)
@@ -0,0 +1,260 @@
+import os
+from sys import argv
+
+import FreeCAD
+
+from FreeCAD_geometry_generation.part_store import (
+    load_part,
+    load_part_manifest,
+    shape_signature,
+)
+
+# Outcome of a part comparison.
+UNCHANGED = "unchanged"
+CHANGED = "changed"
+ADDED = "added"
+REMOVED = "removed"
+
+
+def load_parts(fcstd_file):
+    """Reads the part shapes out of a document written by generate_output_files.
+
+    Args:
+        fcstd_file (str): The .FCStd file.
+
+    Returns:
+        parts (dict): Shapes keyed on the part label.
+    """
+    doc = FreeCAD.openDocument(fcstd_file)
+    try:
+        parts = {
+            obj.Label: obj.Shape.copy()
+            for obj in doc.Objects
+            if obj.TypeId == "Part::Feature"
+        }
+    finally:
+        FreeCAD.closeDocument(doc.Name)
+    return parts
+
+
+def compare_signatures(signature1, signature2, tolerance=1e-6, length_tolerance=1e-4):
+    """Compares the cheap properties of two shapes.
+
+    Args:
+        signature1 (dict): Signature of the first shape.
+        signature2 (dict): Signature of the second shape.
+        tolerance (float): Relative tolerance on the volume and area.
+        length_tolerance (float): Tolerance on the bounding box (mm).
+
+    Returns:
+        result (dict): The differences found. "status" is UNCHANGED, CHANGED
+                       or None if the properties are inconclusive.
+    """
+    volume_change = signature2["volume"] - signature1["volume"]
+    area_change = signature2["area"] - signature1["area"]
+    bbox_change = max(
+        abs(v2 - v1) for v1, v2 in zip(signature1["bbox"], signature2["bbox"])
+    )
+    result = {
+        "volume_change": volume_change,
+        "area_change": area_change,
+        "bbox_change": bbox_change,
+        "method": "properties",
+    }
+    if signature1["hash"] == signature2["hash"]:
+        result["status"] = UNCHANGED
+        result["method"] = "hash"
+    elif (
+        abs(volume_change) > tolerance * max(abs(signature1["volume"]), 1.0)
+        or abs(area_change) > tolerance * max(abs(signature1["area"]), 1.0)
+        or bbox_change > length_tolerance
+    ):
+        result["status"] = CHANGED
+    else:
+        # Same size and extent, but built differently. Only a boolean can tell.
+        result["status"] = None
+    return result
+
+
+def symmetric_difference_volume(shape1, shape2):
+    """Volume of the regions which are only in one of the two shapes.
+
+    Args:
+        shape1 (FreeCAD shape): The first shape.
+        shape2 (FreeCAD shape): The second shape.
+
+    Returns:
+        volume (float): The symmetric difference volume (mm^3).
+    """
+    return shape1.cut(shape2).Volume + shape2.cut(shape1).Volume
+
+
+def compare_shapes(
+    shape1,
+    shape2,
+    tolerance=1e-6,
+    length_tolerance=1e-4,
+    boolean=True,
+    signature1=None,
+    signature2=None,
+):
+    """Compares two shapes. The cheap property checks are done first and the
+    boolean symmetric difference is only run when they are inconclusive.
+
+    Args:
+        shape1 (FreeCAD shape): The first shape.
+        shape2 (FreeCAD shape): The second shape.
+        tolerance (float): Relative tolerance on the volume and area.
+        length_tolerance (float): Tolerance on the bounding box (mm).
+        boolean (bool): If False inconclusive comparisons are left undecided.
+        signature1 (dict): Precomputed signature of shape1.
+        signature2 (dict): Precomputed signature of shape2.
+
+    Returns:
+        result (dict): The status and the size of the changes.
+    """
+    if signature1 is None:
+        signature1 = shape_signature(shape1)
+    if signature2 is None:
+        signature2 = shape_signature(shape2)
+    result = compare_signatures(
+        signature1, signature2, tolerance=tolerance, length_tolerance=length_tolerance
+    )
+    if result["status"] is None and boolean:
+        difference = symmetric_difference_volume(shape1, shape2)
+        result["method"] = "boolean"
+        result["difference_volume"] = difference
+        if difference > tolerance * max(abs(signature1["volume"]), 1.0):
+            result["status"] = CHANGED
+        else:
+            result["status"] = UNCHANGED
+    return result
+
+
+def diff_part_stores(
+    output_loc1, output_loc2, tolerance=1e-6, length_tolerance=1e-4, boolean=True
+):
+    """Finds the parts which changed between two model outputs, using the
+    signatures in their part stores. Parts are only loaded when a boolean is
+    needed to decide.
+
+    Args:
+        output_loc1 (str): The output folder of the first run.
+        output_loc2 (str): The output folder of the second run.
+        tolerance (float): Relative tolerance on the volume and area.
+        length_tolerance (float): Tolerance on the bounding box (mm).
+        boolean (bool): Allow boolean operations for inconclusive parts.
+
+    Returns:
+        results (dict): The comparison result keyed on part label.
+    """
+    manifest1 = load_part_manifest(output_loc1)
+    manifest2 = load_part_manifest(output_loc2)
+    results = {}
+    for label in sorted(set(manifest1["parts"]) | set(manifest2["parts"])):
+        if label not in manifest2["parts"]:
+            results[label] = {"status": REMOVED}
+        elif label not in manifest1["parts"]:
+            results[label] = {"status": ADDED}
+        else:
+            signature1 = manifest1["parts"][label]
+            signature2 = manifest2["parts"][label]
+            result = compare_signatures(
+                signature1,
+                signature2,
+                tolerance=tolerance,
+                length_tolerance=length_tolerance,
+            )
+            if result["status"] is None and boolean:
+                result = compare_shapes(
+                    load_part(output_loc1, label, manifest1),
+                    load_part(output_loc2, label, manifest2),
+                    tolerance=tolerance,
+                    length_tolerance=length_tolerance,
+                    signature1=signature1,
+                    signature2=signature2,
+                )
+            results[label] = result
+    return results
+
+
+def diff_models(
+    fcstd_file1, fcstd_file2, tolerance=1e-6, length_tolerance=1e-4, boolean=True
+):
+    """Finds the parts which changed between two model outputs.
+    If both outputs have part stores (see part_store) they are used instead of
+    opening the documents.
+
+    Args:
+        fcstd_file1 (str): The .FCStd file of the first run.
+        fcstd_file2 (str): The .FCStd file of the second run.
+        tolerance (float): Relative tolerance on the volume and area.
+        length_tolerance (float): Tolerance on the bounding box (mm).
+        boolean (bool): Allow boolean operations for inconclusive parts.
+
+    Returns:
+        results (dict): The comparison result keyed on part label.
+    """
+    output_loc1 = os.path.dirname(fcstd_file1)
+    output_loc2 = os.path.dirname(fcstd_file2)
+    if load_part_manifest(output_loc1) and load_part_manifest(output_loc2):
+        return diff_part_stores(
+            output_loc1,
+            output_loc2,
+            tolerance=tolerance,
+            length_tolerance=length_tolerance,
+            boolean=boolean,
+        )
+    parts1 = load_parts(fcstd_file1)
+    parts2 = load_parts(fcstd_file2)
+    results = {}
+    for label in sorted(set(parts1) | set(parts2)):
+        if label not in parts2:
+            results[label] = {"status": REMOVED}
+        elif label not in parts1:
+            results[label] = {"status": ADDED}
+        else:
+            results[label] = compare_shapes(
+                parts1[label],
+                parts2[label],
+                tolerance=tolerance,
+                length_tolerance=length_tolerance,
+                boolean=boolean,
+            )
+    return results
+
+
+def changed_parts(results):
+    """The labels of the parts which need re-meshing."""
+    return [label for label, result in results.items() if result["status"] != UNCHANGED]
+
+
+def print_diff(results):
+    for label, result in results.items():
+        if result["status"] in (ADDED, REMOVED, UNCHANGED):
+            print(label, ":", result["status"])
+        else:
+            print(
+                label,
+                ":",
+                result["status"],
+                "(",
+                result["method"],
+                ") volume change",
+                result["volume_change"],
+                "area change",
+                result["area_change"],
+                "bounding box change",
+                result["bbox_change"],
+            )
+            if "difference_volume" in result:
+                print("\tsymmetric difference volume", result["difference_volume"])
+
+
+if __name__ == "__main__":
+    # Run with the FreeCAD python interpreter.
+    # python geometry_diff.py <first .FCStd> <second .FCStd>
+    if len(argv) != 3 or not all(os.path.isfile(name) for name in argv[1:]):
+        print("Usage: geometry_diff.py <first .FCStd> <second .FCStd>")
+    else:
+        print_diff(diff_models(argv[1], argv[2]))
@@ -0,0 +1,151 @@
+import Part
+
+from FreeCAD_geometry_generation.code_hash import function_hash
+
+# Results of the component builders, keyed on the builder and its other
+# arguments. Each entry keeps the input parameters the build actually read, so
+# a later call only rebuilds if one of those has changed.
+_BUILD_CACHE = {}
+# Number of parameter variants kept for each builder and argument set.
+BUILD_CACHE_SIZE = 8
+
+
+class TrackedParameters(dict):
+    """Input parameter dictionary which records the keys the builders read.
+    Checking for a key counts as a read, as the result can depend on it.
+    Iterating over the whole dictionary reads every key.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = set()
+
+    def __getitem__(self, key):
+        self.reads.add(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.reads.add(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self.reads.add(key)
+        return super().__contains__(key)
+
+    def __iter__(self):
+        self.reads.update(super().keys())
+        return super().__iter__()
+
+    def keys(self):
+        self.reads.update(super().keys())
+        return super().keys()
+
+    def values(self):
+        self.reads.update(super().keys())
+        return super().values()
+
+    def items(self):
+        self.reads.update(super().keys())
+        return super().items()
+
+
+def clear_build_cache():
+    _BUILD_CACHE.clear()
+
+
+def _value_key(value):
+    """Comparable form of a parameter value."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_value_key(val) for val in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _value_key(val)) for key, val in value.items()))
+    if hasattr(value, "Value") and hasattr(value, "Unit"):
+        return (value.Value, str(value.Unit))
+    return value
+
+
+def _builder_key(builder, args, kwargs):
+    """Identifies a builder, its code and its arguments other than the
+    input parameters."""
+    return (
+        builder.__module__,
+        builder.__name__,
+        function_hash(builder),
+        repr(_value_key(args)),
+        repr(_value_key(kwargs)),
+    )
+
+
+def _recorded_values(input_parameters, keys):
+    """The values of the keys read by a build. Missing keys are recorded as
+    missing, as checking for them can change the result."""
+    return {
+        key: (
+            (True, _value_key(dict.__getitem__(input_parameters, key)))
+            if dict.__contains__(input_parameters, key)
+            else (False, None)
+        )
+        for key in keys
+    }
+
+
+def copy_result(result):
+    """Copies the shapes in a builder result, so the cached shapes are never
+    moved or modified by the caller."""
+    if isinstance(result, Part.Shape):
+        return result.copy()
+    if isinstance(result, dict):
+        return {key: copy_result(val) for key, val in result.items()}
+    if isinstance(result, (list, tuple)):
+        return type(result)(copy_result(val) for val in result)
+    return result
+
+
+def cached_build(builder, input_parameters, *args, **kwargs):
+    """Calls builder(input_parameters, *args, **kwargs), reusing an earlier
+    result if none of the parameters it read have changed.
+    Builders called this way from within another cached build add their
+    reads to the outer build, so the dependencies carry up the tree.
+
+    Args:
+        builder (function handle): A component builder taking the model input
+                                   parameters as its first argument.
+        input_parameters (dict): The model input parameters.
+
+    Returns:
+        result: Copies of the builder result.
+    """
+    key = _builder_key(builder, args, kwargs)
+    entries = _BUILD_CACHE.setdefault(key, [])
+    for n, (recorded, result) in enumerate(entries):
+        if _recorded_values(input_parameters, recorded) == recorded:
+            print("Reusing ", builder.__name__)
+            entries.insert(0, entries.pop(n))
+            break
+    else:
+        # dict.items avoids counting the copy as a read of every key.
+        tracked = TrackedParameters(dict.items(input_parameters))
+        result = builder(tracked, *args, **kwargs)
+        recorded = _recorded_values(input_parameters, tracked.reads)
+        entries.insert(0, (recorded, result))
+        del entries[BUILD_CACHE_SIZE:]
+    if isinstance(input_parameters, TrackedParameters):
+        input_parameters.reads.update(recorded)
+    return copy_result(result)
+
+
+def build_dependencies(builder):
+    """The input parameters each cached variant of a builder depends on.
+
+    Args:
+        builder (function handle): The component builder.
+
+    Returns:
+        dependencies (list): Sorted parameter names for each cached variant.
+    """
+    return [
+        sorted(recorded)
+        for key, entries in _BUILD_CACHE.items()
+        if key[:2] == (builder.__module__, builder.__name__)
+        for recorded, _ in entries
+    ]
@@ -0,0 +1,156 @@
+from itertools import chain
+from operator import attrgetter
+
+import numpy as np
+
+# Triangles with a smallest angle below this (degrees) are counted as slivers.
+SLIVER_ANGLE = 5.0
+# Number of bins in the edge length histogram.
+EDGE_BINS = 10
+
+
+def mesh_arrays(mesh):
+    """Gets the vertex and facet arrays of a FreeCAD mesh.
+
+    Args:
+        mesh (FreeCAD mesh): The mesh.
+
+    Returns:
+        vertices (numpy array): (n_points, 3) co ordinates.
+        facets (numpy array): (n_facets, 3) vertex indices of each triangle.
+    """
+    points, facets = mesh.Topology
+    # The points and facets are Python objects, so they are read straight into
+    # the arrays with fromiter rather than through lists of tuples.
+    vertices = np.empty((len(points), 3), dtype=float)
+    for n, axis in enumerate(("x", "y", "z")):
+        vertices[:, n] = np.fromiter(
+            map(attrgetter(axis), points), dtype=float, count=len(points)
+        )
+    facets = np.fromiter(
+        chain.from_iterable(facets), dtype=np.int64, count=3 * len(facets)
+    ).reshape(-1, 3)
+    return vertices, facets
+
+
+def edge_counts(facets):
+    """Counts how many facets share each edge.
+
+    Args:
+        facets (numpy array): (n_facets, 3) vertex indices of each triangle.
+
+    Returns:
+        counts (numpy array): The number of facets on each distinct edge.
+    """
+    edges = np.concatenate([facets[:, [0, 1]], facets[:, [1, 2]], facets[:, [2, 0]]])
+    # The direction of an edge does not matter.
+    edges = np.sort(edges, axis=1)
+    _, counts = np.unique(edges, axis=0, return_counts=True)
+    return counts
+
+
+def mesh_quality(vertices, facets, sliver_angle=SLIVER_ANGLE, bins=EDGE_BINS):
+    """Measures the quality of a triangle mesh.
+    The aspect ratio is the longest edge times the perimeter over 4 sqrt(3)
+    times the area, so an equilateral triangle gives 1. Degenerate (zero area)
+    facets have a zero minimum angle and no aspect ratio. They are left out of
+    mean_aspect_ratio, and max_aspect_ratio is None if there are any.
+
+    Args:
+        vertices (numpy array): (n_points, 3) co ordinates.
+        facets (numpy array): (n_facets, 3) vertex indices of each triangle.
+        sliver_angle (float): Smallest angle of a sliver triangle (degrees).
+        bins (int): Number of bins in the edge length histogram.
+
+    Returns:
+        quality (dict): The quality measures, as plain numbers for the sidecar.
+    """
+    if len(facets) == 0:
+        return {"facets": 0, "points": len(vertices), "watertight": False}
+    corners = vertices[facets]
+    # Edge k runs from corner k to corner k + 1.
+    edges = np.roll(corners, -1, axis=1) - corners
+    lengths = np.linalg.norm(edges, axis=2)
+    double_area = np.linalg.norm(np.cross(edges[:, 0], edges[:, 1]), axis=1)
+
+    # The angle at corner k is between edge k and the reversed edge k - 1.
+    before = -np.roll(edges, 1, axis=1)
+    length_products = lengths * np.roll(lengths, 1, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cosines = np.einsum("ijk,ijk->ij", edges, before) / length_products
+        aspect_ratio = (
+            lengths.max(axis=1) * lengths.sum(axis=1) / (2 * np.sqrt(3) * double_area)
+        )
+    angles = np.degrees(np.arccos(np.clip(np.nan_to_num(cosines, nan=1.0), -1, 1)))
+    min_angle = angles.min(axis=1)
+    degenerate = double_area <= np.finfo(float).eps * lengths.max(axis=1) ** 2
+    min_angle[degenerate] = 0.0
+
+    counts = edge_counts(facets)
+    boundary_edges = int(np.count_nonzero(counts == 1))
+    non_manifold_edges = int(np.count_nonzero(counts > 2))
+    if np.isclose(lengths.min(), lengths.max()):
+        # All the edges are the same length.
+        histogram = np.array([lengths.size])
+        bin_edges = np.array([lengths.min(), lengths.max()])
+    else:
+        histogram, bin_edges = np.histogram(lengths, bins=bins)
+    finite = aspect_ratio[~degenerate]
+    return {
+        "facets": len(facets),
+        "points": len(vertices),
+        "degenerate_facets": int(np.count_nonzero(degenerate)),
+        "sliver_facets": int(np.count_nonzero(min_angle < sliver_angle)),
+        "min_angle": float(min_angle.min()),
+        "mean_min_angle": float(min_angle.mean()),
+        # JSON has no infinity, so an unbounded ratio is stored as None.
+        "max_aspect_ratio": None if degenerate.any() else float(finite.max()),
+        "mean_aspect_ratio": float(finite.mean()) if len(finite) else None,
+        "edge_length": {
+            "min": float(lengths.min()),
+            "max": float(lengths.max()),
+            "mean": float(lengths.mean()),
+            "histogram": histogram.tolist(),
+            "bin_edges": bin_edges.tolist(),
+        },
+        "boundary_edges": boundary_edges,
+        "non_manifold_edges": non_manifold_edges,
+        "watertight": boundary_edges == 0 and non_manifold_edges == 0,
+    }
+
+
+def mesh_quality_problems(quality, limits):
+    """Checks the quality measures of a mesh against limits.
+
+    Args:
+        quality (dict): The measures from mesh_quality.
+        limits (dict): Limits keyed on measure name. Measures starting with
+                       'min_' must not be below their limit, 'watertight' must
+                       match, and the others must not be above their limit.
+                       e.g. {'min_angle': 5, 'max_aspect_ratio': 20,
+                       'non_manifold_edges': 0, 'watertight': True}
+                       A measure which is None (unbounded) fails its limit.
+
+    Returns:
+        problems (list): A description of each limit which is exceeded.
+    """
+    if quality["facets"] == 0:
+        return ["The mesh has no facets"]
+    problems = []
+    for name, limit in limits.items():
+        if name not in quality or isinstance(quality[name], dict):
+            raise ValueError("".join(["Unknown mesh quality measure ", name]))
+        value = quality[name]
+        if value is None:
+            failed = True
+        elif isinstance(limit, bool):
+            failed = value != limit
+        elif name.startswith("min_"):
+            failed = value < limit
+        else:
+            failed = value > limit
+        if failed:
+            problems.append(
+                "".join([name, " is ", str(value), " (limit ", str(limit), ")"])
+            )
+    return problems
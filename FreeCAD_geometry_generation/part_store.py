@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+
+import Part
+
+from FreeCAD_geometry_generation.sweep_manifest import write_json
+
+# Each model output folder gets a "brep" folder holding every part as a
+# standalone BREP file and a parts.json manifest of their cheap properties.
+# Parts can then be loaded one at a time without opening the FreeCAD document.
+STORE_FOLDER = "brep"
+STORE_MANIFEST = "parts.json"
+
+
+def brep_hash(shape, brep=None):
+    """Hash of the BREP description of a shape. Identical geometry built the
+    same way gives the same hash.
+
+    Args:
+        shape (FreeCAD shape): The shape.
+        brep (str): The BREP string of the shape, if it has already been made.
+    """
+    if brep is None:
+        brep = shape.exportBrepToString()
+    return hashlib.sha1(brep.encode("utf-8")).hexdigest()
+
+
+def shape_signature(shape, brep=None):
+    """Cheap properties used to compare shapes.
+
+    Args:
+        shape (FreeCAD shape): The shape.
+        brep (str): The BREP string of the shape, if it has already been made.
+
+    Returns:
+        signature (dict): volume, area, bounding box and BREP hash of the shape.
+    """
+    box = shape.BoundBox
+    return {
+        "volume": shape.Volume,
+        "area": shape.Area,
+        "bbox": [box.XMin, box.YMin, box.ZMin, box.XMax, box.YMax, box.ZMax],
+        "hash": brep_hash(shape, brep),
+    }
+
+
+def store_path(output_loc):
+    """Location of the part store of a model output folder."""
+    return os.path.join(output_loc, STORE_FOLDER)
+
+
+def write_part_store(output_loc, model_name, parts_list):
+    """Writes every part as a BREP file with a manifest of its signature.
+
+    Args:
+        output_loc (str): The model output folder.
+        model_name (str): Name of the model.
+        parts_list (dict): The part shapes, keyed on part name.
+
+    Returns:
+        manifest (dict): The part store manifest.
+    """
+    folder = store_path(output_loc)
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    manifest = {"model_name": model_name, "parts": {}}
+    for part, shape in parts_list.items():
+        # Labelled as in the FreeCAD document.
+        label = "-".join([model_name, part])
+        brep = shape.exportBrepToString()
+        file_name = "".join([label, ".brep"])
+        with open(os.path.join(folder, file_name), "w") as brep_file:
+            brep_file.write(brep)
+        record = shape_signature(shape, brep)
+        record["file"] = file_name
+        manifest["parts"][label] = record
+    # The manifest is written last, so it only lists complete files.
+    write_json(manifest, os.path.join(folder, STORE_MANIFEST))
+    return manifest
+
+
+def load_part_manifest(output_loc):
+    """Reads the part store manifest of a model output folder.
+
+    Returns:
+        manifest (dict): The manifest, or None if the folder has no part store.
+    """
+    path = os.path.join(store_path(output_loc), STORE_MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as manifest_file:
+        return json.load(manifest_file)
+
+
+def load_part(output_loc, label, manifest=None):
+    """Loads a single part from the part store.
+
+    Args:
+        output_loc (str): The model output folder.
+        label (str): The part label (<model name>-<part name>).
+        manifest (dict): The store manifest, if already read.
+
+    Returns:
+        shape (FreeCAD shape): The part.
+    """
+    if manifest is None:
+        manifest = load_part_manifest(output_loc)
+    if manifest is None or label not in manifest["parts"]:
+        raise ValueError(
+            "".join(["There is no stored part ", label, " in ", output_loc])
+        )
+    return Part.read(
+        os.path.join(store_path(output_loc), manifest["parts"][label]["file"])
+    )
+
+
+def load_parts_from_store(output_loc, labels=None):
+    """Loads parts from the part store.
+
+    Args:
+        output_loc (str): The model output folder.
+        labels (list): The parts to load. Defaults to all of them.
+
+    Returns:
+        parts (dict): The shapes keyed on part label.
+    """
+    manifest = load_part_manifest(output_loc)
+    if manifest is None:
+        raise ValueError("".join(["There is no part store in ", output_loc]))
+    if labels is None:
+        labels = list(manifest["parts"])
+    return {label: load_part(output_loc, label, manifest) for label in labels}
@@ -0,0 +1,194 @@
+import json
+import os
+import subprocess
+import time
+from math import isclose
+
+from FreeCAD import Units
+
+from FreeCAD_geometry_generation.sweep_manifest import write_json
+
+# Name of the sweep level index in the output folder.
+INDEX_NAME = "sweep_index.jsonl"
+
+# Units the values of each FreeCAD quantity type are held in.
+BASE_UNITS = {
+    "": "",
+    "Length": "mm",
+    "Area": "mm^2",
+    "Volume": "mm^3",
+    "Angle": "deg",
+    "Frequency": "1/s",
+    "TimeSpan": "s",
+}
+
+_code_version = {}
+
+
+def code_version():
+    """The git version of this code, found once per process.
+
+    Returns:
+        version (str): Output of git describe, or None outside a git checkout.
+    """
+    if "version" not in _code_version:
+        try:
+            version = subprocess.check_output(
+                ["git", "describe", "--always", "--dirty", "--tags"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=subprocess.DEVNULL,
+            )
+            _code_version["version"] = version.decode("utf-8").strip()
+        except (OSError, subprocess.CalledProcessError):
+            _code_version["version"] = None
+    return _code_version["version"]
+
+
+def typed_value(value):
+    """Converts an input parameter into a value with its unit.
+
+    Args:
+        value (str or number): The parameter as given in the model inputs.
+
+    Returns:
+        record (dict): 'value' as a float in the base unit, 'unit', 'type'
+                       and the original 'input'. Values which are not
+                       quantities are kept as they are.
+    """
+    try:
+        quantity = Units.Quantity(value)
+    except Exception:
+        # FreeCAD does not use a single exception type for parse failures.
+        return {"value": value, "unit": None, "type": None, "input": value}
+    quantity_type = getattr(quantity.Unit, "Type", None)
+    return {
+        "value": quantity.Value,
+        "unit": BASE_UNITS.get(quantity_type, str(quantity.Unit)),
+        "type": quantity_type,
+        "input": str(value),
+    }
+
+
+def sidecar_path(output_loc, model_name, tag):
+    """Location of the JSON parameter sidecar of a model."""
+    return os.path.join(output_loc, "".join([model_name, "_", tag, "_parameters.json"]))
+
+
+def make_sidecar(model_name, tag, input_parameters, timings=None, parts=None):
+    """Builds the machine readable description of a model run.
+
+    Args:
+        model_name (str): Name of the model.
+        tag (str): Unique identifier string for the model iteration.
+        input_parameters (dict): The parameters used to make the model.
+        timings (dict): Times taken by the stages of the run (s).
+        parts (dict): For each part the STL file, facet count and mesh quality.
+
+    Returns:
+        sidecar (dict): The description.
+    """
+    return {
+        "model_name": model_name,
+        "tag": tag,
+        "code_version": code_version(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "parameters": {
+            name: typed_value(value) for name, value in input_parameters.items()
+        },
+        "timings": dict(timings or {}),
+        "parts": dict(parts or {}),
+    }
+
+
+def write_sidecar(output_loc, sidecar):
+    """Writes the sidecar next to the model outputs.
+
+    Returns:
+        path (str): The sidecar file name.
+    """
+    path = sidecar_path(output_loc, sidecar["model_name"], sidecar["tag"])
+    write_json(sidecar, path)
+    return path
+
+
+def append_to_index(root_loc, sidecar, sidecar_file):
+    """Adds a run to the index of all the runs written to root_loc.
+    Each run is one line, written in a single append, so that several
+    processes can add to the index at the same time.
+
+    Args:
+        root_loc (str): The folder all the model outputs are written to.
+        sidecar (dict): The sidecar of the run.
+        sidecar_file (str): Where the sidecar was written.
+    """
+    entry = {
+        "model_name": sidecar["model_name"],
+        "tag": sidecar["tag"],
+        "created": sidecar["created"],
+        "code_version": sidecar["code_version"],
+        "sidecar": os.path.relpath(sidecar_file, root_loc),
+        "parameters": {
+            name: record["value"] for name, record in sidecar["parameters"].items()
+        },
+    }
+    line = "".join([json.dumps(entry), "\n"]).encode("utf-8")
+    index_file = os.open(
+        os.path.join(root_loc, INDEX_NAME), os.O_WRONLY | os.O_CREAT | os.O_APPEND
+    )
+    try:
+        os.write(index_file, line)
+    finally:
+        os.close(index_file)
+
+
+def load_index(root_loc):
+    """Reads the index of the runs written to root_loc.
+    If a run was written more than once only the latest entry is kept.
+
+    Args:
+        root_loc (str): The folder all the model outputs are written to.
+
+    Returns:
+        runs (list): The index entries.
+    """
+    path = os.path.join(root_loc, INDEX_NAME)
+    if not os.path.exists(path):
+        return []
+    runs = {}
+    with open(path, "r") as index_file:
+        for line in index_file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A partial line left by a crashed writer.
+                continue
+            runs[(entry["model_name"], entry["tag"])] = entry
+    return list(runs.values())
+
+
+def _matches(recorded, value):
+    if isinstance(recorded, float) and isinstance(value, (int, float)):
+        return isclose(recorded, value, rel_tol=1e-9, abs_tol=1e-12)
+    return recorded == value
+
+
+def find_runs(runs, model_name=None, **parameters):
+    """Selects the runs with the given model name and parameter values.
+
+    Args:
+        runs (list): Index entries from load_index.
+        model_name (str): Only return runs of this model.
+        parameters: Required parameter values, in the base units (mm, deg).
+
+    Returns:
+        runs (list): The matching index entries.
+    """
+    return [
+        run
+        for run in runs
+        if (model_name is None or run["model_name"] == model_name)
+        and all(
+            _matches(run["parameters"].get(name), value)
+            for name, value in parameters.items()
+        )
+    ]
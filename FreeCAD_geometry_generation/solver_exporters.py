@@ -0,0 +1,218 @@
+import os
+
+# Electrical properties of the materials parts can be mapped to. 'type' is the
+# GdfidL material type. Conductivities (kappa) are in S/m.
+MATERIALS = {
+    "vacuum": {"type": "vacuum", "epsr": 1.0, "muer": 1.0, "kappa": 0.0},
+    "pec": {"type": "electric", "epsr": 1.0, "muer": 1.0, "kappa": None},
+    "copper": {"type": "normal", "epsr": 1.0, "muer": 1.0, "kappa": 5.8e7},
+    "stainless_steel": {"type": "normal", "epsr": 1.0, "muer": 1.0, "kappa": 1.4e6},
+    "alumina": {"type": "normal", "epsr": 9.4, "muer": 1.0, "kappa": 0.0},
+    "air": {"type": "normal", "epsr": 1.0006, "muer": 1.0, "kappa": 0.0},
+}
+# GdfidL reserves material 0 for vacuum, 1 for electric and 2 for magnetic
+# conductors. Other materials are numbered from here.
+GDFIDL_FIRST_MATERIAL = 3
+# The STL files are in mm, the solvers work in m.
+STL_SCALE = 1e-3
+
+
+def material_properties(material):
+    """Looks up a material.
+
+    Args:
+        material (str or dict): A name from MATERIALS, or a dict of properties
+                                with the same keys.
+
+    Returns:
+        properties (dict): The material properties.
+    """
+    if isinstance(material, dict):
+        properties = dict(MATERIALS["vacuum"])
+        properties["type"] = "normal"
+        properties.update(material)
+        properties.pop("name", None)
+        return properties
+    if material not in MATERIALS:
+        raise ValueError(
+            "".join(
+                [
+                    "Unknown material ",
+                    str(material),
+                    ". Use one of ",
+                    ", ".join(sorted(MATERIALS)),
+                    " or a dict of properties.",
+                ]
+            )
+        )
+    return MATERIALS[material]
+
+
+def check_material_map(part_names, material_map):
+    """Makes sure every part has a known material, so that a bad map is found
+    before any meshing is done.
+
+    Args:
+        part_names (list): The parts of the model.
+        material_map (dict): The material of each part, keyed on part name.
+    """
+    missing = [part for part in part_names if part not in material_map]
+    if missing:
+        raise ValueError(
+            "".join(["No material given for the parts ", ", ".join(missing)])
+        )
+    for part in part_names:
+        material_properties(material_map[part])
+
+
+def _material_name(part, material):
+    """The material name, or a name based on the part for unnamed materials."""
+    if isinstance(material, dict):
+        return material.get("name", "".join([part, "_material"]))
+    return material
+
+
+def gdfidl_geometry(stl_files, material_map):
+    """Builds a GdfidL geometry include file. Each STL is read with -stlfile,
+    in the order of the material map, so later parts overwrite earlier ones
+    where they overlap (e.g. list the vacuum after the metal it is cut from).
+
+    Args:
+        stl_files (dict): The ASCII STL file of each part, relative to the
+                          include file.
+        material_map (dict): The material of each part.
+
+    Returns:
+        text (str): The contents of the include file.
+    """
+    indices = {}
+    material_indices = {}
+    lines = ["# GdfidL geometry, generated by EM_CAD_frontend."]
+    material_lines = ["-material"]
+    next_index = GDFIDL_FIRST_MATERIAL
+    for part in material_map:
+        if part not in stl_files:
+            continue
+        material = material_map[part]
+        properties = material_properties(material)
+        name = _material_name(part, material)
+        if properties["type"] == "vacuum":
+            indices[part] = 0
+        elif properties["type"] == "electric":
+            indices[part] = 1
+        elif name in material_indices:
+            indices[part] = material_indices[name]
+        else:
+            indices[part] = material_indices[name] = next_index
+            next_index += 1
+            material_lines.extend(
+                [
+                    "".join(["    # ", name]),
+                    "".join(["    material= ", str(indices[part])]),
+                    "    type= normal",
+                    "".join(["    epsr= ", repr(properties["epsr"])]),
+                    "".join(["    muer= ", repr(properties["muer"])]),
+                    "".join(["    kappa= ", repr(properties["kappa"])]),
+                ]
+            )
+    if len(material_lines) > 1:
+        lines.extend(material_lines)
+    for part in material_map:
+        if part not in stl_files:
+            continue
+        lines.extend(
+            [
+                "".join(
+                    ["# ", part, " (", _material_name(part, material_map[part]), ")"]
+                ),
+                "-stlfile",
+                "".join(["    file= ", stl_files[part]]),
+                "".join(["    material= ", str(indices[part])]),
+                "".join(["    xscale= ", repr(STL_SCALE)]),
+                "".join(["    yscale= ", repr(STL_SCALE)]),
+                "".join(["    zscale= ", repr(STL_SCALE)]),
+                "    doit",
+            ]
+        )
+    return "\n".join(lines) + "\n"
+
+
+def echo_geometry(stl_files, material_map):
+    """Builds an ECHO geometry description. ECHO is set up from MATLAB, so this
+    is a MATLAB script filling a struct array with the binary STL file and
+    material properties of each part, in the order of the material map.
+    PEC parts have an infinite conductivity.
+
+    Args:
+        stl_files (dict): The binary STL file of each part, relative to the
+                          script.
+        material_map (dict): The material of each part.
+
+    Returns:
+        text (str): The contents of the script.
+    """
+    lines = [
+        "% ECHO geometry, generated by EM_CAD_frontend.",
+        "".join(["stl_scale = ", repr(STL_SCALE), ";"]),
+        "geometry = struct('part', {}, 'file', {}, 'material', {}, "
+        "'epsr', {}, 'muer', {}, 'kappa', {});",
+    ]
+    for part in material_map:
+        if part not in stl_files:
+            continue
+        properties = material_properties(material_map[part])
+        kappa = "Inf" if properties["kappa"] is None else repr(properties["kappa"])
+        lines.append(
+            "".join(
+                [
+                    "geometry(end + 1) = struct('part', '",
+                    part,
+                    "', 'file', '",
+                    stl_files[part],
+                    "', 'material', '",
+                    _material_name(part, material_map[part]),
+                    "', 'epsr', ",
+                    repr(properties["epsr"]),
+                    ", 'muer', ",
+                    repr(properties["muer"]),
+                    ", 'kappa', ",
+                    kappa,
+                    ");",
+                ]
+            )
+        )
+    return "\n".join(lines) + "\n"
+
+
+def write_solver_files(output_loc, model_name, tag, part_files, material_map):
+    """Writes the GdfidL and ECHO geometry files of a model next to its STLs.
+
+    Args:
+        output_loc (str): The model output folder.
+        model_name (str): Name of the model.
+        tag (str): Unique identifier string for the model iteration.
+        part_files (dict): For each part a dict of its 'ascii' and 'binary'
+                           STL file names.
+        material_map (dict): The material of each part.
+
+    Returns:
+        files (dict): The name of the file written for each solver.
+    """
+    base_name = "".join([model_name, "_", tag])
+    ascii_files = {
+        part: os.path.relpath(files["ascii"], output_loc).replace(os.sep, "/")
+        for part, files in part_files.items()
+    }
+    binary_files = {
+        part: os.path.relpath(files["binary"], output_loc).replace(os.sep, "/")
+        for part, files in part_files.items()
+    }
+    files = {
+        "gdfidl": os.path.join(output_loc, "".join([base_name, "_geometry.gdf"])),
+        "echo": os.path.join(output_loc, "".join([base_name, "_geometry.m"])),
+    }
+    with open(files["gdfidl"], "w") as gdfidl_file:
+        gdfidl_file.write(gdfidl_geometry(ascii_files, material_map))
+    with open(files["echo"], "w") as echo_file:
+        echo_file.write(echo_geometry(binary_files, material_map))
+    return files
@@ -0,0 +1,83 @@
+import numpy as np
+
+# Record of one facet in a binary STL file: the normal, the three vertices and
+# an unused attribute count.
+BINARY_FACET = np.dtype(
+    [("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attributes", "<u2")]
+)
+# Number of facets formatted at once by write_ascii_stl.
+ASCII_BLOCK = 10000
+_ASCII_FACET = "".join(
+    [
+        "  facet normal %.6e %.6e %.6e\n",
+        "    outer loop\n",
+        "      vertex %.6e %.6e %.6e\n",
+        "      vertex %.6e %.6e %.6e\n",
+        "      vertex %.6e %.6e %.6e\n",
+        "    endloop\n",
+        "  endfacet\n",
+    ]
+)
+
+
+def facet_normals(vertices, facets):
+    """The unit normal of each triangle, from the right hand rule on the vertex
+    order. Degenerate facets get a zero normal.
+
+    Args:
+        vertices (numpy array): (n_points, 3) co ordinates.
+        facets (numpy array): (n_facets, 3) vertex indices of each triangle.
+
+    Returns:
+        normals (numpy array): (n_facets, 3) unit normals.
+    """
+    corners = vertices[facets]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+
+def write_binary_stl(path, vertices, facets, name=""):
+    """Writes a mesh as a binary STL file (as used by ECHO).
+    Only NumPy arrays are used, so this can run in a background thread while
+    the next part is meshed. The facet records are written with tofile, which
+    releases the GIL.
+
+    Args:
+        path (str): The file to write.
+        vertices (numpy array): (n_points, 3) co ordinates.
+        facets (numpy array): (n_facets, 3) vertex indices of each triangle.
+        name (str): Name written in the header.
+    """
+    records = np.zeros(len(facets), dtype=BINARY_FACET)
+    records["normal"] = facet_normals(vertices, facets)
+    records["vertices"] = vertices[facets]
+    header = name.encode("ascii", "replace")[:80].ljust(80, b" ")
+    with open(path, "wb") as stl_file:
+        stl_file.write(header)
+        stl_file.write(np.uint32(len(facets)).astype("<u4").tobytes())
+        records.tofile(stl_file)
+
+
+def write_ascii_stl(path, vertices, facets, name="Mesh"):
+    """Writes a mesh as an ASCII STL file (as used by GdfidL).
+    Only NumPy arrays are used, so this can run in a background thread while
+    the next part is meshed.
+
+    Args:
+        path (str): The file to write.
+        vertices (numpy array): (n_points, 3) co ordinates.
+        facets (numpy array): (n_facets, 3) vertex indices of each triangle.
+        name (str): Name of the solid.
+    """
+    values = np.concatenate(
+        [facet_normals(vertices, facets), vertices[facets].reshape(-1, 9)], axis=1
+    )
+    with open(path, "w") as stl_file:
+        stl_file.write("".join(["solid ", name, "\n"]))
+        # The facets are formatted a block at a time, rather than in a Python
+        # loop, and the blocks keep the text of large meshes out of memory.
+        for start in range(0, len(values), ASCII_BLOCK):
+            block = values[start : start + ASCII_BLOCK]
+            stl_file.write((_ASCII_FACET * len(block)) % tuple(block.ravel().tolist()))
+        stl_file.write("".join(["endsolid ", name, "\n"]))
@@ -0,0 +1,242 @@
+import json
+import os
+import re
+import sqlite3
+
+from FreeCAD_geometry_generation.run_sidecar import load_index, typed_value
+
+# Name of the catalogue in the output folder.
+CATALOGUE_NAME = "sweep_catalogue.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    model_name TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    output_path TEXT,
+    fcstd_file TEXT,
+    sidecar_file TEXT,
+    code_version TEXT,
+    created TEXT,
+    UNIQUE (model_name, tag)
+);
+CREATE TABLE IF NOT EXISTS parameters (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    text TEXT,
+    unit TEXT
+);
+CREATE INDEX IF NOT EXISTS parameter_lookup ON parameters (name, value);
+CREATE TABLE IF NOT EXISTS parts (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    stl_file TEXT,
+    facets INTEGER
+);
+CREATE TABLE IF NOT EXISTS timings (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    seconds REAL
+);
+"""
+
+# name, comparison and value of a query condition such as "pipe_radius < 15mm".
+_CONDITION = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|=|<|>)\s*(.+?)\s*$")
+
+
+def open_catalogue(root_loc):
+    """Opens the catalogue of the runs written to root_loc, creating it if needed.
+
+    Args:
+        root_loc (str): The folder all the model outputs are written to.
+
+    Returns:
+        connection (sqlite3 connection): The open catalogue.
+    """
+    # Isolated sweep points write from separate processes, so wait for locks.
+    connection = sqlite3.connect(os.path.join(root_loc, CATALOGUE_NAME), timeout=60)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def record_run(root_loc, sidecar, sidecar_file, fcstd_file=None):
+    """Adds a run to the catalogue, replacing any earlier run with the same tag.
+
+    Args:
+        root_loc (str): The folder all the model outputs are written to.
+        sidecar (dict): The sidecar of the run (see run_sidecar).
+        sidecar_file (str): Where the sidecar was written.
+        fcstd_file (str): The FreeCAD document of the run.
+    """
+    connection = open_catalogue(root_loc)
+    try:
+        with connection:
+            connection.execute(
+                "DELETE FROM runs WHERE model_name = ? AND tag = ?",
+                (sidecar["model_name"], sidecar["tag"]),
+            )
+            run_id = connection.execute(
+                "INSERT INTO runs (model_name, tag, output_path, fcstd_file, "
+                "sidecar_file, code_version, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    sidecar["model_name"],
+                    sidecar["tag"],
+                    os.path.relpath(os.path.dirname(sidecar_file), root_loc),
+                    (
+                        None
+                        if fcstd_file is None
+                        else os.path.relpath(fcstd_file, root_loc)
+                    ),
+                    os.path.relpath(sidecar_file, root_loc),
+                    sidecar["code_version"],
+                    sidecar["created"],
+                ),
+            ).lastrowid
+            connection.executemany(
+                "INSERT INTO parameters (run_id, name, value, text, unit) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        run_id,
+                        name,
+                        record["value"] if record["unit"] is not None else None,
+                        record["input"],
+                        record["unit"],
+                    )
+                    for name, record in sidecar["parameters"].items()
+                ],
+            )
+            connection.executemany(
+                "INSERT INTO parts (run_id, name, stl_file, facets) VALUES (?, ?, ?, ?)",
+                [
+                    (run_id, name, part.get("stl_file"), part.get("facets"))
+                    for name, part in sidecar.get("parts", {}).items()
+                ],
+            )
+            connection.executemany(
+                "INSERT INTO timings (run_id, stage, seconds) VALUES (?, ?, ?)",
+                [
+                    (run_id, stage, seconds)
+                    for stage, seconds in sidecar.get("timings", {}).items()
+                ],
+            )
+    finally:
+        connection.close()
+
+
+def rebuild_catalogue(root_loc):
+    """Fills the catalogue from the sweep index and the sidecars it points to,
+    for outputs written before the catalogue existed.
+
+    Args:
+        root_loc (str): The folder all the model outputs are written to.
+
+    Returns:
+        count (int): The number of runs recorded.
+    """
+    count = 0
+    for entry in load_index(root_loc):
+        sidecar_file = os.path.join(root_loc, entry["sidecar"])
+        if not os.path.exists(sidecar_file):
+            print("Missing sidecar ", sidecar_file)
+            continue
+        with open(sidecar_file, "r") as json_file:
+            sidecar = json.load(json_file)
+        fcstd_file = os.path.join(
+            os.path.dirname(sidecar_file),
+            "".join([sidecar["model_name"], "_", sidecar["tag"], ".FCStd"]),
+        )
+        record_run(root_loc, sidecar, sidecar_file, fcstd_file)
+        count += 1
+    return count
+
+
+def parse_condition(condition):
+    """Splits a condition such as 'pipe_radius < 15mm' into its parts.
+
+    Args:
+        condition (str): The condition.
+
+    Returns:
+        name (str): The parameter name.
+        comparison (str): The SQL comparison operator.
+        value (float or str): The value in the base unit (mm, deg), or the
+                              text if it is not a quantity.
+    """
+    match = _CONDITION.match(condition)
+    if match is None:
+        raise ValueError("".join(["Can not parse the condition ", condition]))
+    name, comparison, value = match.groups()
+    comparison = {"==": "=", "!=": "<>"}.get(comparison, comparison)
+    return name, comparison, typed_value(value)["value"]
+
+
+def query_catalogue(root_loc, conditions=(), model_name=None):
+    """Finds the runs whose parameters meet all the conditions.
+
+    Args:
+        root_loc (str): The folder all the model outputs are written to.
+        conditions (list): Conditions such as 'pipe_radius < 15mm' or
+                           'cavity_length == 40mm'.
+        model_name (str): Only return runs of this model.
+
+    Returns:
+        runs (list): For each run a dict of the run fields, its 'parameters'
+                     (value in the base unit, or the text), its 'parts'
+                     (stl file and facet count) and its 'timings'.
+    """
+    query = ["SELECT * FROM runs WHERE 1"]
+    arguments = []
+    if model_name is not None:
+        query.append("AND model_name = ?")
+        arguments.append(model_name)
+    for condition in conditions:
+        name, comparison, value = parse_condition(condition)
+        column = "value" if isinstance(value, float) else "text"
+        query.append(
+            "".join(
+                [
+                    "AND EXISTS (SELECT 1 FROM parameters AS p WHERE ",
+                    "p.run_id = runs.run_id AND p.name = ? AND p.",
+                    column,
+                    " ",
+                    comparison,
+                    " ?)",
+                ]
+            )
+        )
+        arguments.extend([name, value])
+    query.append("ORDER BY model_name, tag")
+    if not os.path.exists(os.path.join(root_loc, CATALOGUE_NAME)):
+        return []
+    connection = open_catalogue(root_loc)
+    try:
+        runs = []
+        for row in connection.execute(" ".join(query), arguments).fetchall():
+            run = dict(row)
+            run_id = (row["run_id"],)
+            run["parameters"] = {
+                p["name"]: p["text"] if p["value"] is None else p["value"]
+                for p in connection.execute(
+                    "SELECT name, value, text FROM parameters WHERE run_id = ?", run_id
+                )
+            }
+            run["parts"] = {
+                p["name"]: {"stl_file": p["stl_file"], "facets": p["facets"]}
+                for p in connection.execute(
+                    "SELECT name, stl_file, facets FROM parts WHERE run_id = ?", run_id
+                )
+            }
+            run["timings"] = {
+                t["stage"]: t["seconds"]
+                for t in connection.execute(
+                    "SELECT stage, seconds FROM timings WHERE run_id = ?", run_id
+                )
+            }
+            runs.append(run)
+    finally:
+        connection.close()
+    return runs
@@ -0,0 +1,187 @@
+import json
+import os
+import time
+
+# Status of each point in a sweep manifest.
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+REJECTED = "rejected"
+# Skipped as it would build the same geometry as another point.
+DUPLICATE = "duplicate"
+
+
+def manifest_path(output_path, model_name, sweep_variable):
+    """Location of the checkpoint manifest of a sweep.
+
+    Args:
+        output_path (str): The location all the output files are written to.
+        model_name (str): Name of the current model.
+        sweep_variable (str): Name of the swept parameter.
+
+    Returns:
+        path (str): The manifest file name.
+    """
+    return os.path.join(
+        output_path, "".join([model_name, "_", sweep_variable, "_sweep_manifest.json"])
+    )
+
+
+def new_manifest(model_name, sweep_variable, points):
+    """Creates a manifest with every point pending.
+
+    Args:
+        model_name (str): Name of the current model.
+        sweep_variable (str): Name of the swept parameter.
+        points (list): (model tag, sweep value string) pairs.
+
+    Returns:
+        manifest (dict): The manifest.
+    """
+    manifest = {
+        "model_name": model_name,
+        "sweep_variable": sweep_variable,
+        "points": {},
+    }
+    for model_tag, value in points:
+        add_point(manifest, model_tag, value)
+    return manifest
+
+
+def add_point(manifest, model_tag, value):
+    """Adds a pending point to the manifest, unless it is already there."""
+    if model_tag not in manifest["points"]:
+        manifest["points"][model_tag] = {
+            "value": value,
+            "status": PENDING,
+            "messages": [],
+            "attempts": 0,
+            "duration": None,
+        }
+
+
+def load_manifest(path):
+    """Reads a manifest.
+
+    Args:
+        path (str): The manifest file name.
+
+    Returns:
+        manifest (dict): The manifest, or None if there is no manifest yet.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as manifest_file:
+        return json.load(manifest_file)
+
+
+def write_json(data, path):
+    """Writes JSON so that a crash can never leave a partial file.
+    The data is written to a temporary file which then replaces the target.
+
+    Args:
+        data (dict): The data to write.
+        path (str): The file name.
+    """
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    temp_name = "".join([path, ".tmp"])
+    with open(temp_name, "w") as json_file:
+        json.dump(data, json_file, indent=2)
+        json_file.flush()
+        os.fsync(json_file.fileno())
+    os.replace(temp_name, path)
+
+
+def write_manifest(manifest, path):
+    """Writes the manifest atomically (see write_json).
+
+    Args:
+        manifest (dict): The manifest.
+        path (str): The manifest file name.
+    """
+    write_json(manifest, path)
+
+
+def update_point(
+    manifest,
+    path,
+    model_tag,
+    status,
+    messages=None,
+    duration=None,
+    rss_mb=None,
+    reads=None,
+    duplicate_of=None,
+    host=None,
+):
+    """Records the status of a point and writes the manifest.
+
+    Args:
+        manifest (dict): The manifest.
+        path (str): The manifest file name.
+        model_tag (str): The point to update.
+        status (str): The new status of the point.
+        messages (list): Problems or errors reported for the point.
+        duration (float): The time taken by the point (s).
+        rss_mb (float): The resident memory after the point was released (MB).
+        reads (list): The input keys read by the model function.
+        duplicate_of (str): The point this one would duplicate.
+        host (str): The host the point was run on.
+    """
+    point = manifest["points"][model_tag]
+    point["status"] = status
+    if status == RUNNING:
+        point["attempts"] += 1
+        point["started"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    if messages is not None:
+        point["messages"] = list(messages)
+    if duration is not None:
+        point["duration"] = duration
+    if rss_mb is not None:
+        point["rss_mb"] = rss_mb
+    if reads is not None:
+        point["reads"] = list(reads)
+    if duplicate_of is not None:
+        point["duplicate_of"] = duplicate_of
+    if host is not None:
+        point["host"] = host
+    write_manifest(manifest, path)
+
+
+def unfinished_points(manifest, retry_failed=False):
+    """Finds the points which still need to be run.
+    Points left running are from a sweep which died, so they are rerun.
+
+    Args:
+        manifest (dict): The manifest.
+        retry_failed (bool): If True failed points are also rerun.
+
+    Returns:
+        model_tags (list): The tags of the points to run.
+    """
+    to_run = [PENDING, RUNNING]
+    if retry_failed:
+        to_run.append(FAILED)
+    return [
+        model_tag
+        for model_tag, point in manifest["points"].items()
+        if point["status"] in to_run
+    ]
+
+
+def summarise_manifest(manifest):
+    """Counts the points in each state.
+
+    Args:
+        manifest (dict): The manifest.
+
+    Returns:
+        counts (dict): The number of points keyed on status.
+    """
+    counts = {}
+    for point in manifest["points"].values():
+        counts[point["status"]] = counts.get(point["status"], 0) + 1
+    return counts
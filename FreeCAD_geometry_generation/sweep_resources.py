@@ -0,0 +1,106 @@
+import gc
+import os
+import sys
+
+import FreeCAD
+
+
+def current_rss_mb():
+    """Resident memory of the current process.
+
+    Returns:
+        rss (float): The resident set size in MB, or None if it can not be found.
+    """
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / 1024.0**2
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024.0**2
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+
+        # Only the peak is available here. It is in kB on Linux and bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024.0**2 if sys.platform == "darwin" else peak / 1024.0
+    except ImportError:
+        return None
+
+
+def track_point(model_tag):
+    """Starts tracking the resources used by a sweep point.
+
+    Args:
+        model_tag (str): The sweep point.
+
+    Returns:
+        tracker (dict): Records of the documents, shapes and meshes of the point.
+    """
+    return {
+        "model_tag": model_tag,
+        "documents": set(FreeCAD.listDocuments().keys()),
+        "shapes": [],
+        "meshes": [],
+        "start_rss_mb": current_rss_mb(),
+    }
+
+
+def register(tracker, shapes=None, meshes=None):
+    """Records shapes and meshes so that they are released with the point.
+
+    Args:
+        tracker (dict): The tracker of the point, or None to do nothing.
+        shapes (dict or list): Shapes made for the point.
+        meshes (list): Meshes made for the point.
+    """
+    if tracker is None:
+        return
+    if shapes is not None:
+        tracker["shapes"].append(shapes)
+    if meshes is not None:
+        tracker["meshes"].extend(meshes)
+
+
+def release_point(tracker, caches=()):
+    """Releases everything the point created. Documents opened during the point
+    are closed, references to its shapes and meshes are dropped and the garbage
+    collector is run, so that the OCC memory is freed before the next point.
+
+    Args:
+        tracker (dict): The tracker of the point.
+        caches (list): Functions which empty caches holding shapes.
+
+    Returns:
+        rss (float): The resident memory after the release (MB).
+    """
+    for document_name in list(FreeCAD.listDocuments().keys()):
+        if document_name not in tracker["documents"]:
+            FreeCAD.closeDocument(document_name)
+    for shapes in tracker["shapes"]:
+        if isinstance(shapes, dict):
+            shapes.clear()
+        elif isinstance(shapes, list):
+            del shapes[:]
+    tracker["shapes"] = []
+    tracker["meshes"] = []
+    for clear_cache in caches:
+        clear_cache()
+    gc.collect()
+    rss = current_rss_mb()
+    if rss is not None and tracker["start_rss_mb"] is not None:
+        print(
+            "Memory after ",
+            tracker["model_tag"],
+            " : ",
+            round(rss, 1),
+            "MB (",
+            round(rss - tracker["start_rss_mb"], 1),
+            "MB retained)",
+        )
+    return rss
@@ -0,0 +1,255 @@
+import atexit
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from FreeCAD import Units
+import Part
+
+from FreeCAD_geometry_generation.freecad_operations import ModelException
+from FreeCAD_geometry_generation.incremental_build import TrackedParameters
+
+# A task graph is a dictionary of tasks keyed on name. Each task is a builder
+# function with its arguments, and the names of the tasks whose results it
+# takes as extra positional arguments. Tasks whose inputs are ready are run in
+# parallel worker processes. Shapes are passed between processes as BREP
+# strings, so builders and their arguments must be picklable (module level
+# functions, no lambdas).
+# The worker processes are kept between builds, so the build and connector
+# caches in them are reused. Dictionary arguments (the input parameters) are
+# tracked in the workers, and the keys read are added to the caller's
+# TrackedParameters as if the tasks had run in the calling process.
+
+# The worker pool shared by every build, with its size.
+_POOL = {"executor": None, "max_workers": None}
+
+
+def new_task_graph():
+    return {}
+
+
+def add_task(graph, name, function, args=(), kwargs=None, inputs=()):
+    """Adds a sub-assembly to the graph.
+
+    Args:
+        graph (dict): The task graph.
+        name (str): Unique name of the task.
+        function (function handle): The builder.
+        args (tuple): Positional arguments of the builder.
+        kwargs (dict): Keyword arguments of the builder.
+        inputs (tuple): Names of the tasks whose results are appended to args.
+    """
+    if name in graph:
+        raise ValueError("".join(["There is already a task called ", name]))
+    graph[name] = {
+        "function": function,
+        "args": tuple(args),
+        "kwargs": dict(kwargs or {}),
+        "inputs": tuple(inputs),
+    }
+
+
+def add_rotated_tasks(graph, name, function, input_parameters, rotations, kwargs=None):
+    """Adds a copy of a builder for each xyrotation, e.g. the four striplines
+    of a button or stripline BPM.
+
+    Args:
+        graph (dict): The task graph.
+        name (str): Base name of the tasks. Each is called <name>_<rotation>.
+        function (function handle): Builder taking (input_parameters, xyrotation=).
+        input_parameters (dict): The model parameters.
+        rotations (list): The xyrotation of each copy.
+        kwargs (dict): Other keyword arguments of the builder, the same for
+                       every copy.
+
+    Returns:
+        names (list): The names of the added tasks.
+    """
+    names = []
+    for rotation in rotations:
+        task_name = "".join([name, "_", str(rotation)])
+        add_task(
+            graph,
+            task_name,
+            function,
+            args=(input_parameters,),
+            kwargs=dict(kwargs or {}, xyrotation=rotation),
+        )
+        names.append(task_name)
+    return names
+
+
+def task_order(graph):
+    """Orders the tasks so that every task comes after its inputs.
+
+    Args:
+        graph (dict): The task graph.
+
+    Returns:
+        order (list): The task names.
+    """
+    order = []
+    state = {}
+
+    def visit(name, path):
+        if name not in graph:
+            raise ValueError("".join(["Unknown task ", name, " needed by ", path[-1]]))
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(" -> ".join(["Task graph has a cycle"] + path + [name]))
+        state[name] = "visiting"
+        for input_name in graph[name]["inputs"]:
+            visit(input_name, path + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for name in graph:
+        visit(name, [])
+    return order
+
+
+def task_pool(max_workers=None):
+    """Gets the worker pool, starting it if needed. The pool is restarted if a
+    different number of workers is asked for.
+
+    Args:
+        max_workers (int): Number of worker processes. Defaults to the CPU count.
+
+    Returns:
+        executor (ProcessPoolExecutor): The pool.
+    """
+    if _POOL["executor"] is not None and _POOL["max_workers"] != max_workers:
+        shutdown_task_pool()
+    if _POOL["executor"] is None:
+        _POOL["executor"] = ProcessPoolExecutor(max_workers=max_workers)
+        _POOL["max_workers"] = max_workers
+    return _POOL["executor"]
+
+
+def shutdown_task_pool():
+    """Stops the worker processes. The next build starts a new pool."""
+    if _POOL["executor"] is not None:
+        _POOL["executor"].shutdown(wait=True, cancel_futures=True)
+        _POOL["executor"] = None
+
+
+atexit.register(shutdown_task_pool)
+
+
+def encode(value):
+    """Converts shapes and quantities in a result or argument into plain,
+    picklable data. Shapes become BREP strings."""
+    if isinstance(value, Part.Shape):
+        return {"__brep__": value.exportBrepToString()}
+    if isinstance(value, Units.Quantity):
+        return {"__quantity__": (value.Value, tuple(value.Unit.Signature))}
+    if isinstance(value, dict):
+        # dict.items so that encoding TrackedParameters does not count as
+        # reading every key.
+        return {key: encode(val) for key, val in dict.items(value)}
+    if isinstance(value, (list, tuple)):
+        return type(value)(encode(val) for val in value)
+    return value
+
+
+def decode(value):
+    """Reverses encode."""
+    if isinstance(value, dict):
+        if "__brep__" in value:
+            shape = Part.Shape()
+            shape.importBrepFromString(value["__brep__"])
+            return shape
+        if "__quantity__" in value:
+            quantity, signature = value["__quantity__"]
+            return Units.Quantity(quantity, Units.Unit(*signature))
+        return {key: decode(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(decode(val) for val in value)
+    return value
+
+
+def _run_encoded(function, args, kwargs, n_tracked):
+    """Runs a task in a worker process on encoded data. The reads of the
+    dictionaries among the first n_tracked arguments (the task's own, not the
+    results of other tasks) are returned in argument order."""
+    start_time = time.time()
+    args = list(decode(args))
+    for n in range(n_tracked):
+        if isinstance(args[n], dict):
+            args[n] = TrackedParameters(args[n])
+    result = function(*args, **decode(kwargs))
+    reads = [
+        sorted(args[n].reads) if isinstance(args[n], TrackedParameters) else None
+        for n in range(n_tracked)
+    ]
+    return encode(result), reads, time.time() - start_time
+
+
+def _merge_reads(args, reads):
+    """Adds the keys read in a worker to the caller's tracked arguments."""
+    for arg, arg_reads in zip(args, reads):
+        if isinstance(arg, TrackedParameters) and arg_reads:
+            arg.reads.update(arg_reads)
+
+
+def run_task_graph(graph, max_workers=None, processes=True):
+    """Builds all the tasks, running independent ones at the same time.
+    Keys read from TrackedParameters arguments in the workers are added to
+    them, so pruning on the reads of a model (see effective_inputs) still works.
+
+    Args:
+        graph (dict): The task graph.
+        max_workers (int): Number of worker processes. Defaults to the CPU count.
+        processes (bool): If False the tasks are run one after another in this
+                          process, which is useful for debugging.
+
+    Returns:
+        results (dict): The result of each task, keyed on task name.
+    """
+    order = task_order(graph)
+    results = {}
+    if not processes:
+        for name in order:
+            task = graph[name]
+            args = task["args"] + tuple(results[n] for n in task["inputs"])
+            results[name] = task["function"](*args, **task["kwargs"])
+        return results
+
+    encoded = {}
+    waiting = list(order)
+    running = {}
+    executor = task_pool(max_workers)
+    while waiting or running:
+        for name in [
+            n for n in waiting if all(i in encoded for i in graph[n]["inputs"])
+        ]:
+            task = graph[name]
+            args = encode(task["args"]) + tuple(encoded[n] for n in task["inputs"])
+            future = executor.submit(
+                _run_encoded,
+                task["function"],
+                args,
+                encode(task["kwargs"]),
+                len(task["args"]),
+            )
+            running[future] = name
+            waiting.remove(name)
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            try:
+                encoded[name], reads, duration = future.result()
+            except Exception as e:
+                for other in running:
+                    other.cancel()
+                if isinstance(e, BrokenProcessPool):
+                    # A worker died, so the pool can not be used again.
+                    shutdown_task_pool()
+                print("Task ", name, " failed")
+                raise ModelException(e)
+            _merge_reads(graph[name]["args"], reads)
+            print("Task ", name, " built in ", round(duration, 2), "s")
+    for name in order:
+        results[name] = decode(encoded[name])
+    return results
@@ -0,0 +1,240 @@
+import numpy as np
+
+import FreeCAD
+import Part
+
+# Cell classifications used in the occupancy array.
+EMPTY = 0
+FULL = 1
+BOUNDARY = 2
+
+
+def mesh_to_arrays(mesh):
+    """Extracts the vertex and facet arrays from a FreeCAD mesh.
+
+    Args:
+        mesh (FreeCAD mesh): The mesh to convert.
+
+    Returns:
+        points (numpy array): (n_points, 3) array of vertex co ordinates.
+        facets (numpy array): (n_facets, 3) array of vertex indices.
+    """
+    points, facets = mesh.Topology
+    points = np.array([(p.x, p.y, p.z) for p in points], dtype=float)
+    facets = np.array(facets, dtype=np.int64).reshape(-1, 3)
+    return points, facets
+
+
+def _expand_ranges(lo, hi):
+    """For each row takes the integer ranges lo[i]..hi[i] (inclusive) in every
+    dimension and enumerates every index combination inside them.
+
+    Args:
+        lo (numpy array): (n, d) array of lower indices.
+        hi (numpy array): (n, d) array of upper indices.
+
+    Returns:
+        owners (numpy array): The row each enumerated index came from.
+        indices (numpy array): (m, d) array of enumerated indices.
+    """
+    spans = hi - lo + 1
+    counts = np.prod(spans, axis=1)
+    owners = np.repeat(np.arange(len(lo)), counts)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    local = np.arange(counts.sum()) - starts
+    indices = np.empty((len(owners), lo.shape[1]), dtype=np.int64)
+    for dim in range(lo.shape[1] - 1, -1, -1):
+        dim_span = spans[owners, dim]
+        indices[:, dim] = lo[owners, dim] + local % dim_span
+        local = local // dim_span
+    return owners, indices
+
+
+def build_facet_hash(triangles, origin, spacing, grid_shape):
+    """Builds a spatial hash of the facets over the voxel grid.
+    Each facet is registered against every cell its bounding box overlaps.
+    The hash is stored as two arrays sorted by cell key so that the facets of
+    a cell are a contiguous slice.
+
+    Args:
+        triangles (numpy array): (n_facets, 3, 3) array of facet corners.
+        origin (numpy array): Co ordinates of the lower corner of the grid.
+        spacing (numpy array): The cell size in each cartesian direction.
+        grid_shape (tuple): The number of cells in each cartesian direction.
+
+    Returns:
+        cell_keys (numpy array): Flattened cell index of each entry.
+        facet_ids (numpy array): Facet index of each entry.
+    """
+    grid_shape = np.array(grid_shape)
+    lo = np.floor((triangles.min(axis=1) - origin) / spacing).astype(np.int64)
+    hi = np.floor((triangles.max(axis=1) - origin) / spacing).astype(np.int64)
+    # Bounding box culling of facets which do not touch the grid.
+    on_grid = np.all((hi >= 0) & (lo < grid_shape), axis=1)
+    facet_index = np.nonzero(on_grid)[0]
+    lo = np.clip(lo[on_grid], 0, grid_shape - 1)
+    hi = np.clip(hi[on_grid], 0, grid_shape - 1)
+    owners, cells = _expand_ranges(lo, hi)
+    cell_keys = np.ravel_multi_index(cells.T, tuple(grid_shape))
+    order = np.argsort(cell_keys, kind="stable")
+    return cell_keys[order], facet_index[owners[order]]
+
+
+def _ray_parity(triangles, origin, spacing, grid_shape, cell_index, batch_size):
+    """Classifies cell centres as inside or outside a closed mesh by counting
+    crossings of a ray cast from each centre in the +x direction.
+    The facet / ray column pairs are generated and tested in vectorised batches.
+
+    Args:
+        triangles (numpy array): (n_facets, 3, 3) array of facet corners.
+        origin (numpy array): Co ordinates of the lower corner of the grid.
+        spacing (numpy array): The cell size in each cartesian direction.
+        grid_shape (tuple): The number of cells in each cartesian direction.
+        cell_index (numpy array): (n, 3) array of the cells to classify.
+        batch_size (int): The number of facets processed per batch.
+
+    Returns:
+        inside (numpy array): Boolean array, True if the cell centre is inside.
+    """
+    ny, nz = grid_shape[1], grid_shape[2]
+    # A small irrational offset keeps the rays off facet edges and vertices.
+    jitter = spacing[1:] * np.array([1.2345e-7, 2.7183e-7])
+    col_origin = origin[1:] + spacing[1:] / 2.0 + jitter
+    x_low = origin[0]
+    x_range = spacing[0] * grid_shape[0]
+    hit_keys = []
+    for start in range(0, len(triangles), batch_size):
+        tri = triangles[start : start + batch_size]
+        yz = tri[:, :, 1:]
+        lo = np.ceil((yz.min(axis=1) - col_origin) / spacing[1:]).astype(np.int64)
+        hi = np.floor((yz.max(axis=1) - col_origin) / spacing[1:]).astype(np.int64)
+        lo = np.maximum(lo, 0)
+        hi = np.minimum(hi, np.array([ny, nz]) - 1)
+        keep = np.all(hi >= lo, axis=1)
+        if not np.any(keep):
+            continue
+        tri_id, cols = _expand_ranges(lo[keep], hi[keep])
+        tri = tri[keep][tri_id]
+        ray = col_origin + cols * spacing[1:]
+        # Barycentric co ordinates of the ray in the yz projection of the facet.
+        a = tri[:, 0, 1:]
+        e1 = tri[:, 1, 1:] - a
+        e2 = tri[:, 2, 1:] - a
+        rel = ray - a
+        det = e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]
+        valid = np.abs(det) > 1e-30
+        det = np.where(valid, det, 1.0)
+        u = (rel[:, 0] * e2[:, 1] - rel[:, 1] * e2[:, 0]) / det
+        v = (e1[:, 0] * rel[:, 1] - e1[:, 1] * rel[:, 0]) / det
+        hit = valid & (u >= 0) & (v >= 0) & (u + v <= 1)
+        x_hit = (
+            tri[:, 0, 0]
+            + u * (tri[:, 1, 0] - tri[:, 0, 0])
+            + v * (tri[:, 2, 0] - tri[:, 0, 0])
+        )
+        col_key = cols[hit, 0] * nz + cols[hit, 1]
+        x_norm = np.clip((x_hit[hit] - x_low) / x_range, -0.25, 1.25)
+        # Encoding column and position in one sortable key, columns are 4 apart.
+        hit_keys.append(col_key * 4.0 + 1.0 + x_norm)
+    if not hit_keys:
+        return np.zeros(len(cell_index), dtype=bool)
+    hit_keys = np.sort(np.concatenate(hit_keys))
+    cell_col = cell_index[:, 1] * nz + cell_index[:, 2]
+    cell_x = (cell_index[:, 0] + 0.5) / grid_shape[0]
+    crossings = np.searchsorted(hit_keys, cell_col * 4.0 + 3.0) - np.searchsorted(
+        hit_keys, cell_col * 4.0 + 1.0 + cell_x
+    )
+    return crossings % 2 == 1
+
+
+def voxelise_mesh(
+    mesh,
+    spacing,
+    bounds=None,
+    solid=None,
+    make_solids=False,
+    batch_size=20000,
+):
+    """Splits the volume described by a closed mesh into a regular grid of cells.
+    Only cells touched by a facet (using a spatial hash of the facets) are
+    treated as boundary cells. All other cells are classified in vectorised
+    batches by ray casting. Boolean operations are only run on the boundary
+    cells, and only if a solid is supplied.
+
+    Args:
+        mesh (FreeCAD mesh): Closed mesh describing the volume.
+        spacing (float or tuple): The cell size, either one value or one per
+                                  cartesian direction.
+        bounds (tuple): ((xmin, ymin, zmin), (xmax, ymax, zmax)) of the grid.
+                        Defaults to the bounding box of the mesh.
+        solid (FreeCAD shape): Solid matching the mesh. If given the boundary
+                               cells are refined with an exact boolean common.
+        make_solids (bool): If True the solid of each occupied cell is returned.
+                            Requires solid to be given for the boundary cells.
+        batch_size (int): The number of facets processed per vectorised batch.
+
+    Returns:
+        occupancy (numpy array): Array of cell classifications
+                                 (EMPTY, FULL or BOUNDARY) indexed [x, y, z].
+        origin (numpy array): Co ordinates of the lower corner of the grid.
+        solids (dict): Cell solids keyed on the (x, y, z) cell index.
+    """
+    spacing = np.broadcast_to(np.asarray(spacing, dtype=float), (3,)).copy()
+    points, facets = mesh_to_arrays(mesh)
+    triangles = points[facets]
+    mesh_min = points.min(axis=0)
+    mesh_max = points.max(axis=0)
+    if bounds is None:
+        bounds = (mesh_min, mesh_max)
+    origin = np.asarray(bounds[0], dtype=float)
+    grid_shape = tuple(
+        int(n)
+        for n in np.maximum(
+            np.ceil((np.asarray(bounds[1], dtype=float) - origin) / spacing), 1
+        )
+    )
+    occupancy = np.full(grid_shape, EMPTY, dtype=np.uint8)
+
+    cell_keys, facet_ids = build_facet_hash(triangles, origin, spacing, grid_shape)
+    boundary_keys = np.unique(cell_keys)
+    occupancy.flat[boundary_keys] = BOUNDARY
+
+    # Bounding box culling. Cells outside the mesh extent are always empty.
+    lo = np.clip(np.floor((mesh_min - origin) / spacing).astype(np.int64), 0, None)
+    hi = np.minimum(
+        np.floor((mesh_max - origin) / spacing).astype(np.int64),
+        np.array(grid_shape) - 1,
+    )
+    if np.all(hi >= lo):
+        _, candidates = _expand_ranges(lo[None, :], hi[None, :])
+        candidates = candidates[occupancy[tuple(candidates.T)] == EMPTY]
+        inside = _ray_parity(
+            triangles, origin, spacing, grid_shape, candidates, batch_size
+        )
+        occupancy[tuple(candidates[inside].T)] = FULL
+
+    solids = {}
+    if solid is not None:
+        tolerance = 1e-9 * float(np.prod(spacing))
+        for key in boundary_keys:
+            cell = np.unravel_index(key, grid_shape)
+            corner = origin + np.array(cell) * spacing
+            voxel = Part.makeBox(
+                spacing[0], spacing[1], spacing[2], FreeCAD.Vector(*corner)
+            )
+            if not solid.BoundBox.intersect(voxel.BoundBox):
+                occupancy[cell] = EMPTY
+                continue
+            model_segment = solid.common(voxel)
+            if model_segment.Volume > tolerance:
+                if make_solids:
+                    solids[tuple(int(c) for c in cell)] = model_segment
+            else:
+                occupancy[cell] = EMPTY
+    if make_solids:
+        for cell in np.argwhere(occupancy == FULL):
+            corner = origin + cell * spacing
+            solids[tuple(int(c) for c in cell)] = Part.makeBox(
+                spacing[0], spacing[1], spacing[2], FreeCAD.Vector(*corner)
+            )
+    return occupancy, origin, solids
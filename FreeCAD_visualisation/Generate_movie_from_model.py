@@ -1,30 +1,86 @@
 
 from pivy import coin
 from math import radians
+import os
+import tempfile
 import FreeCADGui as Gui
 from sys import argv
 
+from FreeCAD_visualisation.scene_bounds import find_centre, fit_view
+from FreeCAD_visualisation.video_encoding import encode_frames
+
 _1, OUTPUT_PATH = argv
 
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi', '.mov')
+
 
-def spin_model(x_axis, y_axis, z_axis, output_location):
+def spin_model(x_axis, y_axis, z_axis, output_location, n_frames=360, angle_step=1.0,
+               width=738, height=676, video_file=None, frame_rate=12):
     """ Generates a series of images, with each one having the model turned further on a common axis.
+        If video_file is given the frames are streamed straight into a video encoder instead of
+        being kept as PNG files.
+
         Args:
             x_axis (float): Represents the length of the axis vector in the x direction.
             y_axis (float): Represents the length of the axis vector in the y direction.
             z_axis (float): Represents the length of the axis vector in the z direction.
             output_location (str): File location that the output files will be put. 
+            n_frames (int): Number of frames to generate.
+            angle_step (float): The angle the model is turned between frames (degrees).
+            width (int): Width of each frame in pixels.
+            height (int): Height of each frame in pixels.
+            video_file (str): Location of the output video. If None PNG files are written.
+            frame_rate (float): Frames per second of the output video.
     """
     Gui.ActiveDocument.ActiveView.viewBottom()
-    Gui.SendMsgToActiveView("ViewFit")
+    fit_view()
+    # The model does not change during the spin, so the centre is found once.
+    centre = find_centre()
+
+    if video_file is None:
+        for ang in range(n_frames):
+            rotateview(x_axis, y_axis, z_axis, angle_step, centre=centre)
+            new_f_name = ''.join([output_location, str(ang).zfill(3), '.png'])
+            Gui.ActiveDocument.ActiveView.saveImage(new_f_name, width, height, 'Current')
+    else:
+        encode_frames(spin_frames(x_axis, y_axis, z_axis, n_frames, angle_step, width, height,
+                                  centre=centre),
+                      video_file, width, height, frame_rate=frame_rate, input_format='png')
 
-    for ang in range(360):
-        rotateview(x_axis, y_axis, z_axis, 1.0)
-        new_f_name = ''.join([output_location, str(ang).zfill(3), '.png'])
-        Gui.ActiveDocument.ActiveView.saveImage(new_f_name, 738, 676, 'Current')
 
+def spin_frames(x_axis, y_axis, z_axis, n_frames=360, angle_step=1.0, width=738, height=676,
+                centre=None):
+    """ Generator giving each frame of the spin as PNG encoded bytes.
+    The GUI can only save images to file, so a single scratch file is reused for every frame.
 
-def rotateview(axis_x=0.7071, axis_y=0.5, axis_z=0.5, angle=1.0):
+        Args:
+            x_axis (float): Represents the length of the axis vector in the x direction.
+            y_axis (float): Represents the length of the axis vector in the y direction.
+            z_axis (float): Represents the length of the axis vector in the z direction.
+            n_frames (int): Number of frames to generate.
+            angle_step (float): The angle the model is turned between frames (degrees).
+            width (int): Width of each frame in pixels.
+            height (int): Height of each frame in pixels.
+            centre (FreeCAD Vector): The point the model turns about. Defaults to the centre
+                                     of the model.
+    """
+    if centre is None:
+        centre = find_centre()
+    scratch_dir = tempfile.mkdtemp()
+    scratch_file = os.path.join(scratch_dir, 'frame.png')
+    try:
+        for ang in range(n_frames):
+            rotateview(x_axis, y_axis, z_axis, angle_step, centre=centre)
+            Gui.ActiveDocument.ActiveView.saveImage(scratch_file, width, height, 'Current')
+            with open(scratch_file, 'rb') as frame:
+                yield frame.read()
+    finally:
+        if os.path.exists(scratch_file):
+            os.remove(scratch_file)
+        os.rmdir(scratch_dir)
+
+
+def rotateview(axis_x=0.7071, axis_y=0.5, axis_z=0.5, angle=1.0, centre=None):
     """ Changes the view of the model by the angle requested along the axis defined by axis_x, axis_y and axis_z.
     axis_x, axis_y and axis_z must vector sum to 1.
     
@@ -33,11 +89,15 @@ def rotateview(axis_x=0.7071, axis_y=0.5, axis_z=0.5, angle=1.0):
              axis_y (float): Represents the length of the axis vector in the y direction.
              axis_z (float): Represents the length of the axis vector in the z direction.
              angle (float): The angle to rotate the model by (degrees). 
+             centre (FreeCAD Vector): The point to rotate about. Defaults to the centre of the
+                                      model, so pass it in when turning the view repeatedly.
     """
 
     # Based on code from the Freecad website,
+    if centre is None:
+        centre = find_centre()
     cam = Gui.ActiveDocument.ActiveView.getCameraNode()
-    centre = coin.SbVec3f(find_centre())
+    centre = coin.SbVec3f(centre)
     rot = coin.SbRotation()
     original_pos = coin.SbVec3f(cam.position.getValue())
     direction = coin.SbVec3f(axis_x, axis_y, axis_z)
@@ -48,33 +108,14 @@ def rotateview(axis_x=0.7071, axis_y=0.5, axis_z=0.5, angle=1.0):
     cam.position = prot
 
 
-def find_centre():
-    """ Finds the centre of the model.
-    Based on code from the Freecad website.
-    """
-    xmax = xmin = ymax = ymin = zmax = zmin = 0
-    for obj in App.ActiveDocument.Objects:
-        if obj.TypeId[:4] == "Mesh":
-            box = obj.Mesh.BoundBox
-        elif obj.TypeId[:6] == "Points":
-            box = obj.Points.BoundBox
-        elif obj.TypeId[:4] == "Part":
-            box = obj.Shape.BoundBox
-        else:
-            continue
-        xmax = max(xmax, box.XMax)
-        xmin = min(xmin, box.XMin)
-        ymax = max(ymax, box.YMax)
-        ymin = min(ymin, box.YMin)
-        zmax = max(zmax, box.ZMax)
-        zmin = min(zmin, box.ZMin)
-
-    centre = FreeCAD.Vector((xmax + xmin) / 2.0, (ymax + ymin) / 2.0, (zmax + zmin) / 2.0)
-    return centre
-
 # Call this script from the freeCad python command line
 # exec(open("./path/to/script.py output_path").read(), globals())
-spin_model(0.7071, 0.5, 0.5, OUTPUT_PATH)
-# After images are generated use:
-# ffmpeg - framerate 12 - test%03d.png output.png
-# 'C:/Program files (x86)/ffmpeg-3.2.4-win64-static/bin/ffmpeg.exe - framerate 12 - test%03d.png output.png'
+# If output_path ends in a video extension (e.g. spin.mp4) the frames are streamed
+# straight into ffmpeg, otherwise output_path is used as the prefix of the PNG files.
+if OUTPUT_PATH.lower().endswith(VIDEO_EXTENSIONS):
+    spin_model(0.7071, 0.5, 0.5, OUTPUT_PATH, video_file=OUTPUT_PATH)
+else:
+    spin_model(0.7071, 0.5, 0.5, OUTPUT_PATH)
+    # After images are generated use:
+    # ffmpeg - framerate 12 - test%03d.png output.png
+    # 'C:/Program files (x86)/ffmpeg-3.2.4-win64-static/bin/ffmpeg.exe - framerate 12 - test%03d.png output.png'
@@ -0,0 +1,567 @@
+import os
+import struct
+import zlib
+from collections import deque
+from math import cos, radians, sin
+from multiprocessing import Pool
+from sys import argv
+
+import numpy as np
+
+from FreeCAD_visualisation.video_encoding import encode_frames
+
+# Pure NumPy renderer working from the STL output of generate_output_files.
+# It does not need the FreeCAD GUI (or FreeCAD at all) so can be run headless
+# and in parallel worker processes.
+
+# Viewing direction and up vector for each of the standard views.
+# Names follow the image suffixes used in model_images.FCMacro.
+VIEWS = {
+    "iso": ((-1.0, 1.0, -1.0), (0.0, 0.0, 1.0)),
+    "yz": ((-1.0, 0.0, 0.0), (0.0, 0.0, 1.0)),
+    "-yz": ((1.0, 0.0, 0.0), (0.0, 0.0, 1.0)),
+    "-xy": ((0.0, 0.0, -1.0), (0.0, 1.0, 0.0)),
+    "xy": ((0.0, 0.0, 1.0), (0.0, -1.0, 0.0)),
+    "xz": ((0.0, 1.0, 0.0), (0.0, 0.0, 1.0)),
+    "-xz": ((0.0, -1.0, 0.0), (0.0, 0.0, 1.0)),
+}
+
+# Clipping planes (normal, offset) matching those in model_images.FCMacro.
+# Points where normal . p >= offset are kept.
+CUTS = {
+    "yz_cut": ((-1.0, 0.0, 0.0), 0.0),
+    "xz_cut": ((0.0, 1.0, 0.0), 0.0),
+    "xy_cut": ((0.0, 0.0, -1.0), 0.0),
+}
+
+PART_COLOURS = [
+    (204, 204, 204),
+    (230, 140, 60),
+    (80, 140, 220),
+    (120, 200, 100),
+    (220, 90, 90),
+    (170, 120, 210),
+]
+BACKGROUND = (255, 255, 255)
+# Largest number of candidate pixels tested at once by the rasteriser.
+RASTER_BLOCK = 2**21
+
+# Triangles loaded once per worker process.
+_worker_triangles = None
+_worker_colours = None
+
+
+def read_stl(file_name):
+    """Reads an ASCII or binary STL file.
+
+    Args:
+        file_name (str): Location of the STL file.
+
+    Returns:
+        triangles (numpy array): (n_facets, 3, 3) array of facet corners.
+    """
+    with open(file_name, "rb") as stl_file:
+        data = stl_file.read()
+    if len(data) >= 84:
+        n_facets = struct.unpack("<I", data[80:84])[0]
+        if len(data) == 84 + 50 * n_facets:
+            records = np.frombuffer(
+                data,
+                dtype=np.dtype(
+                    [("normal", "<f4", 3), ("corners", "<f4", (3, 3)), ("attr", "<u2")]
+                ),
+                count=n_facets,
+                offset=84,
+            )
+            return records["corners"].astype(float)
+    vertices = [
+        line.split()[1:4]
+        for line in data.decode("ascii", errors="ignore").splitlines()
+        if line.strip().startswith("vertex")
+    ]
+    return np.array(vertices, dtype=float).reshape(-1, 3, 3)
+
+
+def view_matrix(view_direction, up):
+    """Creates the rotation from model co ordinates to camera co ordinates.
+
+    Args:
+        view_direction (tuple): The direction the camera is looking.
+        up (tuple): The direction which will appear upwards in the image.
+
+    Returns:
+        matrix (numpy array): 3x3 matrix with rows (right, up, forward).
+    """
+    forward = np.asarray(view_direction, dtype=float)
+    forward = forward / np.linalg.norm(forward)
+    up = np.asarray(up, dtype=float)
+    right = np.cross(forward, up)
+    if np.linalg.norm(right) < 1e-9:
+        right = np.cross(forward, (0.0, 1.0, 0.0))
+    right = right / np.linalg.norm(right)
+    true_up = np.cross(right, forward)
+    return np.array([right, true_up, forward])
+
+
+def axis_rotation(axis, angle):
+    """Creates the rotation matrix for an angle (in degrees) about an axis."""
+    axis = np.asarray(axis, dtype=float)
+    axis = axis / np.linalg.norm(axis)
+    x, y, z = axis
+    c = cos(radians(angle))
+    s = sin(radians(angle))
+    t = 1 - c
+    return np.array(
+        [
+            [t * x * x + c, t * x * y - s * z, t * x * z + s * y],
+            [t * x * y + s * z, t * y * y + c, t * y * z - s * x],
+            [t * x * z - s * y, t * y * z + s * x, t * z * z + c],
+        ]
+    )
+
+
+def render(
+    triangles,
+    colours,
+    matrix,
+    width,
+    height,
+    clip_plane=None,
+    margin=0.05,
+    bounds=None,
+):
+    """Renders a set of triangles with an orthographic camera and flat shading.
+    The image is framed on the model in the same way as ViewFit.
+
+    Args:
+        triangles (numpy array): (n_facets, 3, 3) array of facet corners.
+        colours (numpy array): (n_facets, 3) array of facet base colours.
+        matrix (numpy array): Rotation from model to camera co ordinates.
+        width (int): Image width in pixels.
+        height (int): Image height in pixels.
+        clip_plane (tuple): (normal, offset) of a clipping plane.
+                            Points where normal . p >= offset are kept.
+        margin (float): Fractional space left around the model.
+        bounds (numpy array): (2, 3) model bounds used for framing. Defaults to
+                              the bounds of the triangles.
+
+    Returns:
+        image (numpy array): (height, width, 3) uint8 RGB image.
+    """
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = BACKGROUND
+    if len(triangles) == 0:
+        return image
+    if bounds is None:
+        bounds = np.array([triangles.min(axis=(0, 1)), triangles.max(axis=(0, 1))])
+    centre = (bounds[0] + bounds[1]) / 2.0
+    corners = np.array(
+        [
+            [bounds[i][0], bounds[j][1], bounds[k][2]]
+            for i in (0, 1)
+            for j in (0, 1)
+            for k in (0, 1)
+        ]
+    )
+    extent = np.abs((corners - centre) @ matrix.T).max(axis=0)
+    scale = (1 - 2 * margin) * min(
+        width / max(2 * extent[0], 1e-12), height / max(2 * extent[1], 1e-12)
+    )
+
+    cam = (triangles - centre) @ matrix.T
+    # Flat shading from the facet normal relative to the viewing direction.
+    normals = np.cross(cam[:, 1] - cam[:, 0], cam[:, 2] - cam[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    shade = np.abs(normals[:, 2]) / np.where(lengths > 0, lengths, 1.0)
+    shaded = (colours * (0.25 + 0.75 * shade[:, None])).clip(0, 255)
+
+    px = cam[:, :, 0] * scale + width / 2.0
+    py = height / 2.0 - cam[:, :, 1] * scale
+    depth = cam[:, :, 2]
+    depth_buffer = np.full(height * width, np.inf)
+
+    x_lo = np.clip(np.floor(px.min(axis=1)).astype(int), 0, width - 1)
+    x_hi = np.clip(np.ceil(px.max(axis=1)).astype(int), 0, width - 1)
+    y_lo = np.clip(np.floor(py.min(axis=1)).astype(int), 0, height - 1)
+    y_hi = np.clip(np.ceil(py.max(axis=1)).astype(int), 0, height - 1)
+    area = (px[:, 1] - px[:, 0]) * (py[:, 2] - py[:, 0]) - (px[:, 2] - px[:, 0]) * (
+        py[:, 1] - py[:, 0]
+    )
+    box_width = x_hi - x_lo + 1
+    box_height = y_hi - y_lo + 1
+    drawn = (box_width > 0) & (box_height > 0) & (np.abs(area) >= 1e-12)
+    visible = np.nonzero(drawn)[0]
+    # Triangles are rasterised together in groups with similar bounding boxes,
+    # each group on a grid of the next power of two size up.
+    grid_width = 2 ** np.ceil(np.log2(box_width[visible])).astype(int)
+    grid_height = 2 ** np.ceil(np.log2(box_height[visible])).astype(int)
+    flat_image = image.reshape(-1, 3)
+    for size in np.unique(np.stack([grid_width, grid_height], axis=1), axis=0):
+        group = visible[(grid_width == size[0]) & (grid_height == size[1])]
+        block = max(RASTER_BLOCK // int(size[0] * size[1]), 1)
+        for start in range(0, len(group), block):
+            _rasterise(
+                group[start : start + block],
+                size,
+                (px, py, depth, area, x_lo, y_lo, box_width, box_height),
+                (width, height, scale, centre, matrix, clip_plane),
+                depth_buffer,
+                flat_image,
+                shaded,
+            )
+    return image
+
+
+def _rasterise(indices, size, geometry, camera, depth_buffer, flat_image, shaded):
+    """Draws a group of triangles into the image. All the candidate pixels of
+    the group are tested in one array operation, and the nearest triangle at
+    each pixel is found by sorting on depth.
+
+    Args:
+        indices (numpy array): The triangles to draw.
+        size (numpy array): Width and height of the pixel grid tested for each
+                            triangle, at least the size of its bounding box.
+        geometry (tuple): Pixel co ordinates, depths, signed areas and bounding
+                          boxes of all the triangles.
+        camera (tuple): Image size, scale, centre, view matrix and clip plane.
+        depth_buffer (numpy array): Flattened depth of the nearest surface so
+                                    far. Updated in place.
+        flat_image (numpy array): (height * width, 3) image. Updated in place.
+        shaded (numpy array): The colour of each triangle.
+    """
+    px, py, depth, area, x_lo, y_lo, box_width, box_height = geometry
+    width, height, scale, centre, matrix, clip_plane = camera
+    offset_y, offset_x = np.mgrid[0 : size[1], 0 : size[0]]
+    # (triangle, row, column) grids of candidate pixels.
+    cols = x_lo[indices, None, None] + offset_x
+    rows = y_lo[indices, None, None] + offset_y
+    in_box = (offset_x < box_width[indices, None, None]) & (
+        offset_y < box_height[indices, None, None]
+    )
+    gx = cols + 0.5
+    gy = rows + 0.5
+    x0, x1, x2 = (px[indices, k, None, None] for k in range(3))
+    y0, y1, y2 = (py[indices, k, None, None] for k in range(3))
+    triangle_area = area[indices, None, None]
+    w1 = ((gx - x0) * (y2 - y0) - (x2 - x0) * (gy - y0)) / triangle_area
+    w2 = ((x1 - x0) * (gy - y0) - (gx - x0) * (y1 - y0)) / triangle_area
+    w0 = 1 - w1 - w2
+    inside = in_box & (w0 >= 0) & (w1 >= 0) & (w2 >= 0)
+    triangle = np.broadcast_to(indices[:, None, None], inside.shape)[inside]
+    z = (
+        w0[inside] * depth[triangle, 0]
+        + w1[inside] * depth[triangle, 1]
+        + w2[inside] * depth[triangle, 2]
+    )
+    rows = rows[inside]
+    cols = cols[inside]
+    if clip_plane is not None:
+        cam_points = np.stack(
+            [
+                (cols + 0.5 - width / 2.0) / scale,
+                (height / 2.0 - rows - 0.5) / scale,
+                z,
+            ],
+            axis=-1,
+        )
+        model_points = cam_points @ matrix + centre
+        kept = model_points @ np.asarray(clip_plane[0], dtype=float) >= float(
+            clip_plane[1]
+        )
+        rows, cols, z, triangle = rows[kept], cols[kept], z[kept], triangle[kept]
+    pixels = rows * width + cols
+    # The nearest fragment at each pixel comes first.
+    order = np.lexsort((triangle, z, pixels))
+    pixels, z, triangle = pixels[order], z[order], triangle[order]
+    first = np.ones(len(pixels), dtype=bool)
+    first[1:] = pixels[1:] != pixels[:-1]
+    pixels, z, triangle = pixels[first], z[first], triangle[first]
+    closer = z < depth_buffer[pixels]
+    depth_buffer[pixels[closer]] = z[closer]
+    flat_image[pixels[closer]] = shaded[triangle[closer]]
+
+
+def write_png(file_name, image):
+    """Writes an RGB image array to a PNG file using only the standard library.
+
+    Args:
+        file_name (str): Location of the output file.
+        image (numpy array): (height, width, 3) uint8 RGB image.
+    """
+    height, width, _ = image.shape
+    raw = np.hstack(
+        [np.zeros((height, 1), dtype=np.uint8), image.reshape(height, width * 3)]
+    ).tobytes()
+
+    def chunk(tag, payload):
+        body = tag + payload
+        return (
+            struct.pack(">I", len(payload))
+            + body
+            + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+        )
+
+    with open(file_name, "wb") as png_file:
+        png_file.write(b"\x89PNG\r\n\x1a\n")
+        png_file.write(
+            chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        )
+        png_file.write(chunk(b"IDAT", zlib.compress(raw, 6)))
+        png_file.write(chunk(b"IEND", b""))
+
+
+def load_model(stl_files):
+    """Loads a set of STL files into a single triangle array.
+    Each file gets its own colour.
+
+    Args:
+        stl_files (list): Locations of the STL files.
+
+    Returns:
+        triangles (numpy array): (n_facets, 3, 3) array of facet corners.
+        colours (numpy array): (n_facets, 3) array of facet colours.
+    """
+    triangles = []
+    colours = []
+    for ck, file_name in enumerate(stl_files):
+        tri = read_stl(file_name)
+        triangles.append(tri)
+        colours.append(
+            np.tile(
+                np.array(PART_COLOURS[ck % len(PART_COLOURS)], dtype=float),
+                (len(tri), 1),
+            )
+        )
+    if not triangles:
+        return np.zeros((0, 3, 3)), np.zeros((0, 3))
+    return np.concatenate(triangles), np.concatenate(colours)
+
+
+def _init_worker(stl_files):
+    global _worker_triangles, _worker_colours
+    _worker_triangles, _worker_colours = load_model(stl_files)
+
+
+def _render_job(job):
+    """Renders a single image. Runs in a worker process."""
+    file_name, matrix, width, height, clip_plane = job
+    image = render(
+        _worker_triangles, _worker_colours, matrix, width, height, clip_plane=clip_plane
+    )
+    write_png(file_name, image)
+    return file_name
+
+
+def _render_frame(job):
+    """Renders a single frame and returns it. Runs in a worker process."""
+    matrix, width, height = job
+    return render(_worker_triangles, _worker_colours, matrix, width, height)
+
+
+def run_render_jobs(stl_files, jobs, processes=None):
+    """Renders a list of jobs in parallel worker processes.
+    Each worker loads the model once.
+
+    Args:
+        stl_files (list): Locations of the STL files making up the model.
+        jobs (list): Tuples of (output file name, view matrix, width, height,
+                     clip plane).
+        processes (int): Number of worker processes. Defaults to the CPU count.
+
+    Returns:
+        file_names (list): The images written.
+    """
+    with Pool(processes, initializer=_init_worker, initargs=(stl_files,)) as pool:
+        return pool.map(_render_job, jobs)
+
+
+def render_model_images(
+    stl_files,
+    out_loc,
+    image_sizes=None,
+    views=None,
+    cuts=None,
+    processes=None,
+):
+    """Headless equivalent of model_images.FCMacro. Renders each standard view
+    plus the clip plane cuts of each view.
+
+    Args:
+        stl_files (list): Locations of the STL files making up the model.
+        out_loc (str): Prefix for the output files (folder and document name).
+        image_sizes (dict): (width, height) for each view name.
+        views (list): Names of the views to render. Defaults to all in VIEWS.
+        cuts (list): Names of the cuts to render. Defaults to all in CUTS.
+        processes (int): Number of worker processes.
+
+    Returns:
+        file_names (list): The images written.
+    """
+    if image_sizes is None:
+        image_sizes = {
+            "iso": (2000, 1000),
+            "yz": (2000, 2000),
+            "-yz": (2000, 2000),
+            "-xy": (2000, 1250),
+            "xy": (2000, 1250),
+            "xz": (2000, 1250),
+            "-xz": (2000, 1250),
+        }
+    if views is None:
+        views = list(VIEWS.keys())
+    if cuts is None:
+        cuts = list(CUTS.keys())
+    jobs = []
+    for view in views:
+        matrix = view_matrix(*VIEWS[view])
+        width, height = image_sizes[view]
+        base_name = "".join((out_loc, "_", view))
+        jobs.append(("".join((base_name, ".png")), matrix, width, height, None))
+        for cut in cuts:
+            jobs.append(
+                (
+                    "".join((base_name, "_", cut, ".png")),
+                    matrix,
+                    width,
+                    height,
+                    CUTS[cut],
+                )
+            )
+    return run_render_jobs(stl_files, jobs, processes=processes)
+
+
+def spin_matrices(axis, n_frames=360, angle_step=1.0, start_view="xy"):
+    """Generates the camera rotation for each frame of a spin around an axis.
+
+    Args:
+        axis (tuple): The axis of rotation.
+        n_frames (int): Number of frames.
+        angle_step (float): Rotation between frames (degrees).
+        start_view (str): The view the spin starts from.
+
+    Returns:
+        matrices (list): Camera rotation matrix for each frame.
+    """
+    base = view_matrix(*VIEWS[start_view])
+    return [base @ axis_rotation(axis, ang * angle_step).T for ang in range(n_frames)]
+
+
+def render_spin_frames(
+    stl_files,
+    output_location,
+    axis=(0.7071, 0.5, 0.5),
+    n_frames=360,
+    angle_step=1.0,
+    width=738,
+    height=676,
+    processes=None,
+):
+    """Headless equivalent of Generate_movie_from_model.spin_model.
+    Renders the spin frames in parallel worker processes.
+
+    Args:
+        stl_files (list): Locations of the STL files making up the model.
+        output_location (str): Prefix for the output files.
+        axis (tuple): The axis of rotation.
+        n_frames (int): Number of frames.
+        angle_step (float): Rotation between frames (degrees).
+        width (int): Image width in pixels.
+        height (int): Image height in pixels.
+        processes (int): Number of worker processes.
+
+    Returns:
+        file_names (list): The images written.
+    """
+    jobs = [
+        (
+            "".join([output_location, str(ang).zfill(3), ".png"]),
+            matrix,
+            width,
+            height,
+            None,
+        )
+        for ang, matrix in enumerate(spin_matrices(axis, n_frames, angle_step))
+    ]
+    return run_render_jobs(stl_files, jobs, processes=processes)
+
+
+def _windowed_map(pool, function, jobs, window):
+    """Like pool.imap, but with at most window jobs submitted and not yet
+    taken, so finished frames can not pile up in memory.
+
+    Args:
+        pool (multiprocessing.Pool): The worker pool.
+        function (function handle): The function to run on each job.
+        jobs (list): The jobs.
+        window (int): Maximum number of jobs in progress.
+
+    Yields:
+        The results, in the order of the jobs.
+    """
+    jobs = list(jobs)
+    pending = deque()
+    submitted = 0
+    while submitted < len(jobs) or pending:
+        while submitted < len(jobs) and len(pending) < window:
+            pending.append(pool.apply_async(function, (jobs[submitted],)))
+            submitted += 1
+        yield pending.popleft().get()
+
+
+def render_spin_movie(
+    stl_files,
+    video_file,
+    axis=(0.7071, 0.5, 0.5),
+    n_frames=360,
+    angle_step=1.0,
+    width=738,
+    height=676,
+    frame_rate=12,
+    processes=None,
+    prefetch=32,
+):
+    """Renders the spin frames in parallel worker processes and streams them
+    straight into a video encoder, without writing any image files.
+
+    Args:
+        stl_files (list): Locations of the STL files making up the model.
+        video_file (str): Location of the output video.
+        axis (tuple): The axis of rotation.
+        n_frames (int): Number of frames.
+        angle_step (float): Rotation between frames (degrees).
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        frame_rate (float): Frames per second of the output video.
+        processes (int): Number of worker processes.
+        prefetch (int): Maximum number of frames being rendered or waiting
+                        for the encoder, which bounds the memory used.
+
+    Returns:
+        n_frames (int): The number of frames encoded.
+    """
+    jobs = [
+        (matrix, width, height) for matrix in spin_matrices(axis, n_frames, angle_step)
+    ]
+    with Pool(processes, initializer=_init_worker, initargs=(stl_files,)) as pool:
+        # The workers keep rendering ahead while the frames are encoded, but
+        # only within the window. The encoder queue is kept short so the
+        # window covers almost all the frames held in memory.
+        return encode_frames(
+            _windowed_map(pool, _render_frame, jobs, max(prefetch - 1, 1)),
+            video_file,
+            width,
+            height,
+            frame_rate=frame_rate,
+            prefetch=1,
+        )
+
+
+if __name__ == "__main__":
+    # python -m FreeCAD_visualisation.offscreen_rendering <folder of STL files> <prefix>
+    _1, STL_PATH, OUTPUT_PREFIX = argv
+    STL_FILES = sorted(
+        os.path.join(STL_PATH, f)
+        for f in os.listdir(STL_PATH)
+        if f.lower().endswith(".stl")
+    )
+    render_model_images(STL_FILES, OUTPUT_PREFIX)
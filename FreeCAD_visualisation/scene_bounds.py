@@ -0,0 +1,160 @@
+import FreeCAD
+
+# Bounding boxes of the document objects, keyed on (document name, object name).
+# Entries are only recomputed after the document signals a change to the object.
+_object_bounds = {}
+# Bounding boxes of whole documents, keyed on (document name, visible_only).
+# Dropped whenever any object in the document changes.
+_scene_bounds = {}
+_observer = None
+
+
+class SceneBoundsObserver:
+    """Document observer which drops cached bounds when the document changes."""
+
+    def slotCreatedObject(self, obj):
+        invalidate_scene_bounds(obj.Document, obj)
+
+    def slotDeletedObject(self, obj):
+        invalidate_scene_bounds(obj.Document, obj)
+
+    def slotChangedObject(self, obj, prop):
+        if prop in ("Shape", "Mesh", "Points", "Placement"):
+            invalidate_scene_bounds(obj.Document, obj)
+        elif prop == "Visibility":
+            # Only the bounds of the visible objects change.
+            _scene_bounds.pop((obj.Document.Name, True), None)
+
+    def slotDeletedDocument(self, doc):
+        invalidate_scene_bounds(doc)
+
+
+def _ensure_observer():
+    global _observer
+    if _observer is None:
+        _observer = SceneBoundsObserver()
+        FreeCAD.addDocumentObserver(_observer)
+
+
+def invalidate_scene_bounds(doc=None, obj=None):
+    """Drops cached bounds so that they are recomputed on the next request.
+
+    Args:
+        doc (FreeCAD document): Document to invalidate. If None all documents
+                                are invalidated.
+        obj (FreeCAD object): Single object to invalidate. If None the whole
+                              document is invalidated.
+    """
+    if doc is None:
+        _object_bounds.clear()
+        _scene_bounds.clear()
+        return
+    for key in [k for k in _scene_bounds if k[0] == doc.Name]:
+        del _scene_bounds[key]
+    if obj is not None:
+        _object_bounds.pop((doc.Name, obj.Name), None)
+    else:
+        for key in [k for k in _object_bounds if k[0] == doc.Name]:
+            del _object_bounds[key]
+
+
+def get_object_bounds(obj):
+    """Gets the bounding box of a single document object, using the cached
+    value if the object has not changed.
+
+    Args:
+        obj (FreeCAD object): The document object.
+
+    Returns:
+        box (FreeCAD BoundBox): The bounds of the object, or None if the
+                                object has no geometry.
+    """
+    _ensure_observer()
+    key = (obj.Document.Name, obj.Name)
+    if key not in _object_bounds:
+        if obj.TypeId[:4] == "Mesh":
+            box = obj.Mesh.BoundBox
+        elif obj.TypeId[:6] == "Points":
+            box = obj.Points.BoundBox
+        elif obj.TypeId[:4] == "Part":
+            box = obj.Shape.BoundBox
+        else:
+            box = None
+        _object_bounds[key] = box
+    return _object_bounds[key]
+
+
+def get_scene_bounds(doc=None, visible_only=False):
+    """Gets the bounding box of all the geometry in a document. It is worked
+    out once and reused until the document changes.
+
+    Args:
+        doc (FreeCAD document): Defaults to the active document.
+        visible_only (bool): Only include objects which are currently visible.
+
+    Returns:
+        box (FreeCAD BoundBox): The bounds of the scene. Do not modify it, as
+                                it is shared with later calls.
+    """
+    _ensure_observer()
+    if doc is None:
+        doc = FreeCAD.ActiveDocument
+    key = (doc.Name, visible_only)
+    if key not in _scene_bounds:
+        scene = FreeCAD.BoundBox()
+        for obj in doc.Objects:
+            if visible_only and not obj.Visibility:
+                continue
+            box = get_object_bounds(obj)
+            if box is not None and box.isValid():
+                scene.add(box)
+        _scene_bounds[key] = scene
+    return _scene_bounds[key]
+
+
+def find_centre(doc=None):
+    """Finds the centre of the model. As in the original spin code the box
+    always includes the origin, so the model turns about the same point.
+
+    Args:
+        doc (FreeCAD document): Defaults to the active document.
+
+    Returns:
+        centre (FreeCAD Vector): The centre of the scene bounding box.
+    """
+    scene = get_scene_bounds(doc)
+    if not scene.isValid():
+        return FreeCAD.Vector(0, 0, 0)
+    box = FreeCAD.BoundBox(scene)
+    box.add(FreeCAD.Vector(0, 0, 0))
+    return box.Center
+
+
+def fit_view(view=None, doc=None, visible_only=True, slack=1.0):
+    """Equivalent of the ViewFit command, but framed on the cached scene bounds
+    rather than a fresh traversal of the scene graph.
+
+    Args:
+        view (FreeCAD view): Defaults to the active view.
+        doc (FreeCAD document): Defaults to the active document.
+        visible_only (bool): Only frame the currently visible objects.
+        slack (float): Extra space around the model (1.0 is a tight fit).
+    """
+    import FreeCADGui as Gui
+    from pivy import coin
+
+    if view is None:
+        view = Gui.ActiveDocument.ActiveView
+    scene = get_scene_bounds(doc, visible_only=visible_only)
+    if not scene.isValid():
+        Gui.SendMsgToActiveView("ViewFit")
+        return
+    box = coin.SbBox3f(
+        scene.XMin, scene.YMin, scene.ZMin, scene.XMax, scene.YMax, scene.ZMax
+    )
+    try:
+        width, height = view.getSize()
+        aspect = width / float(height)
+    except (AttributeError, ZeroDivisionError):
+        aspect = 1.0
+    view.getCameraNode().viewBoundingBox(box, aspect, slack)
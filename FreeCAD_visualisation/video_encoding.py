@@ -0,0 +1,135 @@
+import subprocess
+import threading
+from queue import Queue
+
+# Marks the end of the frame stream in the render ahead queue.
+_END_OF_FRAMES = object()
+
+
+def open_video_encoder(
+    output_file,
+    width,
+    height,
+    frame_rate=12,
+    input_format="rawvideo",
+    ffmpeg="ffmpeg",
+    codec="libx264",
+):
+    """Starts an ffmpeg process which reads frames from its stdin.
+
+    Args:
+        output_file (str): Location of the output video.
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        frame_rate (float): Frames per second of the output video.
+        input_format (str): 'rawvideo' for RGB24 frame buffers or 'png' for
+                            PNG encoded frames.
+        ffmpeg (str): Location of the ffmpeg executable.
+        codec (str): The video codec ffmpeg should use.
+
+    Returns:
+        encoder (subprocess.Popen): The running encoder process.
+    """
+    if input_format == "rawvideo":
+        input_args = [
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "rgb24",
+            "-s",
+            "".join([str(width), "x", str(height)]),
+        ]
+    elif input_format == "png":
+        input_args = ["-f", "image2pipe", "-c:v", "png"]
+    else:
+        raise ValueError("input_format should be rawvideo or png")
+    command = (
+        [ffmpeg, "-y", "-loglevel", "error"]
+        + input_args
+        + ["-framerate", str(frame_rate), "-i", "-"]
+        + ["-c:v", codec, "-pix_fmt", "yuv420p"]
+        # yuv420p needs even frame dimensions.
+        + ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+        + [output_file]
+    )
+    return subprocess.Popen(command, stdin=subprocess.PIPE)
+
+
+def encode_frames(
+    frames,
+    output_file,
+    width,
+    height,
+    frame_rate=12,
+    input_format="rawvideo",
+    prefetch=32,
+    ffmpeg="ffmpeg",
+    codec="libx264",
+):
+    """Streams frames directly into a video encoder through a pipe.
+    The frames are pulled from the iterable on the calling thread (so GUI
+    rendering stays on the main thread) and handed to a writer thread through
+    a bounded queue. Rendering therefore runs ahead of the encoder, which is
+    only ever waiting when the queue is empty.
+
+    Args:
+        frames (iterable): Frames as (height, width, 3) uint8 arrays for
+                           'rawvideo' or as PNG encoded bytes for 'png'.
+        output_file (str): Location of the output video.
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        frame_rate (float): Frames per second of the output video.
+        input_format (str): 'rawvideo' or 'png'.
+        prefetch (int): Maximum number of frames rendered ahead of the encoder.
+        ffmpeg (str): Location of the ffmpeg executable.
+        codec (str): The video codec ffmpeg should use.
+
+    Returns:
+        n_frames (int): The number of frames encoded.
+    """
+    encoder = open_video_encoder(
+        output_file,
+        width,
+        height,
+        frame_rate=frame_rate,
+        input_format=input_format,
+        ffmpeg=ffmpeg,
+        codec=codec,
+    )
+    frame_queue = Queue(maxsize=prefetch)
+    errors = []
+
+    def writer():
+        while True:
+            frame = frame_queue.get()
+            if frame is _END_OF_FRAMES:
+                break
+            if errors:
+                continue
+            try:
+                if isinstance(frame, bytes):
+                    encoder.stdin.write(frame)
+                else:
+                    encoder.stdin.write(frame.tobytes())
+            except OSError as e:
+                errors.append(e)
+
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    writer_thread.start()
+    n_frames = 0
+    try:
+        for frame in frames:
+            if errors:
+                break
+            frame_queue.put(frame)
+            n_frames += 1
+    finally:
+        frame_queue.put(_END_OF_FRAMES)
+        writer_thread.join()
+        encoder.stdin.close()
+        encoder.wait()
+    if errors or encoder.returncode != 0:
+        raise RuntimeError(
+            "".join(["Video encoding of ", output_file, " failed. ", str(errors)])
+        )
+    return n_frames